@@ -0,0 +1,318 @@
+"""
+Background alert evaluation engine
+
+Each cycle loads the active alerts, groups them by campground and overlapping
+date windows, makes one availability fetch per group and matches every alert in
+the group against that single result. Upstream cost scales with the number of
+distinct campgrounds being watched, not with the number of alerts.
+
+After a group's first evaluation the engine keeps the availability cursor and
+asks only for what changed since, so a cycle matches the stays that opened
+rather than re-walking the whole table. A group is evaluated in full again when
+it gains an alert or its cursor expires.
+
+The stays each alert has already notified are saved with the alert, and an
+alert this process hasn't evaluated yet starts from the saved set, so a
+restart or a new leader doesn't announce the same availability again.
+
+Under several workers only the one holding the leader lease evaluates every
+alert and notifies every listener. Open event streams live in whichever worker
+accepted them, so the other workers evaluate just the alerts of users with a
+stream open there, through the shared availability cache, and feed only their
+own streams.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+ALERT_ENGINE_ENABLED = os.getenv("ALERT_ENGINE_ENABLED", "true").lower() == "true"
+ALERT_ENGINE_INTERVAL_SECONDS = float(os.getenv("ALERT_ENGINE_INTERVAL_SECONDS", "300"))
+ALERT_ENGINE_JITTER_SECONDS = float(os.getenv("ALERT_ENGINE_JITTER_SECONDS", "30"))
+ALERT_ENGINE_MAX_IN_FLIGHT = int(os.getenv("ALERT_ENGINE_MAX_IN_FLIGHT", "4"))
+# The leader renews its lease every cycle; it must outlast the gap between cycles
+ALERT_ENGINE_LEASE_SECONDS = float(os.getenv(
+    "ALERT_ENGINE_LEASE_SECONDS", str(2 * (ALERT_ENGINE_INTERVAL_SECONDS + ALERT_ENGINE_JITTER_SECONDS))
+))
+
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value[:10], "%Y-%m-%d").date()
+
+
+def _month_index(day: date) -> int:
+    return day.year * 12 + day.month - 1
+
+
+def _stay_key(site: Dict[str, Any]) -> Tuple[Any, str]:
+    return site["campsite_id"], site["booking_date"]
+
+
+def site_matches_alert(site: Dict[str, Any], alert: Dict[str, Any]) -> bool:
+    """Whether an available site satisfies an alert's dates, site type and party size"""
+    booking_day = site["booking_date"][:10]
+    if not (alert["start_date"][:10] <= booking_day < alert["end_date"][:10]):
+        return False
+
+    site_type = (alert.get("site_type") or "any").lower()
+    if site_type != "any":
+        site_text = f"{site.get('campsite_type') or ''} {site.get('campsite_use_type') or ''}".lower()
+        if site_type not in site_text:
+            return False
+
+    party_size = alert.get("party_size") or 1
+    occupancy_max = site.get("campsite_occupancy_max")
+    if occupancy_max is not None and party_size > occupancy_max:
+        return False
+    return True
+
+
+class AlertEngine:
+    """Periodically evaluates active alerts in campground batches"""
+
+    def __init__(
+        self,
+        load_alerts: Callable[[], Awaitable[List[Dict[str, Any]]]],
+        fetch_changes: Callable[[str, date, date, Optional[str]], Awaitable[Dict[str, Any]]],
+        resolve_campground_id: Callable[[Dict[str, Any]], Optional[str]],
+        interval_seconds: float = ALERT_ENGINE_INTERVAL_SECONDS,
+        jitter_seconds: float = ALERT_ENGINE_JITTER_SECONDS,
+        max_in_flight: int = ALERT_ENGINE_MAX_IN_FLIGHT,
+        leader_lease=None,
+        has_local_streams: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        load_notified: Optional[Callable[[List[str]], Awaitable[Dict[str, List[Tuple[Any, str]]]]]] = None,
+        save_notified: Optional[Callable[[Dict[str, List[Tuple[Any, str]]]], Awaitable[Any]]] = None,
+    ):
+        self.load_alerts = load_alerts
+        self.fetch_changes = fetch_changes
+        self.resolve_campground_id = resolve_campground_id
+        self.interval_seconds = interval_seconds
+        self.jitter_seconds = jitter_seconds
+        self.max_in_flight = max_in_flight
+        self.leader_lease = leader_lease
+        self.has_local_streams = has_local_streams
+        self.load_notified = load_notified
+        self.save_notified = save_notified
+        # (callback, local): local listeners deliver only within this process and run in every worker
+        self._listeners: List[Tuple[Callable[[Dict[str, Any], List[Dict[str, Any]]], Awaitable[None]], bool]] = []
+        self.leader = True
+        # alert_id -> (campsite_id, booking_date) pairs currently matching
+        self._seen_matches: Dict[str, Set[Tuple[Any, str]]] = {}
+        # (campground_id, first month, last month) -> availability cursor of the group's last fetch
+        self._cursors: Dict[Tuple[str, int, int], str] = {}
+        # Alerts whose matches changed since they were last saved
+        self._unsaved: Set[str] = set()
+
+        self.cycles = 0
+        self.full_evaluations = 0
+        self.diff_evaluations = 0
+        self.seeded_alerts = 0
+        self.save_errors = 0
+        self.last_cycle: Dict[str, Any] = {}
+
+    def add_listener(self, callback: Callable[[Dict[str, Any], List[Dict[str, Any]]], Awaitable[None]], local: bool = False):
+        """
+        Register a coroutine called with (alert, new_matching_sites). Listeners
+        run in the leader only, unless `local` says they deliver to something
+        only this process can reach, such as its open streams.
+        """
+        self._listeners.append((callback, local))
+
+    def group_alerts(self, alerts: List[Dict[str, Any]]) -> List[Tuple[str, date, date, List[Dict[str, Any]]]]:
+        """
+        Group alerts by campground, then merge alerts whose month windows overlap.
+        Returns (campground_id, window_start, window_end, alerts) per group.
+        """
+        today = date.today()
+        by_campground: Dict[str, List[Tuple[date, date, Dict[str, Any]]]] = defaultdict(list)
+        for alert in alerts:
+            try:
+                start_dt = max(_parse_date(alert["start_date"]), today)
+                end_dt = _parse_date(alert["end_date"])
+            except (TypeError, ValueError):
+                logger.warning(f"Skipping alert {alert.get('id')} with invalid dates")
+                continue
+            if end_dt <= start_dt:
+                continue
+            campground_id = self.resolve_campground_id(alert)
+            if not campground_id:
+                continue
+            by_campground[campground_id].append((start_dt, end_dt, alert))
+
+        groups = []
+        for campground_id, windows in by_campground.items():
+            windows.sort(key=lambda w: w[0])
+            current_start, current_end, current_alerts = None, None, []
+            for start_dt, end_dt, alert in windows:
+                # Alerts touching the same calendar month share a fetch
+                if current_alerts and _month_index(start_dt) <= _month_index(current_end):
+                    current_end = max(current_end, end_dt)
+                    current_alerts.append(alert)
+                else:
+                    if current_alerts:
+                        groups.append((campground_id, current_start, current_end, current_alerts))
+                    current_start, current_end, current_alerts = start_dt, end_dt, [alert]
+            if current_alerts:
+                groups.append((campground_id, current_start, current_end, current_alerts))
+        return groups
+
+    @staticmethod
+    def _cursor_key(group) -> Tuple[str, int, int]:
+        campground_id, window_start, window_end, _ = group
+        return campground_id, _month_index(window_start), _month_index(window_end)
+
+    async def _evaluate_group(self, semaphore: asyncio.Semaphore, group) -> int:
+        campground_id, window_start, window_end, alerts = group
+        cursor_key = self._cursor_key(group)
+        since = self._cursors.get(cursor_key)
+        if any(alert["id"] not in self._seen_matches for alert in alerts):
+            since = None  # A new alert needs the full table once
+        async with semaphore:
+            changes = await self.fetch_changes(campground_id, window_start, window_end, since)
+        self._cursors[cursor_key] = changes["cursor"]
+        if changes["reset"]:
+            self.full_evaluations += 1
+        else:
+            self.diff_evaluations += 1
+
+        matched_alerts = 0
+        for alert in alerts:
+            previous = self._seen_matches.get(alert["id"], set())
+            if changes["reset"]:
+                # `opened` is everything available now
+                matches = [site for site in changes["opened"] if site_matches_alert(site, alert)]
+                current = {_stay_key(site) for site in matches}
+                if current != previous or alert["id"] not in self._seen_matches:
+                    self._unsaved.add(alert["id"])
+                self._seen_matches[alert["id"]] = current
+                new_matches = [site for site in matches if _stay_key(site) not in previous]
+            else:
+                new_matches = [
+                    site for site in changes["opened"]
+                    if _stay_key(site) not in previous and site_matches_alert(site, alert)
+                ]
+                booked = {_stay_key(site) for site in changes["booked"]} & previous
+                if booked or new_matches:
+                    self._unsaved.add(alert["id"])
+                previous.difference_update(booked)
+                previous.update(_stay_key(site) for site in new_matches)
+            if not new_matches:
+                continue
+            matched_alerts += 1
+            for listener, local in self._listeners:
+                if not (local or self.leader):
+                    continue
+                try:
+                    await listener(alert, new_matches)
+                except Exception as e:
+                    logger.error(f"Alert listener failed for alert {alert['id']}: {str(e)}")
+        return matched_alerts
+
+    async def run_cycle(self) -> Dict[str, Any]:
+        """Evaluate every active alert once"""
+        started = time.monotonic()
+        if self.leader_lease is not None:
+            self.leader = await self.leader_lease.hold()
+        alerts = await self.load_alerts()
+        if not self.leader:
+            # The leader evaluates every alert; this worker only serves the streams open in it
+            alerts = [alert for alert in alerts if self.has_local_streams is not None and self.has_local_streams(alert)]
+        groups = self.group_alerts(alerts)
+
+        # Forget alerts that were deleted or deactivated, and groups that no longer exist
+        active_ids = {alert["id"] for alert in alerts}
+        for alert_id in list(self._seen_matches):
+            if alert_id not in active_ids:
+                del self._seen_matches[alert_id]
+        group_keys = {self._cursor_key(group) for group in groups}
+        for cursor_key in list(self._cursors):
+            if cursor_key not in group_keys:
+                del self._cursors[cursor_key]
+
+        self._unsaved &= active_ids
+        await self._seed_notified([alert["id"] for alert in alerts if alert["id"] not in self._seen_matches])
+
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        results = await asyncio.gather(
+            *(self._evaluate_group(semaphore, group) for group in groups),
+            return_exceptions=True
+        )
+        await self._save_notified()
+
+        failed = [r for r in results if isinstance(r, Exception)]
+        for error in failed:
+            logger.error(f"Alert group evaluation failed: {str(error)}")
+
+        self.cycles += 1
+        self.last_cycle = {
+            "finished_at": datetime.utcnow().isoformat(),
+            "leader": self.leader,
+            "duration_seconds": round(time.monotonic() - started, 3),
+            "alerts": len(alerts),
+            "groups": len(groups),
+            "campgrounds": len({group[0] for group in groups}),
+            "alerts_with_new_matches": sum(r for r in results if not isinstance(r, Exception)),
+            "failed_groups": len(failed),
+        }
+        logger.info(f"Alert cycle: {self.last_cycle}")
+        return self.last_cycle
+
+    async def _seed_notified(self, alert_ids: List[str]):
+        """Start alerts new to this process from the stays they already notified"""
+        if self.load_notified is None or not alert_ids:
+            return
+        try:
+            notified = await self.load_notified(alert_ids)
+        except Exception as e:
+            logger.error(f"Couldn't load notified stays: {str(e)}")
+            return
+        for alert_id, stays in notified.items():
+            self._seen_matches[alert_id] = {tuple(stay) for stay in stays}
+        self.seeded_alerts += len(notified)
+
+    async def _save_notified(self):
+        """Save the leader's changed match sets; followers only serve their own streams"""
+        if self.save_notified is None or not self.leader or not self._unsaved:
+            return
+        unsaved = {alert_id: list(self._seen_matches[alert_id]) for alert_id in self._unsaved if alert_id in self._seen_matches}
+        try:
+            await self.save_notified(unsaved)
+            self._unsaved.clear()
+        except Exception as e:
+            # Kept for the next cycle
+            self.save_errors += 1
+            logger.error(f"Couldn't save notified stays: {str(e)}")
+
+    async def run_forever(self):
+        """Run evaluation cycles with jittered spacing for the life of the process"""
+        await asyncio.sleep(random.uniform(0, self.jitter_seconds))
+        while True:
+            try:
+                await self.run_cycle()
+            except Exception as e:
+                logger.error(f"Alert cycle failed: {str(e)}")
+            await asyncio.sleep(max(1.0, self.interval_seconds + random.uniform(-self.jitter_seconds, self.jitter_seconds)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cycle counters and the last cycle summary"""
+        return {
+            "interval_seconds": self.interval_seconds,
+            "jitter_seconds": self.jitter_seconds,
+            "max_in_flight": self.max_in_flight,
+            "leader_lease": self.leader_lease.stats() if self.leader_lease is not None else None,
+            "cycles": self.cycles,
+            "tracked_alerts": len(self._seen_matches),
+            "tracked_groups": len(self._cursors),
+            "full_evaluations": self.full_evaluations,
+            "diff_evaluations": self.diff_evaluations,
+            "seeded_alerts": self.seeded_alerts,
+            "unsaved_alerts": len(self._unsaved),
+            "save_errors": self.save_errors,
+            "last_cycle": self.last_cycle,
+        }
@@ -0,0 +1,171 @@
+"""
+Fan-out hub for pushing alert matches and availability changes to clients
+
+Clients used to find out about new availability by polling the alerts and
+availability endpoints on a timer, paying for auth, a database query and
+possibly an upstream fetch on every tick. Instead each connected client holds
+one server-sent event stream. The hub keeps its subscriptions keyed by
+campground, so an alert match or an availability change is handed only to the
+streams watching that campground, through a bounded per-stream queue. A client
+that falls too far behind is told to resync rather than slowing everyone else.
+"""
+import asyncio
+import os
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Set
+
+ALERT_HUB_QUEUE_SIZE = int(os.getenv("ALERT_HUB_QUEUE_SIZE", "100"))
+ALERT_HUB_MAX_STREAMS_PER_USER = int(os.getenv("ALERT_HUB_MAX_STREAMS_PER_USER", "5"))
+ALERT_HUB_HEARTBEAT_SECONDS = float(os.getenv("ALERT_HUB_HEARTBEAT_SECONDS", "15"))
+# How often a stream re-reads its user's alerts, to follow alerts changed through other workers
+ALERT_HUB_REFRESH_SECONDS = float(os.getenv("ALERT_HUB_REFRESH_SECONDS", "60"))
+
+
+class TooManyStreamsError(Exception):
+    """Raised when a user already has the maximum number of open streams"""
+
+
+class Subscription:
+    """One connected event stream"""
+
+    def __init__(self, user_id: str, campground_ids: Iterable[str], queue_size: int, requested: Iterable[str] = ()):
+        self.user_id = user_id
+        # Campgrounds the client asked for explicitly stay watched whatever happens to the user's alerts
+        self.requested: Set[str] = {str(cid) for cid in requested}
+        self.campground_ids: Set[str] = {str(cid) for cid in campground_ids} | self.requested
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=queue_size)
+        # Set when events were dropped; the stream then tells the client to resync
+        self.overflowed = False
+        self.delivered = 0
+        self.dropped = 0
+
+    def offer(self, event: Dict[str, Any]) -> bool:
+        """Queue an event without blocking the publisher"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.dropped += 1
+            return False
+        self.delivered += 1
+        return True
+
+    async def next_event(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """The next queued event, or None after `timeout` seconds of silence"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class AlertHub:
+    """Subscriptions keyed by campground, fed by the alert engine and the snapshot store"""
+
+    def __init__(self, queue_size: int, max_streams_per_user: int):
+        self.queue_size = queue_size
+        self.max_streams_per_user = max_streams_per_user
+        self._by_campground: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._by_user: Dict[str, Set[Subscription]] = defaultdict(set)
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def subscribe(self, user_id: str, campground_ids: Iterable[str], requested: Iterable[str] = ()) -> Subscription:
+        """Open a stream for a user watching their alerts' campgrounds and any requested ones"""
+        if len(self._by_user.get(user_id, ())) >= self.max_streams_per_user:
+            self.rejected += 1
+            raise TooManyStreamsError(f"At most {self.max_streams_per_user} open streams per user")
+        subscription = Subscription(user_id, campground_ids, self.queue_size, requested)
+        self._by_user[user_id].add(subscription)
+        for campground_id in subscription.campground_ids:
+            self._by_campground[campground_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Close a stream"""
+        self._discard(self._by_user, subscription.user_id, subscription)
+        for campground_id in subscription.campground_ids:
+            self._discard(self._by_campground, campground_id, subscription)
+        self.delivered += subscription.delivered
+        self.dropped += subscription.dropped
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[Subscription]], key: str, subscription: Subscription):
+        subscriptions = index.get(key)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del index[key]
+
+    def watch(self, user_id: str, campground_id: str):
+        """Add a campground to every open stream of a user, e.g. after they create an alert"""
+        campground_id = str(campground_id)
+        for subscription in self._by_user.get(user_id, ()):
+            if campground_id not in subscription.campground_ids:
+                subscription.campground_ids.add(campground_id)
+                self._by_campground[campground_id].add(subscription)
+
+    def unwatch(self, user_id: str, campground_id: str):
+        """Remove a campground from a user's streams, e.g. after they delete its last alert"""
+        campground_id = str(campground_id)
+        for subscription in self._by_user.get(user_id, ()):
+            if campground_id in subscription.campground_ids and campground_id not in subscription.requested:
+                subscription.campground_ids.discard(campground_id)
+                self._discard(self._by_campground, campground_id, subscription)
+
+    def set_alert_campgrounds(self, subscription: Subscription, campground_ids: Iterable[str]) -> bool:
+        """Replace the alert campgrounds a stream watches; returns whether anything changed"""
+        watched = {str(cid) for cid in campground_ids} | subscription.requested
+        added = watched - subscription.campground_ids
+        removed = subscription.campground_ids - watched
+        for campground_id in added:
+            self._by_campground[campground_id].add(subscription)
+        for campground_id in removed:
+            self._discard(self._by_campground, campground_id, subscription)
+        subscription.campground_ids = watched
+        return bool(added or removed)
+
+    def is_watched(self, campground_id: str) -> bool:
+        return str(campground_id) in self._by_campground
+
+    def has_streams(self, user_id: str) -> bool:
+        return user_id in self._by_user
+
+    def publish(self, campground_id: str, event: Dict[str, Any], user_id: Optional[str] = None) -> int:
+        """
+        Hand an event to the streams watching a campground, or to every stream of
+        one user when `user_id` is given, whether or not the stream has caught up
+        with that alert yet. Returns the number of streams reached.
+        """
+        reached = 0
+        if user_id is not None:
+            subscriptions = list(self._by_user.get(user_id, ()))
+        else:
+            subscriptions = list(self._by_campground.get(str(campground_id), ()))
+        for subscription in subscriptions:
+            if subscription.offer(event):
+                reached += 1
+        self.published += 1
+        return reached
+
+    def stats(self) -> Dict[str, Any]:
+        """Return open streams and delivery counters"""
+        subscriptions = [s for user_subscriptions in self._by_user.values() for s in user_subscriptions]
+        return {
+            "streams": len(subscriptions),
+            "users": len(self._by_user),
+            "campgrounds": len(self._by_campground),
+            "queue_size": self.queue_size,
+            "published": self.published,
+            "delivered": self.delivered + sum(s.delivered for s in subscriptions),
+            "dropped": self.dropped + sum(s.dropped for s in subscriptions),
+            "rejected": self.rejected,
+        }
+
+
+alert_hub = AlertHub(
+    queue_size=ALERT_HUB_QUEUE_SIZE,
+    max_streams_per_user=ALERT_HUB_MAX_STREAMS_PER_USER,
+)
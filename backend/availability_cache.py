@@ -0,0 +1,31 @@
+"""
+Two-tier availability cache keyed by (campground_id, month, nights)
+
+When many users ask about the same campground and month at once, only the
+first miss in a process goes upstream and concurrent identical misses wait on
+that same fetch. Months are also kept in the shared store, so another worker
+(or another instance) asking for the same month within the TTL reuses the
+fetch instead of repeating it.
+"""
+import os
+
+import orjson
+
+from compact_availability import CompactAvailability
+from fast_json import dumps
+from shared_cache import shared_store
+from tiered_cache import TieredCache
+
+AVAILABILITY_CACHE_TTL_SECONDS = float(os.getenv("AVAILABILITY_CACHE_TTL_SECONDS", "60"))
+AVAILABILITY_CACHE_MAX_ENTRIES = int(os.getenv("AVAILABILITY_CACHE_MAX_ENTRIES", "1000"))
+
+
+availability_cache = TieredCache(
+    namespace="availability",
+    version=1,
+    ttl_seconds=AVAILABILITY_CACHE_TTL_SECONDS,
+    max_entries=AVAILABILITY_CACHE_MAX_ENTRIES,
+    shared=shared_store,
+    encode=lambda month_sites: dumps(month_sites.to_state()),
+    decode=lambda raw: CompactAvailability.from_state(orjson.loads(raw)),
+)
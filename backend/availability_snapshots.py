@@ -0,0 +1,249 @@
+"""
+Per-campground availability snapshots and incremental diffs
+
+Alert users care about the sites that became available, yet every availability
+check and alert cycle walked the whole table and compared it with what was seen
+before. The snapshot store keeps the last-seen availability of each (campground,
+stay length, month) as one day bitmap per site. Every upstream refresh is diffed
+against it, and only the sites that opened or were booked are kept, in a
+bounded per-campground log. Each change gets a cursor; callers that pass back
+the cursor from their previous response receive just the changes since then.
+"""
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import date
+from typing import Any, Deque, Dict, Hashable, Optional, Tuple
+
+from compact_availability import CompactAvailability
+
+# Month snapshots kept (LRU); a campground whose snapshot was evicted starts a new baseline
+AVAILABILITY_SNAPSHOT_MAX_ENTRIES = int(os.getenv("AVAILABILITY_SNAPSHOT_MAX_ENTRIES", "5000"))
+# Change sets kept per (campground, stay length); older cursors get a reset
+AVAILABILITY_DIFF_HISTORY = int(os.getenv("AVAILABILITY_DIFF_HISTORY", "100"))
+
+
+class InvalidCursorError(ValueError):
+    """Raised for a `since` cursor that wasn't issued by this store"""
+
+
+def _bitmap(days, base: int) -> int:
+    """Day ordinals as bits counted from `base`"""
+    bits = 0
+    for day in days:
+        if day >= base:
+            bits |= 1 << (day - base)
+    return bits
+
+
+def _bit_days(bits: int, base: int):
+    """Day ordinals of the set bits, ascending"""
+    days = []
+    offset = 0
+    while bits:
+        if bits & 1:
+            days.append(base + offset)
+        bits >>= 1
+        offset += 1
+    return days
+
+
+class ChangeSet:
+    """Sites that opened and were booked in one month of one refresh"""
+
+    __slots__ = ("cursor", "recorded_at", "opened", "booked")
+
+    def __init__(self, cursor: int, opened: CompactAvailability, booked: CompactAvailability):
+        self.cursor = cursor
+        self.recorded_at = time.time()
+        self.opened = opened
+        self.booked = booked
+
+
+class ChangeStream:
+    """Bounded change log for one (campground, stay length)"""
+
+    __slots__ = ("changes", "truncated_at")
+
+    def __init__(self, history: int, truncated_at: int = 0):
+        self.changes: Deque[ChangeSet] = deque(maxlen=history)
+        # Changes up to this sequence number may be missing; older cursors get a reset
+        self.truncated_at = truncated_at
+
+    def append(self, change: ChangeSet):
+        if len(self.changes) == self.changes.maxlen:
+            self.truncated_at = self.changes[0].cursor
+        self.changes.append(change)
+
+
+class AvailabilitySnapshotStore:
+    """Last-seen availability bitmaps and the change log derived from them"""
+
+    def __init__(self, max_entries: int, history: int):
+        self.max_entries = max_entries
+        self.history = history
+        # Cursors from another worker or from before a restart can't be honoured; an epoch unique
+        # to this store tells them apart, even between workers started in the same second
+        self.epoch = uuid.uuid4().hex[:12]
+        self._sequence = 0
+        # Highest truncation of any evicted stream, applied to campgrounds without one
+        self._stream_floor = 0
+        # (campground_id, nights, "YYYY-MM") -> {campsite_id: (site tuple, day bitmap)}
+        self._snapshots: "OrderedDict[Hashable, Dict[Any, Tuple[tuple, int]]]" = OrderedDict()
+        self._streams: "OrderedDict[Hashable, ChangeStream]" = OrderedDict()
+
+        self.baselines = 0
+        self.refreshes = 0
+        self.change_sets = 0
+        self.opened = 0
+        self.booked = 0
+        self.resets = 0
+
+    @property
+    def cursor(self) -> str:
+        """Cursor for the current state: changes recorded after it have greater cursors"""
+        return self.format_cursor(self._sequence)
+
+    def format_cursor(self, sequence: int) -> str:
+        """Cursor for a sequence number, e.g. the state right after a change set"""
+        return f"{self.epoch}-{sequence}"
+
+    def version(self, campground_id: str, nights: int) -> str:
+        """Changes whenever a campground's availability does: on a new baseline or a recorded change"""
+        stream = self._streams.get((str(campground_id), nights))
+        if stream is None:
+            return self.format_cursor(self._stream_floor)
+        latest = stream.changes[-1].cursor if stream.changes else 0
+        return self.format_cursor(max(stream.truncated_at, latest))
+
+    def parse_cursor(self, cursor: str) -> Optional[int]:
+        """Sequence number of a cursor, or None if another process or an earlier run issued it"""
+        epoch, _, sequence = (cursor or "").partition("-")
+        if not epoch or not sequence.isdigit():
+            raise InvalidCursorError(f"Invalid cursor: {cursor!r}")
+        if epoch != self.epoch or int(sequence) > self._sequence:
+            return None
+        return int(sequence)
+
+    def _stream(self, campground_id: str, nights: int, create: bool = False) -> Optional[ChangeStream]:
+        key = (str(campground_id), nights)
+        stream = self._streams.get(key)
+        if stream is None and create:
+            stream = self._streams[key] = ChangeStream(self.history, self._stream_floor)
+            while len(self._streams) > self.max_entries:
+                _, evicted = self._streams.popitem(last=False)
+                self._stream_floor = max(self._stream_floor, self._sequence, evicted.truncated_at)
+        if stream is not None:
+            self._streams.move_to_end(key)
+        return stream
+
+    def record(self, campground_id: str, month_start: date, availability: CompactAvailability) -> Optional[ChangeSet]:
+        """
+        Diff a freshly fetched month against its snapshot and store the changes.
+        Returns the change set, or None for a first sight or an unchanged month.
+        """
+        key = (str(campground_id), availability.nights, month_start.strftime("%Y-%m"))
+        base = month_start.toordinal()
+        current = {
+            site[0]: (site, _bitmap(days, base))
+            for site, days in zip(availability.sites, availability.days)
+        }
+        previous = self._snapshots.pop(key, None)
+        self._snapshots[key] = current
+        while len(self._snapshots) > self.max_entries:
+            self._snapshots.popitem(last=False)
+        self.refreshes += 1
+
+        if previous is None:
+            # No diff for a first sight. If the month was seen before and evicted, what
+            # changed in between is unknown, so cursors issued before now are reset.
+            self.baselines += 1
+            self._sequence += 1
+            self._stream(campground_id, availability.nights, create=True).truncated_at = self._sequence
+            return None
+
+        # Stays that started in the past drop out of upstream's answer without being booked
+        past_days = max(0, date.today().toordinal() - base)
+        opened = availability.copy_empty()
+        booked = availability.copy_empty()
+        for campsite_id, (site, bits) in current.items():
+            new_bits = bits & ~previous.get(campsite_id, (None, 0))[1]
+            if new_bits:
+                opened.add_site(site, _bit_days(new_bits, base))
+        for campsite_id, (site, old_bits) in previous.items():
+            gone_bits = (old_bits & ~current.get(campsite_id, (None, 0))[1]) >> past_days << past_days
+            if gone_bits:
+                booked.add_site(site, _bit_days(gone_bits, base))
+        if not opened.sites and not booked.sites:
+            return None
+
+        self._sequence += 1
+        change = ChangeSet(self._sequence, opened, booked)
+        self._stream(campground_id, availability.nights, create=True).append(change)
+        self.change_sets += 1
+        self.opened += len(opened)
+        self.booked += len(booked)
+        return change
+
+    def changes_since(self, campground_id: str, nights: int, since: str, start_dt: date, end_dt: date
+                      ) -> Optional[Tuple[CompactAvailability, CompactAvailability]]:
+        """
+        Net (opened, booked) stays starting in [start_dt, end_dt) since a cursor, or
+        None when the cursor is too old or from another process and the caller must
+        reload the full availability.
+        """
+        sequence = self.parse_cursor(since)
+        stream = self._stream(campground_id, nights)
+        truncated_at = stream.truncated_at if stream is not None else self._stream_floor
+        if sequence is None or sequence < truncated_at:
+            self.resets += 1
+            return None
+
+        # (campsite_id, day) -> (event, site, change set); an event undoes the previous one for the same stay
+        net: Dict[Tuple[Any, int], Tuple[str, tuple, ChangeSet]] = {}
+        start, end = start_dt.toordinal(), end_dt.toordinal()
+        for change in (stream.changes if stream is not None else ()):
+            if change.cursor <= sequence:
+                continue
+            for event, availability in (("opened", change.opened), ("booked", change.booked)):
+                for site, days in zip(availability.sites, availability.days):
+                    for day in days:
+                        if start <= day < end:
+                            stay = (site[0], day)
+                            if stay in net:
+                                del net[stay]
+                            else:
+                                net[stay] = (event, site, change)
+
+        empty = CompactAvailability(nights)
+        opened, booked = empty, empty.copy_empty()
+        for (campsite_id, day), (event, site, change) in sorted(net.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+            target = opened if event == "opened" else booked
+            if not target.facility:
+                # Takes the facility fields and date format from the change
+                target.extend((change.opened if event == "opened" else change.booked).copy_empty())
+            target.add_site(site, [day])
+        return opened, booked
+
+    def stats(self) -> Dict[str, Any]:
+        """Return snapshot, change log and reset counters"""
+        return {
+            "cursor": self.cursor,
+            "snapshots": len(self._snapshots),
+            "max_entries": self.max_entries,
+            "streams": len(self._streams),
+            "history": self.history,
+            "refreshes": self.refreshes,
+            "baselines": self.baselines,
+            "change_sets": self.change_sets,
+            "opened": self.opened,
+            "booked": self.booked,
+            "resets": self.resets,
+        }
+
+
+availability_snapshots = AvailabilitySnapshotStore(
+    max_entries=AVAILABILITY_SNAPSHOT_MAX_ENTRIES,
+    history=AVAILABILITY_DIFF_HISTORY,
+)
@@ -0,0 +1,295 @@
+"""
+Persistent campground catalog keyed by Recreation.gov facility ID
+
+The catalog keeps one row per campground in a small SQLite file and mirrors it
+in memory, so name lookups are a dict access instead of downloading a state's
+campground list. A background task walks every state and refreshes entries that
+are older than CATALOG_REFRESH_HOURS.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from html import unescape
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CATALOG_DATABASE_PATH = os.getenv("CATALOG_DATABASE_PATH", "campground_catalog.db")
+CATALOG_REFRESH_HOURS = float(os.getenv("CATALOG_REFRESH_HOURS", "24"))
+CATALOG_REFRESH_PAUSE_SECONDS = float(os.getenv("CATALOG_REFRESH_PAUSE_SECONDS", "2"))
+CATALOG_BACKGROUND_REFRESH = os.getenv("CATALOG_BACKGROUND_REFRESH", "true").lower() == "true"
+# Bumped when entries gain fields, so catalogs written before are downloaded again
+CATALOG_SCHEMA_VERSION = 2
+
+# Every state and territory Recreation.gov lists facilities for
+CATALOG_STATES = [
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA',
+    'KS', 'KY', 'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ',
+    'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT',
+    'VA', 'WA', 'WV', 'WI', 'WY', 'DC', 'PR', 'VI', 'GU', 'AS', 'MP'
+]
+
+
+def _plain_text(html_text: Optional[str]) -> str:
+    """RIDB descriptions are HTML; keep the text"""
+    text = re.sub(r"<[^>]+>", " ", html_text or "")
+    return re.sub(r"\s+", " ", unescape(text)).strip()
+
+
+def _coordinate(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def campground_to_entry(cg: Any, state: Optional[str] = None, facility: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Convert a camply CampgroundFacility into a catalog entry. camply only keeps
+    names and IDs, so location, description and activities come from the raw
+    RIDB facility record it was built from.
+    """
+    facility = facility or {}
+    address = next(iter(facility.get("FACILITYADDRESS") or []), {})
+    activities = [activity.get("ActivityName") for activity in facility.get("ACTIVITY") or []]
+
+    return {
+        "facility_id": str(cg.facility_id),
+        "name": cg.facility_name,
+        "state": (state or address.get("AddressStateCode") or '').upper(),
+        "city": address.get("City") or '',
+        "description": _plain_text(facility.get("FacilityDescription")),
+        "recreation_area": cg.recreation_area or '',
+        "recreation_area_id": str(cg.recreation_area_id or ''),
+        "latitude": _coordinate(facility.get("FacilityLatitude")),
+        "longitude": _coordinate(facility.get("FacilityLongitude")),
+        "activities": sorted({name.title() for name in activities if name}),
+        "phone": facility.get("FacilityPhone") or '',
+        "email": facility.get("FacilityEmail") or '',
+    }
+
+
+class CampgroundCatalog:
+    """SQLite-backed campground catalog with an in-memory facility-ID index"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._state_refreshed_at: Dict[str, datetime] = {}
+        self._write_lock = threading.Lock()
+        self._pending_lookups: set = set()
+        self._lookup_tasks: set = set()
+        self._by_name: Dict[str, str] = {}
+        self._by_name_version = None
+        self.version = 0
+        self.removed = 0
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_schema(self):
+        """Create catalog tables if they don't exist"""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS campgrounds (
+                    facility_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    state TEXT,
+                    city TEXT,
+                    description TEXT,
+                    recreation_area TEXT,
+                    recreation_area_id TEXT,
+                    latitude REAL,
+                    longitude REAL,
+                    activities TEXT,
+                    phone TEXT,
+                    email TEXT,
+                    updated_at TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_campgrounds_state ON campgrounds (state)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS catalog_states (
+                    state TEXT PRIMARY KEY,
+                    refreshed_at TEXT NOT NULL,
+                    campground_count INTEGER DEFAULT 0
+                )
+            """)
+            if conn.execute("PRAGMA user_version").fetchone()[0] < CATALOG_SCHEMA_VERSION:
+                # Entries were stored without coordinates or descriptions: keep them, but refresh every state
+                conn.execute("DELETE FROM catalog_states")
+                conn.execute(f"PRAGMA user_version = {CATALOG_SCHEMA_VERSION}")
+        conn.close()
+
+    @staticmethod
+    def _row_to_entry(row: sqlite3.Row) -> Dict[str, Any]:
+        entry = dict(row)
+        entry["activities"] = json.loads(entry["activities"]) if entry["activities"] else []
+        entry.pop("updated_at", None)
+        return entry
+
+    def load(self):
+        """Load the persisted catalog into memory"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT * FROM campgrounds").fetchall()
+            state_rows = conn.execute("SELECT state, refreshed_at FROM catalog_states").fetchall()
+        finally:
+            conn.close()
+
+        self._by_id = {row["facility_id"]: self._row_to_entry(row) for row in rows}
+        self._state_refreshed_at = {
+            row["state"]: datetime.fromisoformat(row["refreshed_at"]) for row in state_rows
+        }
+        self.version += 1
+        logger.info(f"Campground catalog loaded: {len(self._by_id)} campgrounds, {len(self._state_refreshed_at)} states")
+
+    def get(self, facility_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a campground by facility ID"""
+        return self._by_id.get(str(facility_id))
+
+    def get_name(self, facility_id: str) -> Optional[str]:
+        """Look up a campground name by facility ID"""
+        entry = self._by_id.get(str(facility_id))
+        return entry["name"] if entry else None
+
+    def find_id_by_name(self, name: str) -> Optional[str]:
+        """Reverse lookup of a facility ID from a campground name"""
+        if self._by_name_version != self.version:
+            # Snapshot first: upsert_entries writes to _by_id from a worker thread
+            self._by_name = {entry["name"].strip().lower(): facility_id for facility_id, entry in list(self._by_id.items())}
+            self._by_name_version = self.version
+        return self._by_name.get((name or "").strip().lower())
+
+    def entries(self) -> Iterable[Dict[str, Any]]:
+        """Iterate over every catalog entry"""
+        return list(self._by_id.values())
+
+    def is_state_fresh(self, state: str) -> bool:
+        """Whether a state's campgrounds were refreshed within the refresh interval"""
+        refreshed_at = self._state_refreshed_at.get(state.upper())
+        return refreshed_at is not None and datetime.utcnow() - refreshed_at < timedelta(hours=CATALOG_REFRESH_HOURS)
+
+    def upsert_entries(self, entries: List[Dict[str, Any]], state: Optional[str] = None,
+                       refreshed_at: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Store copies of catalog entries (blocking, call from a worker thread). With a
+        state, the entries are that state's full list, downloaded at `refreshed_at`,
+        and the state's campgrounds missing from it are removed.
+        """
+        # The caller's dicts may be shared with a cache; never store or change them
+        entries = [dict(entry, activities=list(entry["activities"])) for entry in entries]
+        for entry in entries:
+            # Rec-area and single-facility fetches don't carry a state; keep the one we know
+            known = self._by_id.get(entry["facility_id"])
+            if not entry["state"] and known:
+                entry["state"] = known["state"]
+        now = datetime.utcnow()
+        refreshed_at = refreshed_at or now
+        with self._write_lock:
+            # An empty list is more likely an upstream hiccup than a state losing every campground
+            removed_ids = []
+            if state and entries:
+                kept_ids = {entry["facility_id"] for entry in entries}
+                removed_ids = [
+                    facility_id for facility_id, entry in list(self._by_id.items())
+                    if entry["state"] == state.upper() and facility_id not in kept_ids
+                ]
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany("""
+                        INSERT OR REPLACE INTO campgrounds (
+                            facility_id, name, state, city, description, recreation_area, recreation_area_id,
+                            latitude, longitude, activities, phone, email, updated_at
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, [(
+                        e["facility_id"], e["name"], e["state"], e["city"], e["description"],
+                        e["recreation_area"], e["recreation_area_id"], e["latitude"], e["longitude"],
+                        json.dumps(e["activities"]), e["phone"], e["email"], now.isoformat()
+                    ) for e in entries])
+                    if state and entries:
+                        conn.execute(
+                            "DELETE FROM campgrounds WHERE state = ? AND facility_id NOT IN (SELECT value FROM json_each(?))",
+                            (state.upper(), json.dumps(sorted(kept_ids)))
+                        )
+                    if state:
+                        conn.execute("""
+                            INSERT OR REPLACE INTO catalog_states (state, refreshed_at, campground_count)
+                            VALUES (?, ?, ?)
+                        """, (state.upper(), refreshed_at.isoformat(), len(entries)))
+            finally:
+                conn.close()
+
+            for entry in entries:
+                self._by_id[entry["facility_id"]] = entry
+            for facility_id in removed_ids:
+                self._by_id.pop(facility_id, None)
+            if removed_ids:
+                self.removed += len(removed_ids)
+                logger.info(f"Removed {len(removed_ids)} campgrounds Recreation.gov no longer lists in {state.upper()}")
+            if state:
+                self._state_refreshed_at[state.upper()] = refreshed_at
+            self.version += 1
+        return entries
+
+    def stale_states(self) -> List[str]:
+        """States that have never been fetched or are past the refresh interval"""
+        return [state for state in CATALOG_STATES if not self.is_state_fresh(state)]
+
+    async def refresh_stale_states(self, fetch_state: Callable[[str], Awaitable[Any]]):
+        """Refresh every stale state one at a time so user traffic keeps priority"""
+        for state in self.stale_states():
+            try:
+                await fetch_state(state)
+            except Exception as e:
+                logger.error(f"Error refreshing campground catalog for {state}: {str(e)}")
+            await asyncio.sleep(CATALOG_REFRESH_PAUSE_SECONDS)
+
+    async def run_refresh_loop(self, fetch_state: Callable[[str], Awaitable[Any]]):
+        """Keep the catalog fresh for the life of the process"""
+        while True:
+            await self.refresh_stale_states(fetch_state)
+            await asyncio.sleep(max(60.0, CATALOG_REFRESH_HOURS * 3600 / 4))
+
+    def schedule_lookup(self, facility_id: str, fetch_facility: Callable[[str], Awaitable[Any]]):
+        """Fetch a single unknown facility in the background, once"""
+        facility_id = str(facility_id)
+        if facility_id in self._pending_lookups or not facility_id.isdigit():
+            return
+        self._pending_lookups.add(facility_id)
+
+        async def _lookup():
+            try:
+                await fetch_facility(facility_id)
+            except Exception as e:
+                logger.error(f"Error fetching campground {facility_id} for catalog: {str(e)}")
+            finally:
+                self._pending_lookups.discard(facility_id)
+
+        # The loop only keeps a weak reference to tasks; hold it until it finishes
+        task = asyncio.get_running_loop().create_task(_lookup())
+        self._lookup_tasks.add(task)
+        task.add_done_callback(self._lookup_tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return catalog size and freshness metrics"""
+        return {
+            "campgrounds": len(self._by_id),
+            "states_loaded": len(self._state_refreshed_at),
+            "states_stale": len(self.stale_states()),
+            "pending_lookups": len(self._pending_lookups),
+            "removed": self.removed,
+            "version": self.version,
+        }
+
+
+campground_catalog = CampgroundCatalog(CATALOG_DATABASE_PATH)
@@ -0,0 +1,188 @@
+"""
+Compact availability: each site's metadata once, stay start dates as packed day numbers
+
+A camply result is one object per (site, start date), and turning each into an
+18-key dict repeats the campsite, loop and facility strings for every date. For
+a large campground over a month that is tens of thousands of dicts in the cache
+and a multi-megabyte response. CompactAvailability keeps one metadata tuple per
+site and an array of start-date ordinals beside it. It is what the availability
+cache stores; the per-site-date dicts are only built when a caller asks for the
+full format, and the compact JSON sends each site's dates as run-length ranges.
+"""
+from array import array
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Per-site fields, sent once per site in the compact format
+SITE_FIELDS = (
+    "campsite_id", "campsite_title", "campsite_site_name", "campsite_loop_name",
+    "campsite_type", "campsite_use_type", "booking_url", "permitted_equipment",
+    "campsite_occupancy_min", "campsite_occupancy_max", "availability_status",
+)
+# Fields shared by every site of a campground, sent once per response
+FACILITY_FIELDS = ("recreation_area", "recreation_area_id", "facility_name", "facility_id")
+
+
+def _iso(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat()
+
+
+class CompactAvailability:
+    """Available stays of a fixed length at one campground"""
+
+    __slots__ = ("nights", "facility", "sites", "days", "_positions", "_date_suffix")
+
+    def __init__(self, nights: int, facility: Optional[Dict[str, Any]] = None):
+        self.nights = nights
+        self.facility: Dict[str, Any] = facility or {}
+        self.sites: List[tuple] = []
+        # Sorted start-date ordinals per site, parallel to self.sites
+        self.days: List[array] = []
+        self._positions: Dict[Any, int] = {}
+        # camply's booking dates render as "YYYY-MM-DD 00:00:00"; keep whatever followed the date
+        self._date_suffix = ""
+
+    @classmethod
+    def from_dicts(cls, site_dicts: Iterable[Dict[str, Any]], nights: int) -> "CompactAvailability":
+        """Build from availability dicts in the full format"""
+        compact = cls(nights)
+        for site in site_dicts:
+            compact.add(site)
+        for days in compact.days:
+            days_sorted = sorted(set(days))
+            days[:] = array("i", days_sorted)
+        return compact
+
+    def add(self, site: Dict[str, Any]):
+        """Add one (site, start date) availability dict"""
+        booking_date = site.get("booking_date") or ""
+        if not booking_date:
+            return
+        if not self.facility:
+            self.facility = {field: site.get(field, "") for field in FACILITY_FIELDS}
+            self._date_suffix = booking_date[10:]
+        key = site.get("campsite_id")
+        position = self._positions.get(key)
+        if position is None:
+            position = len(self.sites)
+            self._positions[key] = position
+            self.sites.append(tuple(site.get(field) for field in SITE_FIELDS))
+            self.days.append(array("i"))
+        self.days[position].append(date.fromisoformat(booking_date[:10]).toordinal())
+
+    def copy_empty(self) -> "CompactAvailability":
+        """An empty availability for the same campground and stay length"""
+        compact = CompactAvailability(self.nights, dict(self.facility))
+        compact._date_suffix = self._date_suffix
+        return compact
+
+    def add_site(self, site: tuple, days: Iterable[int]):
+        """Add start-date ordinals for a site given as a SITE_FIELDS tuple; days must stay sorted"""
+        position = self._positions.get(site[0])
+        if position is None:
+            self._positions[site[0]] = len(self.sites)
+            self.sites.append(site)
+            self.days.append(array("i", days))
+        else:
+            self.days[position].extend(days)
+
+    def window(self, start_dt: date, end_dt: date) -> "CompactAvailability":
+        """Only the stays that start in [start_dt, end_dt)"""
+        start, end = start_dt.toordinal(), end_dt.toordinal()
+        compact = self.copy_empty()
+        for site, days in zip(self.sites, self.days):
+            kept = array("i", (day for day in days if start <= day < end))
+            if kept:
+                compact._positions[site[0]] = len(compact.sites)
+                compact.sites.append(site)
+                compact.days.append(kept)
+        return compact
+
+    def extend(self, other: "CompactAvailability"):
+        """Append a later, non-overlapping period (e.g. the next month) in place"""
+        if not self.facility:
+            self.facility = dict(other.facility)
+            self._date_suffix = other._date_suffix
+        for site, days in zip(other.sites, other.days):
+            self.add_site(site, days)
+
+    def __len__(self) -> int:
+        """Number of (site, start date) availabilities"""
+        return sum(len(days) for days in self.days)
+
+    def available_dates(self) -> List[str]:
+        """Sorted start dates with at least one available site, in the full format's string form"""
+        return [_iso(day) + self._date_suffix for day in sorted({day for days in self.days for day in days})]
+
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Expand to the full per-site-date availability dicts"""
+        for site, days in zip(self.sites, self.days):
+            metadata = dict(zip(SITE_FIELDS, site))
+            for day in days:
+                yield {
+                    "campsite_id": metadata["campsite_id"],
+                    "campsite_title": metadata["campsite_title"],
+                    "campsite_site_name": metadata["campsite_site_name"],
+                    "campsite_loop_name": metadata["campsite_loop_name"],
+                    "campsite_type": metadata["campsite_type"],
+                    "campsite_use_type": metadata["campsite_use_type"],
+                    "booking_date": _iso(day) + self._date_suffix,
+                    "booking_end_date": _iso(day + self.nights) + self._date_suffix,
+                    "booking_nights": self.nights,
+                    "booking_url": metadata["booking_url"],
+                    "recreation_area": self.facility.get("recreation_area", ""),
+                    "recreation_area_id": self.facility.get("recreation_area_id", ""),
+                    "facility_name": self.facility.get("facility_name", ""),
+                    "facility_id": self.facility.get("facility_id", ""),
+                    "availability_status": metadata["availability_status"],
+                    "permitted_equipment": metadata["permitted_equipment"],
+                    "campsite_occupancy_min": metadata["campsite_occupancy_min"],
+                    "campsite_occupancy_max": metadata["campsite_occupancy_max"],
+                }
+
+    def to_state(self) -> Dict[str, Any]:
+        """Lossless JSON-compatible form, for caches shared between processes"""
+        return {
+            "nights": self.nights,
+            "facility": self.facility,
+            "date_suffix": self._date_suffix,
+            "sites": [list(site) for site in self.sites],
+            "days": [days.tolist() for days in self.days],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "CompactAvailability":
+        """Rebuild from to_state()"""
+        compact = cls(state["nights"], state["facility"])
+        compact._date_suffix = state["date_suffix"]
+        for site, days in zip(state["sites"], state["days"]):
+            compact.add_site(tuple(site), days)
+        return compact
+
+    @staticmethod
+    def _ranges(days: array) -> List[List[str]]:
+        ranges = []
+        run_start = previous = None
+        for day in days:
+            if previous is not None and day == previous + 1:
+                previous = day
+                continue
+            if run_start is not None:
+                ranges.append([_iso(run_start), _iso(previous)])
+            run_start = previous = day
+        if run_start is not None:
+            ranges.append([_iso(run_start), _iso(previous)])
+        return ranges
+
+    def to_json(self) -> Dict[str, Any]:
+        """
+        Columnar form: `sites` maps each SITE_FIELDS name to a list with one value per
+        site, and `ranges[i]` lists site i's available start dates as inclusive
+        [first, last] runs of consecutive days. Each stay lasts `nights` nights.
+        """
+        return {
+            "nights": self.nights,
+            "facility": self.facility,
+            "sites": {field: [site[i] for site in self.sites] for i, field in enumerate(SITE_FIELDS)},
+            "ranges": [self._ranges(days) for days in self.days],
+        }
@@ -0,0 +1,175 @@
+"""
+Negotiated gzip / brotli compression for large JSON bodies
+
+Availability and search responses are highly repetitive JSON, so they shrink
+several times over when compressed, and mobile clients on slow links wait on
+the bytes rather than on the server. CompressionMiddleware compresses complete
+responses above a size threshold with the best encoding the client accepts:
+brotli when the optional `brotli` package is installed, otherwise gzip.
+Streaming responses (NDJSON search, event streams) pass through untouched so
+each frame still reaches the client as soon as it is written. Very large bodies
+are compressed on a worker thread instead of the event loop.
+"""
+import asyncio
+import gzip
+import os
+from typing import Any, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+RESPONSE_COMPRESSION_ENABLED = os.getenv("RESPONSE_COMPRESSION_ENABLED", "true").lower() == "true"
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+RESPONSE_COMPRESSION_GZIP_LEVEL = int(os.getenv("RESPONSE_COMPRESSION_GZIP_LEVEL", "6"))
+RESPONSE_COMPRESSION_BROTLI_QUALITY = int(os.getenv("RESPONSE_COMPRESSION_BROTLI_QUALITY", "4"))
+# Bodies at least this large are compressed off the event loop
+RESPONSE_COMPRESSION_THREAD_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_THREAD_MIN_BYTES", "262144"))
+
+# Streams whose headers go out immediately instead of waiting for the first frame
+STREAMING_MEDIA_TYPES = ("application/x-ndjson", "text/event-stream")
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """{coding: q} from an Accept-Encoding header"""
+    codings = {}
+    for part in value.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding] = q
+    return codings
+
+
+class ResponseCompressor:
+    """Encoding negotiation, compression and counters shared by the middleware"""
+
+    def __init__(self, minimum_size: int, gzip_level: int, brotli_quality: int, thread_min_size: int):
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.thread_min_size = thread_min_size
+        # Server preference order
+        self.encodings: List[str] = (["br"] if brotli is not None else []) + ["gzip"]
+
+        self.compressed: Dict[str, int] = {encoding: 0 for encoding in self.encodings}
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        """Preferred encoding the client accepts, or None for identity"""
+        if not accept_encoding:
+            return None
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        candidates = [
+            (accepted.get(encoding, wildcard), -rank, encoding)
+            for rank, encoding in enumerate(self.encodings)
+        ]
+        q, _, encoding = max(candidates)
+        return encoding if q > 0 else None
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def compress_async(self, body: bytes, encoding: str) -> bytes:
+        if len(body) >= self.thread_min_size:
+            compressed = await asyncio.to_thread(self.compress, body, encoding)
+        else:
+            compressed = self.compress(body, encoding)
+        self.compressed[encoding] += 1
+        self.bytes_in += len(body)
+        self.bytes_out += len(compressed)
+        return compressed
+
+    def stats(self) -> Dict[str, Any]:
+        """Return negotiation settings and compression counters"""
+        return {
+            "enabled": RESPONSE_COMPRESSION_ENABLED,
+            "encodings": self.encodings,
+            "minimum_size": self.minimum_size,
+            "compressed": dict(self.compressed),
+            "skipped": self.skipped,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+        }
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete responses with the negotiated encoding"""
+
+    def __init__(self, app, compressor: "ResponseCompressor" = None):
+        self.app = app
+        self.compressor = compressor or response_compressor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self.compressor.negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                content_type = Headers(raw=message["headers"]).get("content-type", "")
+                if content_type.startswith(STREAMING_MEDIA_TYPES):
+                    await send(message)
+                    return
+                # Hold the headers until the first body chunk shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            if message.get("more_body", False) or "content-encoding" in headers or len(body) < self.compressor.minimum_size:
+                # Streaming, already encoded, or too small to be worth it
+                if not message.get("more_body", False) and body:
+                    self.compressor.skipped += 1
+                await send(start_message)
+                start_message = None
+                await send(message)
+                return
+
+            compressed = await self.compressor.compress_async(body, encoding)
+            headers["Content-Encoding"] = encoding
+            if headers.get("etag", "").startswith('"'):
+                # The encoded bytes differ, so a strong ETag becomes weak (as nginx does)
+                headers["ETag"] = "W/" + headers["etag"]
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            start_message = None
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+
+response_compressor = ResponseCompressor(
+    minimum_size=RESPONSE_COMPRESSION_MIN_BYTES,
+    gzip_level=RESPONSE_COMPRESSION_GZIP_LEVEL,
+    brotli_quality=RESPONSE_COMPRESSION_BROTLI_QUALITY,
+    thread_min_size=RESPONSE_COMPRESSION_THREAD_MIN_BYTES,
+)
@@ -0,0 +1,89 @@
+"""
+In-memory snapshot of the public dashboard statistics
+
+The landing page requests the dashboard stats on every view, and they are the
+same for every visitor. The counts are read from the trigger-maintained
+counters at most once per refresh interval, however many requests arrive, and
+concurrent requests after expiry share a single read. Each snapshot carries an
+ETag derived from its counts, so repeat visitors can revalidate with
+If-None-Match and get a bodiless 304 while nothing has changed.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from http_cache import etag_matches
+
+DASHBOARD_STATS_REFRESH_SECONDS = float(os.getenv("DASHBOARD_STATS_REFRESH_SECONDS", "5"))
+
+
+class StatsSnapshot:
+    """Counts as of one refresh"""
+
+    __slots__ = ("counts", "etag", "refreshed_at", "updated_at")
+
+    def __init__(self, counts: Dict[str, Any], updated_at: str):
+        self.counts = counts
+        # Weak: equal counts are the same stats, whatever `last_updated` says
+        digest = hashlib.sha1(repr(sorted(counts.items())).encode("utf-8")).hexdigest()[:16]
+        self.etag = f'W/"{digest}"'
+        self.refreshed_at = time.monotonic()
+        self.updated_at = updated_at
+
+
+class DashboardStats:
+    """Refresh-interval snapshot of the dashboard counts with single-flight reloads"""
+
+    def __init__(self, load: Callable[[], Awaitable[Dict[str, Any]]], refresh_seconds: float):
+        self.load = load
+        self.refresh_seconds = refresh_seconds
+        self._snapshot: Optional[StatsSnapshot] = None
+        self._lock = asyncio.Lock()
+
+        self.hits = 0
+        self.refreshes = 0
+        self.not_modified = 0
+
+    def _fresh(self) -> bool:
+        return self._snapshot is not None and time.monotonic() - self._snapshot.refreshed_at < self.refresh_seconds
+
+    async def get(self) -> StatsSnapshot:
+        """The current snapshot, reloading the counts if it is older than the refresh interval"""
+        if self._fresh():
+            self.hits += 1
+            return self._snapshot
+        async with self._lock:
+            # Another request may have refreshed while we waited
+            if self._fresh():
+                self.hits += 1
+                return self._snapshot
+            counts = await self.load()
+            previous = self._snapshot
+            if previous is not None and previous.counts == counts:
+                # Unchanged: keep the ETag and the time the counts last changed
+                updated_at = previous.updated_at
+            else:
+                updated_at = datetime.utcnow().isoformat()
+            self._snapshot = StatsSnapshot(counts, updated_at)
+            self.refreshes += 1
+            return self._snapshot
+
+    def matches(self, snapshot: StatsSnapshot, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header already names this snapshot"""
+        if etag_matches(if_none_match, snapshot.etag):
+            self.not_modified += 1
+            return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return snapshot age and hit counters"""
+        return {
+            "refresh_seconds": self.refresh_seconds,
+            "snapshot_age_seconds": round(time.monotonic() - self._snapshot.refreshed_at, 1) if self._snapshot else None,
+            "hits": self.hits,
+            "refreshes": self.refreshes,
+            "not_modified": self.not_modified,
+        }
@@ -0,0 +1,148 @@
+"""
+Pooled SQLite connections in WAL mode
+
+Opening a connection per request throws away SQLite's page cache and compiled
+statements every time, and the default rollback journal makes the alert writer
+block dashboard readers. The pool keeps long-lived connections instead: a set of
+read-only connections handed out to readers and a single writer connection, all
+in WAL mode so reads proceed while a write is in progress.
+"""
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+DB_READER_POOL_SIZE = int(os.getenv("DB_READER_POOL_SIZE", "4"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "8192"))
+DB_MMAP_SIZE_MB = int(os.getenv("DB_MMAP_SIZE_MB", "64"))
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL").upper()
+DB_BUSY_TIMEOUT_SECONDS = float(os.getenv("DB_BUSY_TIMEOUT_SECONDS", "5"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "128"))
+
+
+class SQLiteConnectionPool:
+    """Read-only connection pool plus one serialized writer connection"""
+
+    def __init__(self, db_path: str, reader_pool_size: int = DB_READER_POOL_SIZE):
+        self.db_path = db_path
+        self.reader_pool_size = reader_pool_size
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._readers_created = 0
+        self._readers_lock = threading.Lock()
+        self._writer: sqlite3.Connection = None
+        self._writer_lock = threading.Lock()
+
+        self._reader_checkouts = 0
+        self._reader_waits = 0
+        self._reader_wait_total = 0.0
+        self._writer_checkouts = 0
+        self._writer_wait_total = 0.0
+        self._writer_max_wait = 0.0
+        self._rollbacks = 0
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=DB_BUSY_TIMEOUT_SECONDS,
+            check_same_thread=False,  # Handed between threads, but only used by one holder at a time
+            cached_statements=DB_STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row  # Enable dict-like access
+        if not readonly:
+            # WAL is persistent in the database file; readers inherit it
+            conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE_MB * 1024 * 1024}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        if readonly:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _get_writer(self) -> sqlite3.Connection:
+        if self._writer is None:
+            self._writer = self._connect(readonly=False)
+        return self._writer
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Check out the single writer connection; writes are serialized"""
+        started = time.monotonic()
+        with self._writer_lock:
+            waited = time.monotonic() - started
+            self._writer_checkouts += 1
+            self._writer_wait_total += waited
+            self._writer_max_wait = max(self._writer_max_wait, waited)
+            conn = self._get_writer()
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    # Anything not committed by the caller is discarded
+                    conn.rollback()
+                    self._rollbacks += 1
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Check out a read-only connection from the pool"""
+        # Make sure the database is in WAL mode before the first reader opens
+        if self._writer is None:
+            with self._writer_lock:
+                self._get_writer()
+
+        conn = None
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._readers_lock:
+                if self._readers_created < self.reader_pool_size:
+                    self._readers_created += 1
+                    conn = self._connect(readonly=True)
+            if conn is None:
+                started = time.monotonic()
+                self._reader_waits += 1
+                conn = self._readers.get(timeout=DB_BUSY_TIMEOUT_SECONDS)
+                self._reader_wait_total += time.monotonic() - started
+
+        self._reader_checkouts += 1
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool sizing and checkout metrics"""
+        return {
+            "journal_mode": "wal",
+            "synchronous": DB_SYNCHRONOUS,
+            "reader_pool_size": self.reader_pool_size,
+            "readers_open": self._readers_created,
+            "readers_idle": self._readers.qsize(),
+            "reader_checkouts": self._reader_checkouts,
+            "reader_waits": self._reader_waits,
+            "reader_wait_ms_total": round(self._reader_wait_total * 1000, 2),
+            "writer_checkouts": self._writer_checkouts,
+            "writer_wait_ms_total": round(self._writer_wait_total * 1000, 2),
+            "writer_max_wait_ms": round(self._writer_max_wait * 1000, 2),
+            "writer_rollbacks": self._rollbacks,
+        }
+
+    def close(self):
+        """Close every pooled connection"""
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        self._readers_created = 0
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -0,0 +1,40 @@
+"""
+orjson responses for the large JSON endpoints
+
+A dict returned from a FastAPI handler is walked by `jsonable_encoder`, which
+rebuilds every nested dict, list and Pydantic model in Python before the stdlib
+encoder walks it all a second time. For a month of availability or a page of
+search results that walk costs more than the upstream work served from cache.
+FastJSONResponse is returned directly from handlers, so FastAPI skips the walk,
+and orjson encodes the content in one pass, reading Pydantic models straight
+from their field values.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Types orjson doesn't encode natively"""
+    if isinstance(obj, BaseModel):
+        # Field values without .dict()'s recursive copy; nested models come back here
+        return obj.__dict__
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode to JSON bytes, accepting Pydantic models anywhere in the content"""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson; return it from the handler to bypass jsonable_encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
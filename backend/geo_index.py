@@ -0,0 +1,214 @@
+"""
+Geohash grid over the campground catalog for "near me" searches
+
+Searches could only name a state or a rec area, so finding campgrounds near a
+city meant fanning out over several whole states and filtering nothing by
+distance. This index keeps every catalog campground with coordinates in an
+array sorted by geohash. Any geohash cell, at any precision, is a contiguous
+run of that array, so a radius or bounding-box query picks the finest
+precision at which a few dozen cells cover the area, bisects out each cell's
+run, then checks the exact distance or box and sorts by distance.
+"""
+import math
+import os
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from search_index import CatalogIndex
+
+# Campgrounds are stored at this precision (~150 m cells); queries use a prefix of it
+GEO_INDEX_PRECISION = 7
+# Cells a query may cover before it drops to a coarser precision
+GEO_INDEX_MAX_CELLS = 32
+GEO_SEARCH_DEFAULT_RADIUS_KM = float(os.getenv("GEO_SEARCH_DEFAULT_RADIUS_KM", "50"))
+GEO_SEARCH_MAX_RADIUS_KM = float(os.getenv("GEO_SEARCH_MAX_RADIUS_KM", "500"))
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+class InvalidProximityError(ValueError):
+    """Raised for coordinates, radius or bounding box that can't be searched"""
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int = GEO_INDEX_PRECISION) -> str:
+    """Standard base32 geohash of a point"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # longitude first
+    while len(chars) < precision:
+        value, span = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (span[0] + span[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            span[0] = mid
+        else:
+            span[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = bit_count = 0
+    return "".join(chars)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _cell_size(precision: int) -> Tuple[float, float]:
+    """(height, width) in degrees of a geohash cell"""
+    lat_bits = 5 * precision // 2
+    lon_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def _lon_ranges(west: float, east: float) -> List[Tuple[float, float]]:
+    """A longitude span as one or two ranges, split where it crosses the antimeridian"""
+    if west <= east:
+        return [(west, east)]
+    return [(west, 180.0), (-180.0, east)]
+
+
+class ProximityQuery:
+    """A point with a radius, or a bounding box with the point distances are measured from"""
+
+    def __init__(self, latitude: Optional[float] = None, longitude: Optional[float] = None,
+                 radius_km: Optional[float] = None, bbox: Optional[List[float]] = None):
+        if (latitude is None) != (longitude is None):
+            raise InvalidProximityError("latitude and longitude must be given together")
+        if latitude is not None and not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise InvalidProximityError("latitude must be within [-90, 90] and longitude within [-180, 180]")
+        self.bbox = None
+        if bbox:
+            if len(bbox) != 4:
+                raise InvalidProximityError("bbox must be [west, south, east, north]")
+            west, south, east, north = bbox
+            if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+                raise InvalidProximityError("bbox must be [west, south, east, north] in degrees with south <= north")
+            self.bbox = (west, south, east, north)
+            if latitude is None:
+                # Measure from the middle of the box, across the antimeridian if it wraps
+                center_lon = (west + (east if west <= east else east + 360)) / 2
+                latitude, longitude = (south + north) / 2, (center_lon + 180) % 360 - 180
+        elif latitude is None:
+            raise InvalidProximityError("A proximity search needs latitude and longitude, or a bbox")
+        if radius_km is not None and not 0 < radius_km <= GEO_SEARCH_MAX_RADIUS_KM:
+            raise InvalidProximityError(f"radius_km must be greater than 0 and at most {GEO_SEARCH_MAX_RADIUS_KM:g}")
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius_km = radius_km if radius_km is not None or self.bbox else GEO_SEARCH_DEFAULT_RADIUS_KM
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """(west, south, east, north) enclosing every match"""
+        if self.bbox is not None:
+            return self.bbox
+        d_lat = self.radius_km / KM_PER_DEGREE_LAT
+        south, north = max(-90.0, self.latitude - d_lat), min(90.0, self.latitude + d_lat)
+        # Degrees of longitude shrink towards the poles; size the box for the widest latitude in it
+        cos_lat = min(math.cos(math.radians(south)), math.cos(math.radians(north)))
+        if cos_lat < 1e-6 or self.radius_km / (KM_PER_DEGREE_LAT * cos_lat) >= 180.0:
+            return -180.0, south, 180.0, north
+        d_lon = self.radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+        west = (self.longitude - d_lon + 180) % 360 - 180
+        east = (self.longitude + d_lon + 180) % 360 - 180
+        return west, south, east, north
+
+    def contains(self, latitude: float, longitude: float, distance_km: float) -> bool:
+        if self.radius_km is not None and distance_km > self.radius_km:
+            return False
+        if self.bbox is not None:
+            west, south, east, north = self.bbox
+            if not south <= latitude <= north:
+                return False
+            return any(lo <= longitude <= hi for lo, hi in _lon_ranges(west, east))
+        return True
+
+
+class CampgroundGeoIndex(CatalogIndex):
+    """Catalog campgrounds sorted by geohash"""
+
+    def __init__(self):
+        super().__init__()
+        self._hashes: List[str] = []
+        # (latitude, longitude, entry), parallel to self._hashes
+        self._points: List[Tuple[float, float, Dict[str, Any]]] = []
+
+        self.queries = 0
+        self.cells_scanned = 0
+        self.candidates_checked = 0
+
+    def _compute(self, entries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        located = []
+        for entry in entries:
+            latitude, longitude = entry.get("latitude"), entry.get("longitude")
+            if latitude is None or longitude is None or (latitude == 0 and longitude == 0):
+                continue  # RIDB reports unknown coordinates as 0, 0
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                continue
+            located.append((geohash_encode(latitude, longitude), latitude, longitude, entry))
+        located.sort(key=lambda item: item[0])
+        return {
+            "_hashes": [item[0] for item in located],
+            "_points": [item[1:] for item in located],
+        }
+
+    @staticmethod
+    def covering_cells(west: float, south: float, east: float, north: float) -> List[str]:
+        """Geohash cells covering a box, at the finest precision needing at most GEO_INDEX_MAX_CELLS"""
+        lon_ranges = _lon_ranges(west, east)
+        for precision in range(GEO_INDEX_PRECISION, 0, -1):
+            height, width = _cell_size(precision)
+            rows = range(math.floor((south + 90) / height), math.floor((min(north, 90 - height / 2) + 90) / height) + 1)
+            column_ranges = [
+                range(math.floor((lo + 180) / width), math.floor((min(hi, 180 - width / 2) + 180) / width) + 1)
+                for lo, hi in lon_ranges
+            ]
+            if len(rows) * sum(len(columns) for columns in column_ranges) <= GEO_INDEX_MAX_CELLS or precision == 1:
+                return sorted({
+                    geohash_encode((row + 0.5) * height - 90, (column + 0.5) * width - 180, precision)
+                    for row in rows
+                    for columns in column_ranges
+                    for column in columns
+                })
+        return []
+
+    def search(self, query: ProximityQuery, limit: Optional[int] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """(entry, distance_km) for every campground matching the query, nearest first"""
+        self.queries += 1
+        matches = []
+        for cell in self.covering_cells(*query.bounds()):
+            self.cells_scanned += 1
+            # Every geohash starting with `cell` sorts between these bounds ("~" follows the base32 alphabet)
+            start, end = bisect_left(self._hashes, cell), bisect_left(self._hashes, cell + "~")
+            self.candidates_checked += end - start
+            for latitude, longitude, entry in self._points[start:end]:
+                distance = haversine_km(query.latitude, query.longitude, latitude, longitude)
+                if query.contains(latitude, longitude, distance):
+                    matches.append((entry, distance))
+        matches.sort(key=lambda match: (match[1], match[0]["name"]))
+        return matches[:limit] if limit is not None else matches
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size and query counters"""
+        return {
+            "campgrounds": len(self._hashes),
+            "version": self.version,
+            "rebuilds": self.rebuilds,
+            "queries": self.queries,
+            "cells_scanned": self.cells_scanned,
+            "candidates_checked": self.candidates_checked,
+        }
+
+
+campground_geo_index = CampgroundGeoIndex()
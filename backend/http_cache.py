@@ -0,0 +1,180 @@
+"""
+HTTP caching headers and conditional GET for the public read endpoints
+
+Search, availability, rec-area and dashboard responses went out without
+Cache-Control or ETag, so every browser refresh and every request through a
+CDN reached the backend in full. HTTPCacheMiddleware gives each matching GET
+route a Cache-Control policy (max-age plus stale-while-revalidate) and a strong
+ETag hashed from the body, and answers a matching If-None-Match with a bodiless
+304. Handlers that can name their data version cheaply (availability, dashboard
+stats) set a weak ETag themselves and return the 304 before building the body
+at all; the middleware keeps any ETag or Cache-Control a handler set, and
+leaves responses a handler marked no-store (partial or placeholder results)
+without an ETag.
+"""
+import hashlib
+import os
+import re
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() == "true"
+HTTP_CACHE_SEARCH_MAX_AGE = int(os.getenv("HTTP_CACHE_SEARCH_MAX_AGE", "300"))
+HTTP_CACHE_SEARCH_SWR = int(os.getenv("HTTP_CACHE_SEARCH_SWR", "600"))
+HTTP_CACHE_REC_AREAS_MAX_AGE = int(os.getenv("HTTP_CACHE_REC_AREAS_MAX_AGE", "3600"))
+HTTP_CACHE_REC_AREAS_SWR = int(os.getenv("HTTP_CACHE_REC_AREAS_SWR", "86400"))
+HTTP_CACHE_AVAILABILITY_MAX_AGE = int(os.getenv("HTTP_CACHE_AVAILABILITY_MAX_AGE", "60"))
+HTTP_CACHE_AVAILABILITY_SWR = int(os.getenv("HTTP_CACHE_AVAILABILITY_SWR", "60"))
+HTTP_CACHE_DASHBOARD_MAX_AGE = int(os.getenv("HTTP_CACHE_DASHBOARD_MAX_AGE", "5"))
+HTTP_CACHE_DASHBOARD_SWR = int(os.getenv("HTTP_CACHE_DASHBOARD_SWR", "30"))
+
+
+def strong_etag(body: bytes) -> str:
+    """ETag for exact response bytes"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def version_etag(*parts: Any) -> str:
+    """Weak ETag for a response identified by its parameters and data version, not its bytes"""
+    return 'W/"' + hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag, as conditional GET uses"""
+    if not if_none_match or not etag:
+        return False
+    opaque = etag.removeprefix("W/")
+    return any(
+        tag == "*" or tag.removeprefix("W/") == opaque
+        for tag in (tag.strip() for tag in if_none_match.split(","))
+    )
+
+
+class CachePolicy:
+    """Cache-Control for one route"""
+
+    def __init__(self, max_age: int, stale_while_revalidate: int = 0, public: bool = True):
+        self.max_age = max_age
+        self.stale_while_revalidate = stale_while_revalidate
+        self.public = public
+
+    @property
+    def header(self) -> str:
+        directives = ["public" if self.public else "private", f"max-age={self.max_age}"]
+        if self.stale_while_revalidate:
+            directives.append(f"stale-while-revalidate={self.stale_while_revalidate}")
+        return ", ".join(directives)
+
+
+class HTTPCache:
+    """Per-route cache policies and conditional GET counters shared by the middleware"""
+
+    def __init__(self, policies: List[Tuple[str, CachePolicy]]):
+        # (path regex, policy); the first match wins
+        self.policies: List[Tuple[Pattern, CachePolicy]] = [
+            (re.compile(pattern), policy) for pattern, policy in policies
+        ]
+
+        self.responses = 0
+        self.hashed = 0
+        self.not_modified = 0
+
+    def policy_for(self, path: str) -> Optional[CachePolicy]:
+        for pattern, policy in self.policies:
+            if pattern.fullmatch(path):
+                return policy
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return policy count and conditional GET counters"""
+        return {
+            "enabled": HTTP_CACHE_ENABLED,
+            "routes": len(self.policies),
+            "responses": self.responses,
+            "etags_hashed": self.hashed,
+            "not_modified": self.not_modified,
+        }
+
+
+class HTTPCacheMiddleware:
+    """ASGI middleware adding Cache-Control, ETags and 304s to GET routes with a policy"""
+
+    def __init__(self, app, cache: HTTPCache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        policy = self.cache.policy_for(scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+        if_none_match = Headers(scope=scope).get("if-none-match")
+
+        start_message = None
+        suppress_body = False
+
+        async def send_cached(message):
+            nonlocal start_message, suppress_body
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if message["status"] in (200, 304):
+                    self.cache.responses += 1
+                    if "cache-control" not in headers:
+                        headers["Cache-Control"] = policy.header
+                if message["status"] == 304:
+                    # Answered by the handler from its own version ETag
+                    self.cache.not_modified += 1
+                if message["status"] != 200 or "no-store" in headers.get("cache-control", ""):
+                    await send(message)
+                    return
+                if "etag" in headers:
+                    if etag_matches(if_none_match, headers["etag"]):
+                        # The handler named its version but built the body anyway
+                        suppress_body = True
+                        message = self._not_modified(message, headers)
+                    await send(message)
+                    return
+                # Hold the headers until the body can be hashed
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if suppress_body:
+                if not message.get("more_body", False):
+                    await send({"type": "http.response.body", "body": b""})
+                return
+            if start_message is None:
+                await send(message)
+                return
+            if message.get("more_body", False):
+                # Streaming: sent as is, without an ETag
+                await send(start_message)
+                start_message = None
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            etag = strong_etag(message.get("body", b""))
+            headers["ETag"] = etag
+            self.cache.hashed += 1
+            if etag_matches(if_none_match, etag):
+                await send(self._not_modified(start_message, headers))
+                await send({"type": "http.response.body", "body": b""})
+            else:
+                await send(start_message)
+                await send(message)
+            start_message = None
+
+        await self.app(scope, receive, send_cached)
+
+    def _not_modified(self, start_message: Dict[str, Any], headers: MutableHeaders) -> Dict[str, Any]:
+        self.cache.not_modified += 1
+        del headers["content-length"]
+        del headers["content-type"]
+        return {**start_message, "status": 304}
@@ -0,0 +1,148 @@
+"""
+Location text -> ranked candidate states
+
+Search used to try exact dictionary hits and then substring-scan every state,
+park and recreation area name, so two-letter codes matched inside words
+("ALMOND" -> AL) and "WEST VIRGINIA" could resolve to VA. The resolver compiles
+every known place name from a data file into a word trie once at import and
+matches whole words in a single pass over the query, preferring the longest
+phrases. New places are added to data/locations.json, not to code.
+"""
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+LOCATIONS_DATA_PATH = os.getenv(
+    "LOCATIONS_DATA_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "locations.json")
+)
+
+# How strongly a match of each kind points at its state, per matched word
+KIND_WEIGHTS = {
+    "abbreviations": 2.0,
+    "states": 3.0,
+    "national_parks": 4.0,
+    "recreation_areas": 4.0,
+}
+DEFAULT_KIND_WEIGHT = 4.0
+# Bonus when one place name is the entire query
+EXACT_MATCH_MULTIPLIER = 2.0
+
+_WORD_RE = re.compile(r"[A-Za-z0-9]+")
+
+
+def _words(text: str) -> List[str]:
+    return [word.upper() for word in _WORD_RE.findall(text or "")]
+
+
+class _TrieNode:
+    __slots__ = ("children", "places")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # (state, weight) for every place name ending at this node
+        self.places: List[Tuple[str, float]] = []
+
+
+class LocationResolver:
+    """Word trie over state names, state abbreviations, parks and recreation areas"""
+
+    def __init__(self):
+        self._root = _TrieNode()
+        self._abbreviations: Dict[str, str] = {}
+        self._state_names: Dict[str, List[str]] = {}
+        self.place_count = 0
+
+    @classmethod
+    def from_file(cls, path: str) -> "LocationResolver":
+        with open(path) as f:
+            return cls.from_data(json.load(f))
+
+    @classmethod
+    def from_data(cls, data: Dict[str, Dict[str, Any]]) -> "LocationResolver":
+        """
+        Build from {"states": {name: abbreviation}, <kind>: {place name: state or [states]}}.
+        Every section other than "states" is a kind of place weighted by KIND_WEIGHTS.
+        """
+        resolver = cls()
+        for name, abbreviation in data.get("states", {}).items():
+            resolver.add(name, abbreviation, "states")
+            resolver._state_names.setdefault(abbreviation.upper(), []).append(name.upper())
+            resolver._abbreviations[abbreviation.upper()] = abbreviation.upper()
+        for kind, places in data.items():
+            if kind == "states":
+                continue
+            for name, states in places.items():
+                for state in states if isinstance(states, list) else [states]:
+                    resolver.add(name, state, kind)
+        return resolver
+
+    def add(self, name: str, state: str, kind: str):
+        """Register a place name that points at a state"""
+        words = _words(name)
+        if not words:
+            return
+        node = self._root
+        for word in words:
+            node = node.children.setdefault(word, _TrieNode())
+        node.places.append((state.upper(), KIND_WEIGHTS.get(kind, DEFAULT_KIND_WEIGHT)))
+        self.place_count += 1
+
+    def _matches(self, raw_words: List[str]) -> List[Tuple[int, int, str, float]]:
+        """Every (start, end, state, weight) place name found in the query, including abbreviations"""
+        words = [word.upper() for word in raw_words]
+        matches = []
+        for start in range(len(words)):
+            node = self._root
+            for end in range(start, len(words)):
+                node = node.children.get(words[end])
+                if node is None:
+                    break
+                for state, weight in node.places:
+                    matches.append((start, end + 1, state, weight))
+
+            # Two-letter codes collide with ordinary words ("in", "or", "me"), so only
+            # count them when written in capitals or when they are the whole query
+            abbreviation = self._abbreviations.get(words[start])
+            if abbreviation and (raw_words[start].isupper() or len(words) == 1):
+                matches.append((start, start + 1, abbreviation, KIND_WEIGHTS["abbreviations"]))
+        return matches
+
+    def resolve(self, location: str) -> List[Tuple[str, float]]:
+        """Candidate states for a location, best first, as (state, score)"""
+        raw_words = _WORD_RE.findall(location or "")
+        if not raw_words:
+            return []
+
+        # Longest phrases win: "WEST VIRGINIA" hides the "VIRGINIA" inside it
+        matches = sorted(self._matches(raw_words), key=lambda m: (-(m[1] - m[0]), -m[3], m[0]))
+        covered: List[Tuple[int, int]] = []
+        scores: Dict[str, float] = {}
+        first_seen: Dict[str, int] = {}
+        for start, end, state, weight in matches:
+            if any(start < c_end and c_start < end for c_start, c_end in covered if (c_start, c_end) != (start, end)):
+                continue
+            covered.append((start, end))
+            score = weight * (end - start)
+            if end - start == len(raw_words):
+                score *= EXACT_MATCH_MULTIPLIER
+            scores[state] = scores.get(state, 0.0) + score
+            first_seen[state] = min(first_seen.get(state, start), start)
+
+        return sorted(scores.items(), key=lambda item: (-item[1], first_seen[item[0]]))
+
+    def resolve_state(self, location: str) -> Optional[str]:
+        """The single best state for a location, or None if nothing matched"""
+        candidates = self.resolve(location)
+        return candidates[0][0] if candidates else None
+
+    def state_words(self, state: str) -> List[str]:
+        """Words that name a state: its full name(s) and its abbreviation"""
+        words = [state.upper()]
+        for name in self._state_names.get(state.upper(), []):
+            words.extend(_words(name))
+        return words
+
+
+location_resolver = LocationResolver.from_file(LOCATIONS_DATA_PATH)
@@ -1,22 +1,32 @@
 """
 CampScout API Backend using camply library
 """
+import os
+import sys
+
+if __name__ == "__main__":
+    # Run as `python main.py`, this file would be __main__, and every spawned password
+    # worker re-imports __main__, repeating the startup work below (database, pools,
+    # caches) in each one. Serve through `python -m uvicorn` instead, whose workers don't.
+    os.execv(sys.executable, [
+        sys.executable, "-m", "uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000",
+        "--app-dir", os.path.dirname(os.path.abspath(__file__)),
+    ])
+
 from fastapi import FastAPI, HTTPException, Depends, status, Query, Response, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set, Tuple
 import asyncio
+import time
 from datetime import datetime, date, timedelta
 import logging
 import jwt
-import bcrypt
 import secrets
 import uuid
-import sqlite3
-import os
-from contextlib import contextmanager
+import re
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -28,7 +38,38 @@ logger = logging.getLogger(__name__)
 
 
 # Import camply for real campsite data
-from camply import RecreationDotGov, SearchRecreationDotGov, SearchWindow
+from camply import SearchWindow
+
+from provider_executor import provider_executor, ProviderBusyError, ProviderTimeoutError
+from provider_registry import provider_registry, PooledSearchRecreationDotGov
+from upstream_limiter import upstream_limiter, UpstreamUnavailableError
+from campground_catalog import campground_catalog, campground_to_entry, CATALOG_BACKGROUND_REFRESH, CATALOG_REFRESH_HOURS
+from search_index import campground_search_index, tokenize
+from geo_index import campground_geo_index, ProximityQuery, InvalidProximityError
+from location_resolver import location_resolver
+from rec_area_index import (
+    rec_area_index, rec_area_record, REC_AREA_INDEX_BACKGROUND_REFRESH, REC_AREA_AUTOCOMPLETE_LIMIT, REC_AREA_LIVE_MIN_LENGTH,
+)
+from availability_cache import availability_cache
+from shared_cache import LeaderLease, shared_store
+from tiered_cache import TieredCache
+from compact_availability import CompactAvailability
+from availability_snapshots import availability_snapshots, InvalidCursorError, ChangeSet
+from alert_hub import alert_hub, TooManyStreamsError, ALERT_HUB_HEARTBEAT_SECONDS, ALERT_HUB_REFRESH_SECONDS
+from stream_tickets import stream_tickets, InvalidTicketError, STREAM_TICKET_SECONDS
+from alert_engine import AlertEngine, ALERT_ENGINE_ENABLED, ALERT_ENGINE_LEASE_SECONDS
+from db_pool import SQLiteConnectionPool
+from token_cache import token_cache
+from password_hasher import password_hasher, PasswordQueueFullError
+from dashboard_stats import DashboardStats, DASHBOARD_STATS_REFRESH_SECONDS
+from fast_json import FastJSONResponse, dumps as json_dumps
+from compression import CompressionMiddleware, response_compressor, RESPONSE_COMPRESSION_ENABLED
+from http_cache import (
+    HTTPCache, HTTPCacheMiddleware, CachePolicy, version_etag, etag_matches, HTTP_CACHE_ENABLED,
+    HTTP_CACHE_SEARCH_MAX_AGE, HTTP_CACHE_SEARCH_SWR, HTTP_CACHE_REC_AREAS_MAX_AGE, HTTP_CACHE_REC_AREAS_SWR,
+    HTTP_CACHE_AVAILABILITY_MAX_AGE, HTTP_CACHE_AVAILABILITY_SWR, HTTP_CACHE_DASHBOARD_MAX_AGE, HTTP_CACHE_DASHBOARD_SWR,
+)
+from repository import Database, UserRepository, AlertRepository, StatsRepository, UPDATABLE_ALERT_FIELDS
 
 class RecAreaSearchRequest(BaseModel):
     search_string: str
@@ -48,6 +89,37 @@ ACCESS_TOKEN_EXPIRE_HOURS = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_HOURS", "24")
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", "30"))
 DATABASE_PATH = os.getenv("DATABASE_PATH", "campscout.db")
 
+# Batch availability: campgrounds per request and how many are fetched at once
+BATCH_AVAILABILITY_MAX_CAMPGROUNDS = int(os.getenv("BATCH_AVAILABILITY_MAX_CAMPGROUNDS", "25"))
+BATCH_AVAILABILITY_CONCURRENCY = int(os.getenv("BATCH_AVAILABILITY_CONCURRENCY", "5"))
+
+# Availability response formats: per-site-date dicts, or site metadata once with date ranges
+AVAILABILITY_FORMATS = ("full", "compact")
+
+# Multi-state location search fan-out
+SEARCH_FANOUT_CONCURRENCY = int(os.getenv("SEARCH_FANOUT_CONCURRENCY", "6"))
+SEARCH_FANOUT_DEADLINE_SECONDS = float(os.getenv("SEARCH_FANOUT_DEADLINE_SECONDS", "20"))
+
+# Two-tier caches of catalog downloads (per state and per rec area) and rec-area lookups
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "200"))
+REC_AREA_CACHE_TTL_SECONDS = float(os.getenv("REC_AREA_CACHE_TTL_SECONDS", "86400"))
+REC_AREA_CACHE_MAX_ENTRIES = int(os.getenv("REC_AREA_CACHE_MAX_ENTRIES", "1000"))
+
+catalog_cache = TieredCache(
+    namespace="catalog",
+    version=2,
+    ttl_seconds=CATALOG_REFRESH_HOURS * 3600,
+    max_entries=CATALOG_CACHE_MAX_ENTRIES,
+    shared=shared_store,
+)
+rec_area_cache = TieredCache(
+    namespace="rec-areas",
+    version=2,
+    ttl_seconds=REC_AREA_CACHE_TTL_SECONDS,
+    max_entries=REC_AREA_CACHE_MAX_ENTRIES,
+    shared=shared_store,
+)
+
 # CORS Configuration
 CORS_ORIGINS_ENV = os.getenv("CORS_ORIGINS", "https://campscout-demo.surge.sh")
 CORS_ORIGINS = [origin.strip() for origin in CORS_ORIGINS_ENV.split(",")]
@@ -66,13 +138,28 @@ app.add_middleware(
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH", "HEAD"],
     allow_headers=["*"],
 )
+# Cache-Control, ETags and 304s for the public GET endpoints, so browsers and a CDN can reuse responses
+http_cache = HTTPCache([
+    (r"/api/search", CachePolicy(HTTP_CACHE_SEARCH_MAX_AGE, HTTP_CACHE_SEARCH_SWR)),
+    (r"/api/rec-areas(/autocomplete)?", CachePolicy(HTTP_CACHE_REC_AREAS_MAX_AGE, HTTP_CACHE_REC_AREAS_SWR)),
+    (r"/api/campgrounds/[^/]+/availability", CachePolicy(HTTP_CACHE_AVAILABILITY_MAX_AGE, HTTP_CACHE_AVAILABILITY_SWR)),
+    (r"/api/dashboard/stats", CachePolicy(HTTP_CACHE_DASHBOARD_MAX_AGE, HTTP_CACHE_DASHBOARD_SWR)),
+])
+if HTTP_CACHE_ENABLED:
+    app.add_middleware(HTTPCacheMiddleware, cache=http_cache)
+# gzip/brotli for large response bodies, negotiated from Accept-Encoding (outermost, after ETags are set)
+if RESPONSE_COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, compressor=response_compressor)
 
 # Security
 security = HTTPBearer()
 
+# Long-lived WAL connections shared across requests
+db_pool = SQLiteConnectionPool(DATABASE_PATH)
+
 def init_database():
     """Initialize SQLite database with required tables"""
-    with sqlite3.connect(DATABASE_PATH) as conn:
+    with db_pool.writer() as conn:
         cursor = conn.cursor()
         
         # Users table
@@ -103,18 +190,141 @@ def init_database():
             )
         """)
         
+        migrate_database(conn)
+        
         conn.commit()
         logger.info("Database initialized successfully")
 
-@contextmanager
-def get_db_connection():
-    """Get database connection with context manager"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row  # Enable dict-like access
-    try:
-        yield conn
-    finally:
-        conn.close()
+def _table_columns(cursor, table: str) -> List[str]:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+def _migration_001_alert_campground_id(cursor):
+    """Store campground_id and a real updated_at on alerts, index the hot alert queries"""
+    columns = _table_columns(cursor, "alerts")
+    if "campground_id" not in columns:
+        cursor.execute("ALTER TABLE alerts ADD COLUMN campground_id TEXT")
+    if "updated_at" not in columns:
+        cursor.execute("ALTER TABLE alerts ADD COLUMN updated_at TIMESTAMP")
+        cursor.execute("UPDATE alerts SET updated_at = created_at WHERE updated_at IS NULL")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_alerts_user_active_created
+        ON alerts (user_id, is_active, created_at)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_alerts_campground_active
+        ON alerts (campground_id, is_active)
+    """)
+
+def _migration_002_dashboard_counters(cursor):
+    """Counters for the public dashboard, kept current by triggers in the writing transaction"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_registrations (
+            day TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    # Start from the current totals
+    cursor.execute("""
+        INSERT OR REPLACE INTO counters (name, value)
+        SELECT 'total_users', COUNT(*) FROM users
+    """)
+    cursor.execute("""
+        INSERT OR REPLACE INTO counters (name, value)
+        SELECT 'total_active_alerts', COUNT(*) FROM alerts WHERE is_active = 1
+    """)
+    cursor.execute("""
+        INSERT OR REPLACE INTO daily_registrations (day, count)
+        SELECT substr(created_at, 1, 10), COUNT(*) FROM users
+        WHERE created_at IS NOT NULL GROUP BY substr(created_at, 1, 10)
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_users_insert_counters AFTER INSERT ON users
+        BEGIN
+            UPDATE counters SET value = value + 1 WHERE name = 'total_users';
+            INSERT OR IGNORE INTO daily_registrations (day, count) VALUES (substr(NEW.created_at, 1, 10), 0);
+            UPDATE daily_registrations SET count = count + 1 WHERE day = substr(NEW.created_at, 1, 10);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_users_delete_counters AFTER DELETE ON users
+        BEGIN
+            UPDATE counters SET value = value - 1 WHERE name = 'total_users';
+            UPDATE daily_registrations SET count = count - 1 WHERE day = substr(OLD.created_at, 1, 10);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_insert_counters AFTER INSERT ON alerts
+        WHEN NEW.is_active = 1
+        BEGIN
+            UPDATE counters SET value = value + 1 WHERE name = 'total_active_alerts';
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_update_counters AFTER UPDATE OF is_active ON alerts
+        WHEN (OLD.is_active = 1) != (NEW.is_active = 1)
+        BEGIN
+            UPDATE counters SET value = value + (CASE WHEN NEW.is_active = 1 THEN 1 ELSE -1 END)
+            WHERE name = 'total_active_alerts';
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_delete_counters AFTER DELETE ON alerts
+        WHEN OLD.is_active = 1
+        BEGIN
+            UPDATE counters SET value = value - 1 WHERE name = 'total_active_alerts';
+        END
+    """)
+
+def _migration_003_alert_notified_stays(cursor):
+    """Remember which stays each alert has notified, so restarts and leader changes don't repeat them"""
+    if "notified_stays" not in _table_columns(cursor, "alerts"):
+        cursor.execute("ALTER TABLE alerts ADD COLUMN notified_stays TEXT")
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version
+MIGRATIONS = [
+    _migration_001_alert_campground_id,
+    _migration_002_dashboard_counters,
+    _migration_003_alert_notified_stays,
+]
+
+def migrate_database(conn):
+    """Apply any schema migrations the database hasn't seen yet"""
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA user_version")
+    current_version = cursor.fetchone()[0]
+    for version, migration in enumerate(MIGRATIONS, start=1):
+        if version > current_version:
+            logger.info(f"Applying database migration {version}: {migration.__name__}")
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+
+async def backfill_alert_campground_ids():
+    """Fill campground_id on alerts created before the column existed, using the catalog"""
+    updates = []
+    for alert_id, campground_name in await alert_repository.list_missing_campground_id():
+        campground_id = resolve_alert_campground_id({"campground_name": campground_name})
+        if campground_id:
+            updates.append((campground_id, alert_id))
+    if updates:
+        await alert_repository.set_campground_ids(updates)
+        logger.info(f"Backfilled campground_id on {len(updates)} alerts")
+
+# Async data access - handlers go through these repositories, never a raw connection
+database = Database(db_pool)
+user_repository = UserRepository(database)
+user_repository.add_change_listener(token_cache.invalidate_user)
+alert_repository = AlertRepository(database)
+stats_repository = StatsRepository(database)
+dashboard_stats = DashboardStats(load=stats_repository.dashboard_counts, refresh_seconds=DASHBOARD_STATS_REFRESH_SECONDS)
 
 # Initialize database on startup
 init_database()
@@ -146,12 +356,23 @@ class CampsiteSearchRequest(BaseModel):
     weekend_only: Optional[bool] = False
     limit: Optional[int] = 20
     rec_area_id: Optional[List[str]] = []
+    # Proximity search: a point with a radius, and/or a [west, south, east, north] box
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    radius_km: Optional[float] = None
+    bbox: Optional[List[float]] = None
 
 class AvailabilityRequest(BaseModel):
     start_date: str
     end_date: str
     nights: int = 1
 
+class BatchAvailabilityRequest(BaseModel):
+    campground_ids: List[str]
+    start_date: str
+    end_date: str
+    nights: int = 1
+
 class CampsiteInfo(BaseModel):
     id: str
     name: str
@@ -165,6 +386,7 @@ class CampsiteInfo(BaseModel):
     email: Optional[str] = ""
     reservation_url: Optional[str] = ""
     recreation_gov_id: Optional[str] = ""
+    distance_km: Optional[float] = None
 
 class AlertCreate(BaseModel):
     start_date: str
@@ -185,15 +407,25 @@ class Alert(BaseModel):
     updated_at: datetime
 
 # Helper functions
-def hash_password(password: str) -> str:
-    """Hash password using bcrypt"""
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
+async def hash_password(password: str) -> str:
+    """Hash password using bcrypt on the password worker processes"""
+    return await password_hasher.hash(password)
 
-def verify_password(password: str, hashed: str) -> bool:
-    """Verify password against bcrypt hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+async def verify_password(password: str, hashed: str) -> bool:
+    """Verify password against bcrypt hash on the password worker processes"""
+    return await password_hasher.verify(password, hashed)
+
+async def rehash_password(user_id: str, password: str):
+    """Re-hash a password at the current work factor after a successful login"""
+    try:
+        await user_repository.update_password(user_id, await password_hasher.rehash(password))
+        logger.info(f"Rehashed password for user {user_id} at cost {password_hasher.rounds}")
+    except Exception as e:
+        logger.error(f"Password rehash failed for user {user_id}: {str(e)}")
+
+def password_queue_full(e: PasswordQueueFullError) -> HTTPException:
+    """429 response asking the client to back off while password workers are saturated"""
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
@@ -206,35 +438,26 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Get current user from JWT token"""
+async def authenticate_token(token: str) -> dict:
+    """Verify a JWT access token and return its user, raising 401 otherwise"""
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        # Tokens verified earlier are served from memory until they expire
+        user = token_cache.get(token)
+        if user is not None:
+            return user
+        
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
         
         # Query user from database
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, first_name, last_name, email, created_at 
-                FROM users WHERE id = ?
-            """, (user_id,))
-            user_row = cursor.fetchone()
-            
-            if user_row is None:
-                raise HTTPException(status_code=401, detail="User not found")
-            
-            # Convert to dict for easier access
-            user = {
-                "id": user_row["id"],
-                "first_name": user_row["first_name"],
-                "last_name": user_row["last_name"],
-                "email": user_row["email"],
-                "created_at": user_row["created_at"]
-            }
-            return user
+        user = await user_repository.get_by_id(user_id)
+        if user is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        
+        token_cache.put(token, user, payload["exp"])
+        return user
             
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
@@ -242,6 +465,57 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         logger.error(f"Error getting current user: {str(e)}")
         raise HTTPException(status_code=401, detail="Authentication failed")
 
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Get current user from JWT token"""
+    return await authenticate_token(credentials.credentials)
+
+@app.on_event("startup")
+async def build_provider_registry():
+    """Create the shared Recreation.gov providers and their keep-alive session"""
+    await provider_executor.run(provider_registry.build)
+
+@app.on_event("startup")
+async def start_campground_catalog():
+    """Load the campground catalog and keep it refreshed in the background"""
+    campground_catalog.load()
+    await backfill_alert_campground_ids()
+    if CATALOG_BACKGROUND_REFRESH:
+        asyncio.create_task(campground_catalog.run_refresh_loop(refresh_catalog_state))
+
+@app.on_event("startup")
+async def start_rec_area_index():
+    """Seed the rec-area autocomplete index state by state in the background"""
+    if REC_AREA_INDEX_BACKGROUND_REFRESH:
+        asyncio.create_task(rec_area_index.run_refresh_loop(seed_rec_area_state))
+
+@app.on_event("startup")
+async def start_alert_engine():
+    """Start background evaluation of active alerts"""
+    if ALERT_ENGINE_ENABLED:
+        asyncio.create_task(alert_engine.run_forever())
+
+@app.on_event("shutdown")
+async def release_alert_engine_lease():
+    """Hand alert evaluation to another worker straight away"""
+    if alert_engine.leader_lease is not None:
+        await alert_engine.leader_lease.release()
+
+@app.on_event("shutdown")
+async def shutdown_provider_executor():
+    """Release provider worker threads and pooled HTTP connections on shutdown"""
+    provider_executor.shutdown()
+    provider_registry.close()
+
+@app.on_event("shutdown")
+async def shutdown_password_hasher():
+    """Stop password worker processes on shutdown"""
+    password_hasher.shutdown()
+
+@app.on_event("shutdown")
+async def close_database():
+    """Stop database threads and close pooled connections on shutdown"""
+    database.shutdown()
+
 # Health endpoints
 @app.get("/")
 async def root():
@@ -257,6 +531,34 @@ async def health_check():
         "service": "campscout-api"
     }
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Internal runtime metrics for monitoring"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "provider_pool": provider_executor.stats(),
+        "provider_registry": provider_registry.stats(),
+        "upstream_limiter": upstream_limiter.stats(),
+        "campground_catalog": campground_catalog.stats(),
+        "search_index": campground_search_index.stats(),
+        "geo_index": campground_geo_index.stats(),
+        "availability_cache": availability_cache.stats(),
+        "catalog_cache": catalog_cache.stats(),
+        "rec_area_cache": rec_area_cache.stats(),
+        "rec_area_index": rec_area_index.stats(),
+        "shared_cache": shared_store.stats() if shared_store is not None else None,
+        "availability_snapshots": availability_snapshots.stats(),
+        "alert_engine": alert_engine.stats(),
+        "alert_hub": alert_hub.stats(),
+        "stream_tickets": stream_tickets.stats(),
+        "database": db_pool.stats(),
+        "token_cache": token_cache.stats(),
+        "dashboard_stats": dashboard_stats.stats(),
+        "http_cache": http_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "response_compression": response_compressor.stats()
+    }
+
 @app.get("/api/cors-test")
 async def cors_test(request: Request, test_param: str = Query(default="default")):
     """Test CORS configuration"""
@@ -302,56 +604,52 @@ async def cors_bypass_test():
 async def register(user_data: UserRegister):
     """Register a new user"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Check if user already exists
-            cursor.execute("SELECT id FROM users WHERE email = ?", (user_data.email,))
-            if cursor.fetchone():
-                raise HTTPException(status_code=400, detail="Email already registered")
-            
-            # Create new user
-            user_id = str(uuid.uuid4())
-            hashed_password = hash_password(user_data.password)
-            
-            # Insert user into database
-            cursor.execute("""
-                INSERT INTO users (id, first_name, last_name, email, password, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                user_id,
-                user_data.first_name,
-                user_data.last_name,
-                user_data.email,
-                hashed_password,
-                datetime.utcnow().isoformat()
-            ))
-            
-            conn.commit()
-            
-            # Create tokens
-            access_token = create_access_token(data={"sub": user_id})
-            refresh_token = create_access_token(data={"sub": user_id}, expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
-            
-            # Return user data without password
-            user_response = User(
-                id=user_id,
-                first_name=user_data.first_name,
-                last_name=user_data.last_name,
-                email=user_data.email,
-                created_at=datetime.utcnow()
-            )
-            
-            logger.info(f"User registered successfully: {user_data.email}")
-            
-            return {
-                "access_token": access_token,
-                "refresh_token": refresh_token,
-                "user": user_response
-            }
+        # Check if user already exists
+        if await user_repository.email_exists(user_data.email):
+            raise HTTPException(status_code=400, detail="Email already registered")
+        
+        # Create new user
+        user_id = str(uuid.uuid4())
+        hashed_password = await hash_password(user_data.password)
+        created_at = datetime.utcnow()
+        
+        # Insert user into database
+        created = await user_repository.create({
+            "id": user_id,
+            "first_name": user_data.first_name,
+            "last_name": user_data.last_name,
+            "email": user_data.email,
+            "password": hashed_password,
+            "created_at": created_at.isoformat()
+        })
+        if not created:
+            raise HTTPException(status_code=400, detail="Email already registered")
+        
+        # Create tokens
+        access_token = create_access_token(data={"sub": user_id})
+        refresh_token = create_access_token(data={"sub": user_id}, expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+        
+        # Return user data without password
+        user_response = User(
+            id=user_id,
+            first_name=user_data.first_name,
+            last_name=user_data.last_name,
+            email=user_data.email,
+            created_at=created_at
+        )
+        
+        logger.info(f"User registered successfully: {user_data.email}")
+        
+        return {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "user": user_response
+        }
         
     except HTTPException:
         raise
+    except PasswordQueueFullError as e:
+        raise password_queue_full(e)
     except Exception as e:
         logger.error(f"Registration error: {str(e)}")
         raise HTTPException(status_code=500, detail="Registration failed")
@@ -360,43 +658,41 @@ async def register(user_data: UserRegister):
 async def login(login_data: UserLogin):
     """Login user"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Find user by email
-            cursor.execute("""
-                SELECT id, first_name, last_name, email, password, created_at 
-                FROM users WHERE email = ?
-            """, (login_data.email,))
-            
-            user_row = cursor.fetchone()
-            
-            if not user_row or not verify_password(login_data.password, user_row["password"]):
-                raise HTTPException(status_code=401, detail="Invalid email or password")
-            
-            # Create tokens
-            access_token = create_access_token(data={"sub": user_row["id"]})
-            refresh_token = create_access_token(data={"sub": user_row["id"]}, expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
-            
-            # Return user data without password
-            user_response = User(
-                id=user_row["id"],
-                first_name=user_row["first_name"],
-                last_name=user_row["last_name"],
-                email=user_row["email"],
-                created_at=datetime.fromisoformat(user_row["created_at"])
-            )
-            
-            logger.info(f"User logged in successfully: {login_data.email}")
-            
-            return {
-                "access_token": access_token,
-                "refresh_token": refresh_token,
-                "user": user_response
-            }
+        # Find user by email
+        user_row = await user_repository.get_by_email(login_data.email)
+        
+        if not user_row or not await verify_password(login_data.password, user_row["password"]):
+            raise HTTPException(status_code=401, detail="Invalid email or password")
+        
+        # Upgrade hashes made with a different work factor without making the user wait
+        if password_hasher.needs_rehash(user_row["password"]):
+            asyncio.create_task(rehash_password(user_row["id"], login_data.password))
+        
+        # Create tokens
+        access_token = create_access_token(data={"sub": user_row["id"]})
+        refresh_token = create_access_token(data={"sub": user_row["id"]}, expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+        
+        # Return user data without password
+        user_response = User(
+            id=user_row["id"],
+            first_name=user_row["first_name"],
+            last_name=user_row["last_name"],
+            email=user_row["email"],
+            created_at=datetime.fromisoformat(user_row["created_at"])
+        )
+        
+        logger.info(f"User logged in successfully: {login_data.email}")
+        
+        return {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "user": user_response
+        }
         
     except HTTPException:
         raise
+    except PasswordQueueFullError as e:
+        raise password_queue_full(e)
     except Exception as e:
         logger.error(f"Login error: {str(e)}")
         raise HTTPException(status_code=500, detail="Login failed")
@@ -431,110 +727,89 @@ async def google_auth(google_token: dict):
             logger.error(f"Invalid Google token: {str(e)}")
             raise HTTPException(status_code=401, detail="Invalid Google token")
         
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Check if user already exists
-            cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
-            existing_user = cursor.fetchone()
-            
-            if existing_user:
-                # User exists, log them in
-                user_id = existing_user["id"]
-                user_data = {
-                    "id": user_id,
-                    "first_name": existing_user["first_name"],
-                    "last_name": existing_user["last_name"],
-                    "email": existing_user["email"],
-                    "created_at": existing_user["created_at"]
-                }
-            else:
-                # Create new user
-                user_id = str(uuid.uuid4())
-                cursor.execute("""
-                    INSERT INTO users (id, first_name, last_name, email, password, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    user_id,
-                    first_name,
-                    last_name,
-                    email,
-                    hash_password(f"google_oauth_{google_user_id}"),  # Dummy password for OAuth users
-                    datetime.utcnow().isoformat()
-                ))
-                conn.commit()
-                
-                user_data = {
-                    "id": user_id,
-                    "first_name": first_name,
-                    "last_name": last_name,
-                    "email": email,
-                    "created_at": datetime.utcnow().isoformat()
-                }
-            
-            # Create tokens
-            access_token = create_access_token(data={"sub": user_id})
-            refresh_token = create_access_token(data={"sub": user_id}, expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
-            
-            # Return user data with tokens
-            user_response = User(
-                id=user_data["id"],
-                first_name=user_data["first_name"],
-                last_name=user_data["last_name"],
-                email=user_data["email"],
-                created_at=datetime.fromisoformat(user_data["created_at"]) if isinstance(user_data["created_at"], str) else user_data["created_at"]
-            )
-            
-            logger.info(f"Google OAuth successful for user: {email}")
-            
-            return {
-                "access_token": access_token,
-                "refresh_token": refresh_token,
-                "user": user_response
+        # Check if user already exists
+        existing_user = await user_repository.get_by_email(email)
+        
+        if existing_user:
+            # User exists, log them in
+            user_id = existing_user["id"]
+            user_data = {
+                "id": user_id,
+                "first_name": existing_user["first_name"],
+                "last_name": existing_user["last_name"],
+                "email": existing_user["email"],
+                "created_at": existing_user["created_at"]
             }
-            
+        else:
+            # Create new user
+            user_id = str(uuid.uuid4())
+            user_data = {
+                "id": user_id,
+                "first_name": first_name,
+                "last_name": last_name,
+                "email": email,
+                "created_at": datetime.utcnow().isoformat()
+            }
+            created = await user_repository.create({
+                **user_data,
+                "password": await hash_password(f"google_oauth_{google_user_id}")  # Dummy password for OAuth users
+            })
+            if not created:
+                # Registered concurrently - log in as the existing user
+                existing_user = await user_repository.get_by_email(email)
+                user_id = existing_user["id"]
+                user_data = {key: existing_user[key] for key in ("id", "first_name", "last_name", "email", "created_at")}
+        
+        # Create tokens
+        access_token = create_access_token(data={"sub": user_id})
+        refresh_token = create_access_token(data={"sub": user_id}, expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+        
+        # Return user data with tokens
+        user_response = User(
+            id=user_data["id"],
+            first_name=user_data["first_name"],
+            last_name=user_data["last_name"],
+            email=user_data["email"],
+            created_at=datetime.fromisoformat(user_data["created_at"]) if isinstance(user_data["created_at"], str) else user_data["created_at"]
+        )
+        
+        logger.info(f"Google OAuth successful for user: {email}")
+        
+        return {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "user": user_response
+        }
+        
     except HTTPException:
         raise
+    except PasswordQueueFullError as e:
+        raise password_queue_full(e)
     except Exception as e:
         logger.error(f"Google OAuth error: {str(e)}")
         raise HTTPException(status_code=500, detail="Google authentication failed")
 
 # Public dashboard endpoint (no authentication required)
 @app.get("/api/dashboard/stats")
-async def get_dashboard_stats():
-    """Get public dashboard statistics"""
+async def get_dashboard_stats(request: Request):
+    """Get public dashboard statistics (snapshot refreshed every few seconds, supports If-None-Match)"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Get total users count
-            cursor.execute("SELECT COUNT(*) as count FROM users")
-            total_users = cursor.fetchone()["count"]
-            
-            # Get total alerts count
-            cursor.execute("SELECT COUNT(*) as count FROM alerts WHERE is_active = 1")
-            total_alerts = cursor.fetchone()["count"]
-            
-            # Get recent registrations (last 7 days)
-            cursor.execute("""
-                SELECT COUNT(*) as count FROM users 
-                WHERE created_at >= datetime('now', '-7 days')
-            """)
-            recent_users = cursor.fetchone()["count"]
-            
-            return {
-                "success": True,
-                "data": {
-                    "total_users": total_users,
-                    "total_active_alerts": total_alerts,
-                    "recent_registrations": recent_users,
-                    "service_status": "operational",
-                    "last_updated": datetime.utcnow().isoformat()
-                }
+        snapshot = await dashboard_stats.get()
+        headers = {"ETag": snapshot.etag}
+        if dashboard_stats.matches(snapshot, request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        return FastJSONResponse({
+            "success": True,
+            "data": {
+                **snapshot.counts,
+                "service_status": "operational",
+                "last_updated": snapshot.updated_at
             }
+        }, headers=headers)
     except Exception as e:
         logger.error(f"Error fetching dashboard stats: {str(e)}")
-        return {
+        # Zeros aren't real stats; keep them out of browser and CDN caches
+        return JSONResponse({
             "success": True,
             "data": {
                 "total_users": 0,
@@ -543,7 +818,7 @@ async def get_dashboard_stats():
                 "service_status": "operational",
                 "last_updated": datetime.utcnow().isoformat()
             }
-        }
+        }, headers={"Cache-Control": "no-store"})
 
 @app.get("/api/auth/me")
 async def get_current_user_info(current_user: dict = Depends(get_current_user)):
@@ -557,73 +832,234 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     )
     return {"user": user_response}
 
+# Blocking camply calls - always run these through provider_executor
+def _find_campground_entries(state: Optional[str] = None, **kwargs) -> List[Dict[str, Any]]:
+    """Find campgrounds with the shared RecreationDotGov provider, as catalog entries (blocking)"""
+    facilities = provider_registry.campgrounds.find_campground_facilities(state=state, **kwargs)
+    return [campground_to_entry(cg, state, facility) for facility, cg in facilities]
+
+def _download_state_entries(state: str) -> List[Dict[str, Any]]:
+    """Download a state's campgrounds as catalog entries (blocking)"""
+    return _find_campground_entries(state=state.upper())
+
+def _download_rec_area_entries(rec_area_id: int) -> List[Dict[str, Any]]:
+    """Download a recreation area's campgrounds as catalog entries (blocking)"""
+    return _find_campground_entries(rec_area_id=rec_area_id)
+
+def _find_campground_by_id(campground_id: str) -> List[Dict[str, Any]]:
+    """Fetch a single campground and store it in the catalog (blocking)"""
+    return campground_catalog.upsert_entries(_find_campground_entries(campground_id=int(campground_id)))
+
+def _find_rec_areas(search_string: Optional[str] = None, state: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Look up recreation areas by search string and/or state (blocking)"""
+    results = provider_registry.rec_areas.find_recreation_areas(search_string=search_string, state=state)
+    return [rec_area_record(rec_area) for rec_area in results]
+
+def _fetch_available_sites(campground_id: int, start_dt: date, end_dt: date, nights: int) -> list:
+    """Fetch available campsites for one campground (blocking)"""
+    search_window = SearchWindow(
+        start_date=start_dt,
+        end_date=end_dt
+    )
+    searcher = PooledSearchRecreationDotGov(
+        search_window=search_window,
+        campgrounds=[campground_id],
+        nights=nights
+    )
+    return searcher.get_all_campsites()
+
+def site_to_availability_dict(site: Any, nights: int) -> Dict[str, Any]:
+    """Convert a camply AvailableCampsite to our availability format"""
+    booking_date = getattr(site, 'booking_date', None)
+    booking_end_date = getattr(site, 'booking_end_date', None)
+    
+    # Extract permitted equipment list
+    permitted_equipment = getattr(site, 'permitted_equipment', [])
+    if isinstance(permitted_equipment, str):
+        permitted_equipment = [permitted_equipment]
+    elif not isinstance(permitted_equipment, list):
+        permitted_equipment = []
+    
+    # Get campsite occupancy (min, max)
+    occupancy = getattr(site, 'campsite_occupancy', None)
+    if occupancy and hasattr(occupancy, '__iter__') and len(occupancy) >= 2:
+        occupancy_min, occupancy_max = occupancy[0], occupancy[1]
+    else:
+        occupancy_min, occupancy_max = None, None
+    
+    return {
+        "campsite_id": getattr(site, 'campsite_id', ''),
+        "campsite_title": getattr(site, 'campsite_title', ''),
+        "campsite_site_name": getattr(site, 'campsite_site_name', ''),
+        "campsite_loop_name": getattr(site, 'campsite_loop_name', ''),
+        "campsite_type": getattr(site, 'campsite_type', ''),
+        "campsite_use_type": getattr(site, 'campsite_use_type', ''),
+        "booking_date": str(booking_date) if booking_date else '',
+        "booking_end_date": str(booking_end_date) if booking_end_date else '',
+        "booking_nights": getattr(site, 'booking_nights', nights),
+        "booking_url": getattr(site, 'booking_url', ''),
+        "recreation_area": getattr(site, 'recreation_area', ''),
+        "recreation_area_id": getattr(site, 'recreation_area_id', ''),
+        "facility_name": getattr(site, 'facility_name', ''),
+        "facility_id": getattr(site, 'facility_id', ''),
+        "availability_status": getattr(site, 'availability_status', 'Available'),
+        "permitted_equipment": permitted_equipment,
+        "campsite_occupancy_min": occupancy_min,
+        "campsite_occupancy_max": occupancy_max
+    }
+
+def _fetch_month_availability(campground_id: int, month_start: date, nights: int) -> CompactAvailability:
+    """Fetch one calendar month of availability in compact form (blocking)"""
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    # Let stays that start late in the month run into the next one
+    window_start = max(month_start, date.today())
+    window_end = next_month + timedelta(days=nights - 1)
+    available_sites = _fetch_available_sites(campground_id, window_start, window_end, nights)
+
+    # Only keep stays that start this month; later ones belong to the next month's entry
+    month_end_str = next_month.isoformat()
+    return CompactAvailability.from_dicts((
+        site_dict for site_dict in (site_to_availability_dict(site, nights) for site in available_sites)
+        if site_dict["booking_date"] and site_dict["booking_date"][:10] < month_end_str
+    ), nights)
+
+async def record_month_availability(cache_key: Tuple[str, str, int], month_sites: CompactAvailability, age: float):
+    """Record what changed in a month since it was last seen, whether this worker fetched it or another did"""
+    campground_id, month, _ = cache_key
+    change = availability_snapshots.record(campground_id, date.fromisoformat(f"{month}-01"), month_sites)
+    if change is not None and alert_hub.is_watched(campground_id):
+        alert_hub.publish(campground_id, availability_change_event(campground_id, change))
+
+def availability_change_event(campground_id: str, change: ChangeSet) -> Dict[str, Any]:
+    """Stream event for stays that opened or were booked in one refresh"""
+    return {
+        "event": "availability",
+        "data": {
+            "campground_id": str(campground_id),
+            "nights": change.opened.nights,
+            "cursor": availability_snapshots.format_cursor(change.cursor),
+            "opened": change.opened.to_json(),
+            "booked": change.booked.to_json(),
+            "total_opened": len(change.opened),
+            "total_booked": len(change.booked),
+        }
+    }
+
+def iter_month_starts(start_dt: date, end_dt: date) -> List[date]:
+    """First day of every calendar month overlapping [start_dt, end_dt)"""
+    months = []
+    month = start_dt.replace(day=1)
+    while month < end_dt:
+        months.append(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+    return months
+
+async def get_campground_availability(campground_id: str, start_dt: date, end_dt: date, nights: int):
+    """
+    Availability for stays starting in [start_dt, end_dt), assembled from cached
+    per-month fetches. Returns (CompactAvailability, age_seconds of the oldest month used).
+    """
+    today = date.today()
+    sites = CompactAvailability(nights)
+    oldest_age = 0.0
+    for month_start in iter_month_starts(start_dt, end_dt):
+        if (month_start + timedelta(days=32)).replace(day=1) <= today:
+            continue  # Entirely in the past, nothing bookable
+
+        cache_key = (str(campground_id), month_start.strftime("%Y-%m"), nights)
+        try:
+            month_sites, age = await availability_cache.get_or_fetch(
+                cache_key,
+                lambda month_start=month_start: provider_executor.run(
+                    _fetch_month_availability, int(campground_id), month_start, nights
+                ),
+                on_load=record_month_availability
+            )
+        except UpstreamUnavailableError:
+            # Upstream is throttled or down: fall back to an expired copy if we have one
+            stale = await availability_cache.get_stale(cache_key)
+            if stale is None:
+                raise
+            month_sites, age = stale
+        oldest_age = max(oldest_age, age)
+        sites.extend(month_sites.window(start_dt, end_dt))
+    return sites, oldest_age
+
+async def get_campground_changes(campground_id: str, start_dt: date, end_dt: date, nights: int, since: Optional[str]):
+    """
+    Availability plus what changed since a cursor. Returns (availability, changes,
+    cursor, age_seconds) where changes is (opened, booked), or None when there is
+    no cursor or it has expired and the caller needs the full availability.
+    """
+    availability, cache_age = await get_campground_availability(campground_id, start_dt, end_dt, nights)
+    # Read together with the availability: later changes get greater cursors
+    cursor = availability_snapshots.cursor
+    changes = availability_snapshots.changes_since(campground_id, nights, since, start_dt, end_dt) if since else None
+    return availability, changes, cursor, cache_age
+
+def catalog_entry_to_campsite_info(entry: Dict[str, Any], distance_km: Optional[float] = None) -> CampsiteInfo:
+    """Convert a campground catalog entry to our CampsiteInfo format"""
+    return CampsiteInfo(
+        id=entry["facility_id"],
+        name=entry["name"],
+        description=entry["description"] or "No description available.",
+        state=entry["state"],
+        city=entry["city"],
+        latitude=entry["latitude"],
+        longitude=entry["longitude"],
+        activities=entry["activities"] or ["Camping"],
+        phone=entry["phone"],
+        email=entry["email"],
+        reservation_url=f"https://www.recreation.gov/camping/campgrounds/{entry['facility_id']}",
+        recreation_gov_id=entry["facility_id"],
+        distance_km=round(distance_km, 2) if distance_km is not None else None
+    )
+
+async def store_catalog_entries(cache_key: Tuple[str, Any], entries: List[Dict[str, Any]], age: float):
+    """Store downloaded catalog entries in this worker's catalog, whether this worker fetched them or another did"""
+    state = cache_key[1] if cache_key[0] == "state" else None
+    refreshed_at = datetime.utcnow() - timedelta(seconds=age)
+    await asyncio.to_thread(campground_catalog.upsert_entries, entries, state, refreshed_at)
+
+async def refresh_catalog_state(state: str) -> List[Dict[str, Any]]:
+    """Bring a state's catalog up to date, downloading it unless another worker recently did"""
+    entries, _ = await catalog_cache.get_or_fetch(
+        ("state", state.upper()),
+        lambda: provider_executor.run(_download_state_entries, state),
+        on_load=store_catalog_entries
+    )
+    return entries
+
 # Helper function to search campgrounds using camply
 async def search_campgrounds_with_camply(location: str, state: str = None) -> List[CampsiteInfo]:
-    """Search for campgrounds using camply library"""
+    """Search a state's campgrounds through the catalog text index, downloading the state if it's stale"""
     try:
-        provider = RecreationDotGov()
-        
-        # Search for campgrounds
-        if state:
-            campgrounds = provider.find_campgrounds(state=state.upper())
-        #else:
-        #    # If no state specified, try to extract from location or default to popular states
-        #    campgrounds = provider.find_campgrounds(state="CA")  # Default to CA for now
-        
-        # Filter by location if specified (more flexible matching)
-        if location:
-            location_lower = location.lower()
-            # Create search terms from location
-            search_terms = location_lower.split()
-            
-            filtered_campgrounds = []
-            for cg in campgrounds:
-                facility_name_lower = cg.facility_name.lower()
-                description_lower = getattr(cg, 'description', '').lower() if hasattr(cg, 'description') else ''
-                recreation_area_lower = getattr(cg, 'recreation_area', '').lower() if hasattr(cg, 'recreation_area') else ''
-                
-                # Check if any search term matches facility name, description, or recreation area
-                match_found = False
-                for term in search_terms:
-                    if (term in facility_name_lower or 
-                        term in description_lower or
-                        term in recreation_area_lower):
-                        match_found = True
-                        break
-                
-                # Special handling for common park/location names
-                if not match_found:
-                    # Check for national park searches
-                    if 'national' in search_terms and 'park' in search_terms and 'national park' in recreation_area_lower:
-                        match_found = True
-                    elif 'park' in search_terms and 'park' in recreation_area_lower:
-                        match_found = True
-                
-                if match_found:
-                    filtered_campgrounds.append(cg)
-            
-            campgrounds = filtered_campgrounds
-        
+        if not state:
+            return []
+
+        # Only go upstream when the catalog doesn't hold a fresh copy of this state
+        if not campground_catalog.is_state_fresh(state):
+            try:
+                await refresh_catalog_state(state)
+            except UpstreamUnavailableError as e:
+                # Search whatever copy of the state the catalog already has
+                logger.warning(f"Serving cached catalog for {state}: {str(e)}")
+
+        index = await campground_search_index.refresh(campground_catalog)
+
+        # States are applied as filters, so don't require the ones named in the location to match as text
+        named_states = {st for st, _ in location_resolver.resolve(location)} | {state}
+        state_terms = {word.lower() for st in named_states for word in location_resolver.state_words(st)}
+        query_terms = [term for term in tokenize(location) if term not in state_terms]
+
+        # Filter by location if specified, best matches first
+        if query_terms:
+            entries = [entry for entry, _ in index.search(" ".join(query_terms), state=state, limit=20)]
+        else:
+            entries = index.state_entries(state)[:20]  # Limit to 20 results
+
         # Convert to our CampsiteInfo format
-        campsite_infos = []
-        for cg in campgrounds[:20]:  # Limit to 20 results
-            campsite_info = CampsiteInfo(
-                id=str(cg.facility_id),
-                name=cg.facility_name,
-                description=getattr(cg, 'description', '') or "No description available.",
-                state=getattr(cg, 'state', ''),
-                city=getattr(cg, 'city', ''),
-                latitude=getattr(cg, 'latitude', None),
-                longitude=getattr(cg, 'longitude', None),
-                activities=getattr(cg, 'activities', []) or ["Camping"],
-                phone=getattr(cg, 'phone', ''),
-                email=getattr(cg, 'email', ''),
-                reservation_url=f"https://www.recreation.gov/camping/campgrounds/{cg.facility_id}",
-                recreation_gov_id=str(cg.facility_id)
-            )
-            campsite_infos.append(campsite_info)
-        
-        return campsite_infos
+        return [catalog_entry_to_campsite_info(entry) for entry in entries]
         
     except Exception as e:
         logger.error(f"Error in camply search: {str(e)}")
@@ -631,155 +1067,130 @@ async def search_campgrounds_with_camply(location: str, state: str = None) -> Li
         return []
 
 # Campground search endpoints
-# State name and abbreviation mapping
-STATE_ABBREVIATIONS = {
-    'ALABAMA': 'AL', 'ALASKA': 'AK', 'ARIZONA': 'AZ', 'ARKANSAS': 'AR', 'CALIFORNIA': 'CA',
-    'COLORADO': 'CO', 'CONNECTICUT': 'CT', 'DELAWARE': 'DE', 'FLORIDA': 'FL', 'GEORGIA': 'GA',
-    'HAWAII': 'HI', 'IDAHO': 'ID', 'ILLINOIS': 'IL', 'INDIANA': 'IN', 'IOWA': 'IA',
-    'KANSAS': 'KS', 'KENTUCKY': 'KY', 'LOUISIANA': 'LA', 'MAINE': 'ME', 'MARYLAND': 'MD',
-    'MASSACHUSETTS': 'MA', 'MICHIGAN': 'MI', 'MINNESOTA': 'MN', 'MISSISSIPPI': 'MS', 'MISSOURI': 'MO',
-    'MONTANA': 'MT', 'NEBRASKA': 'NE', 'NEVADA': 'NV', 'NEW HAMPSHIRE': 'NH', 'NEW JERSEY': 'NJ',
-    'NEW MEXICO': 'NM', 'NEW YORK': 'NY', 'NORTH CAROLINA': 'NC', 'NORTH DAKOTA': 'ND', 'OHIO': 'OH',
-    'OKLAHOMA': 'OK', 'OREGON': 'OR', 'PENNSYLVANIA': 'PA', 'RHODE ISLAND': 'RI', 'SOUTH CAROLINA': 'SC',
-    'SOUTH DAKOTA': 'SD', 'TENNESSEE': 'TN', 'TEXAS': 'TX', 'UTAH': 'UT', 'VERMONT': 'VT',
-    'VIRGINIA': 'VA', 'WASHINGTON': 'WA', 'WEST VIRGINIA': 'WV', 'WISCONSIN': 'WI', 'WYOMING': 'WY'
-}
-# National Parks and Rec Areas to state mapping (partial, add more as needed)
-NATIONAL_PARKS_TO_STATE = {
-    'YELLOWSTONE NATIONAL PARK': 'WY',
-    'YOSEMITE NATIONAL PARK': 'CA',
-    'GRAND CANYON NATIONAL PARK': 'AZ',
-    'ZION NATIONAL PARK': 'UT',
-    'GREAT SMOKY MOUNTAINS NATIONAL PARK': 'TN',
-    'ROCKY MOUNTAIN NATIONAL PARK': 'CO',
-    'ACADIA NATIONAL PARK': 'ME',
-    'OLYMPIC NATIONAL PARK': 'WA',
-    'GLACIER NATIONAL PARK': 'MT',
-    'JOSHUA TREE NATIONAL PARK': 'CA',
-    'NORTH CASCADES NATIONAL PARK': 'WA',
-    'MOUNT RAINIER NATIONAL PARK': 'WA',
-    'CRATER LAKE NATIONAL PARK': 'OR',
-    'BRYCE CANYON NATIONAL PARK': 'UT',
-    'ARCHES NATIONAL PARK': 'UT',
-    'CANYONLANDS NATIONAL PARK': 'UT',
-    'CAPITOL REEF NATIONAL PARK': 'UT',
-    'DEATH VALLEY NATIONAL PARK': 'CA',
-    'SEQUOIA NATIONAL PARK': 'CA',
-    'KINGS CANYON NATIONAL PARK': 'CA',
-    'GRAND TETON NATIONAL PARK': 'WY',
-    'BADLANDS NATIONAL PARK': 'SD',
-    'WIND CAVE NATIONAL PARK': 'SD',
-    'THEODORE ROOSEVELT NATIONAL PARK': 'ND',
-    'VOYAGEURS NATIONAL PARK': 'MN',
-    'ISLE ROYALE NATIONAL PARK': 'MI',
-    'MAMMOTH CAVE NATIONAL PARK': 'KY',
-    'HOT SPRINGS NATIONAL PARK': 'AR',
-    'EVERGLADES NATIONAL PARK': 'FL',
-    'BISCAYNE NATIONAL PARK': 'FL',
-    'DRY TORTUGAS NATIONAL PARK': 'FL',
-    'SHENANDOAH NATIONAL PARK': 'VA',
-    'GREAT SAND DUNES NATIONAL PARK': 'CO',
-    'MESA VERDE NATIONAL PARK': 'CO',
-    'BLACK CANYON OF THE GUNNISON NATIONAL PARK': 'CO',
-    'PINNACLES NATIONAL PARK': 'CA',
-    'CHANNEL ISLANDS NATIONAL PARK': 'CA',
-    'REDWOOD NATIONAL PARK': 'CA',
-    'LASSEN VOLCANIC NATIONAL PARK': 'CA',
-    'CARLSBAD CAVERNS NATIONAL PARK': 'NM',
-    'GUADALUPE MOUNTAINS NATIONAL PARK': 'TX',
-    'BIG BEND NATIONAL PARK': 'TX',
-    'PETRIFIED FOREST NATIONAL PARK': 'AZ',
-    'SAGUARO NATIONAL PARK': 'AZ',
-    'DENALI NATIONAL PARK': 'AK',
-    'KENAI FJORDS NATIONAL PARK': 'AK',
-    'KATMAI NATIONAL PARK': 'AK',
-    'LAKE CLARK NATIONAL PARK': 'AK',
-    'GATES OF THE ARCTIC NATIONAL PARK': 'AK',
-    'KOBUK VALLEY NATIONAL PARK': 'AK',
-    'WRANGELL-ST. ELIAS NATIONAL PARK': 'AK',
-    'GLACIER BAY NATIONAL PARK': 'AK',
-    'HALEAKALA NATIONAL PARK': 'HI',
-    'HAWAII VOLCANOES NATIONAL PARK': 'HI'
-}
-RECREATION_AREAS_TO_STATE = {
-    'LAKE TAHOE': 'CA',
-    'LAKE POWELL': 'UT',
-    'LAKE MEAD': 'NV',
-    'SHASTA LAKE': 'CA',
-    # ... add more as needed ...
-}
-@app.post("/api/search")
+# States searched when a location can't be resolved to a single state
+FALLBACK_SEARCH_STATES = [
+    'CA', 'OR', 'WA', 'CO', 'UT', 'AZ', 'NY', 'TX', 'FL', 'MT', 'WY', 'ID', 'NV', 'NM', 'NC', 'TN', 'GA', 'VA', 'PA',
+    'MI', 'MN', 'WI', 'MO', 'AR', 'SD', 'ND', 'KY', 'OK', 'AL', 'SC', 'LA', 'MD', 'MA', 'NH', 'VT', 'ME', 'AK', 'HI'
+]
+
+def parse_proximity(request: CampsiteSearchRequest) -> Optional[ProximityQuery]:
+    """The proximity part of a search request, None if it has none; raises 400 on bad input"""
+    if request.latitude is None and request.longitude is None and not request.bbox:
+        return None
+    try:
+        return ProximityQuery(request.latitude, request.longitude, request.radius_km, request.bbox)
+    except InvalidProximityError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def search_nearby(query: ProximityQuery) -> List[CampsiteInfo]:
+    """Catalog campgrounds matching a proximity query, nearest first, from the geohash index"""
+    index = await campground_geo_index.refresh(campground_catalog)
+    return [catalog_entry_to_campsite_info(entry, distance) for entry, distance in index.search(query)]
+
+async def iter_concurrent_searches(keys: List[Any], search_one, deadline: float):
+    """
+    Run `search_one(key)` for every key with bounded concurrency, yielding
+    (key, result) as each finishes. Raises asyncio.TimeoutError once the deadline
+    passes; outstanding searches are cancelled when the generator is closed.
+    """
+    semaphore = asyncio.Semaphore(SEARCH_FANOUT_CONCURRENCY)
+
+    async def search(key):
+        async with semaphore:
+            return key, await search_one(key)
+
+    tasks = [asyncio.create_task(search(key)) for key in keys]
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=deadline):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def iter_state_searches(location: str, states: List[str], deadline: float):
+    """Search several states concurrently, yielding (state, campsites) as each finishes"""
+    return iter_concurrent_searches(states, lambda st: search_campgrounds_with_camply(location, st), deadline)
+
+async def search_rec_area(rec_area_id: int) -> List[CampsiteInfo]:
+    """Campgrounds of one recreation area as CampsiteInfo records"""
+    entries, _ = await catalog_cache.get_or_fetch(
+        ("rec-area", int(rec_area_id)),
+        lambda: provider_executor.run(_download_rec_area_entries, int(rec_area_id)),
+        on_load=store_catalog_entries
+    )
+    return [catalog_entry_to_campsite_info(entry) for entry in entries]
+
+def location_search_states(location: str) -> List[str]:
+    """
+    States to search for a location: the single best match, every state tied for
+    best, or the fallback list when nothing matched
+    """
+    candidates = location_resolver.resolve(location)
+    logger.info(f"Extracted states: {candidates}")
+    if not candidates:
+        return FALLBACK_SEARCH_STATES
+    return [st for st, score in candidates if score == candidates[0][1]]
+
+async def fan_out_state_search(location: str, states: List[str], limit: int):
+    """Search states in parallel until `limit` unique campgrounds are found or the deadline passes"""
+    results_by_state = {}
+    seen_ids = set()
+    partial = False
+
+    state_results = iter_state_searches(location, states, SEARCH_FANOUT_DEADLINE_SECONDS)
+    try:
+        async for st, campsites in state_results:
+            results_by_state[st] = campsites
+            seen_ids.update(c.id for c in campsites)
+            # If we found enough, stop and cancel the remaining states
+            if len(seen_ids) >= limit:
+                break
+    except asyncio.TimeoutError:
+        partial = True
+        logger.warning(f"State fan-out hit {SEARCH_FANOUT_DEADLINE_SECONDS}s deadline after {len(results_by_state)}/{len(states)} states")
+    finally:
+        await state_results.aclose()
+
+    # Keep results in state priority order regardless of completion order
+    campsites = [c for st in states for c in results_by_state.get(st, [])]
+    return campsites, partial
+
+@app.post("/api/search", response_class=FastJSONResponse)
 async def search_campsites(request: CampsiteSearchRequest):
     """
     Search for available campsites using camply.
     Prioritizes searching by rec_area_id if provided.
     """
+    proximity = parse_proximity(request)
     try:
         logger.info(f"Searching campsites with request: {request}")
-        provider = RecreationDotGov()
         all_campgrounds = []
+        partial = False
 
         # If rec_area_ids are provided, search within them
         if request.rec_area_id:
             logger.info(f"Searching with rec_area_ids: {request.rec_area_id}")
-            campgrounds = provider.find_campgrounds(rec_area_id=[int(rec_id) for rec_id in request.rec_area_id])
-            
-            # Convert raw campground objects to CampsiteInfo format
-            for cg in campgrounds:
-                campsite_info = CampsiteInfo(
-                    id=str(cg.facility_id),
-                    name=cg.facility_name,
-                    description=getattr(cg, 'description', '') or "No description available.",
-                    state=getattr(cg, 'state', ''),
-                    city=getattr(cg, 'city', ''),
-                    latitude=getattr(cg, 'latitude', None),
-                    longitude=getattr(cg, 'longitude', None),
-                    activities=getattr(cg, 'activities', []) or ["Camping"],
-                    phone=getattr(cg, 'phone', ''),
-                    email=getattr(cg, 'email', ''),
-                    reservation_url=f"https://www.recreation.gov/camping/campgrounds/{cg.facility_id}",
-                    recreation_gov_id=str(cg.facility_id)
-                )
-                all_campgrounds.append(campsite_info)
+            rec_area_results = await asyncio.gather(
+                *(search_rec_area(int(rec_id)) for rec_id in request.rec_area_id)
+            )
+            for campsites in rec_area_results:
+                all_campgrounds.extend(campsites)
+
+        elif proximity is not None:
+            # Near a point or within a box: the catalog's spatial index, no state fan-out
+            all_campgrounds.extend(await search_nearby(proximity))
 
         else: # Fallback to location search if no rec_area_id
             state = None
-            location_upper = (request.location or '').strip().upper()
-            # Try to extract state from location
-            if location_upper in STATE_ABBREVIATIONS:
-                state = STATE_ABBREVIATIONS[location_upper]
-            elif location_upper in STATE_ABBREVIATIONS.values():
-                state = location_upper
-            elif location_upper in NATIONAL_PARKS_TO_STATE:
-                state = NATIONAL_PARKS_TO_STATE[location_upper]
-            elif location_upper in RECREATION_AREAS_TO_STATE:
-                state = RECREATION_AREAS_TO_STATE[location_upper]
+            # Ranked candidate states named by the location (states, parks, rec areas)
+            states = location_search_states(request.location or "")
+            if len(states) == 1:
+                state = states[0]
+                all_campgrounds.extend(await search_campgrounds_with_camply(request.location or "", state))
             else:
-                # Try to find state by partial match
-                for k, v in STATE_ABBREVIATIONS.items():
-                    if k in location_upper or v in location_upper:
-                        state = v
-                        break
-                if not state:
-                    for k, v in NATIONAL_PARKS_TO_STATE.items():
-                        if k in location_upper:
-                            state = v
-                            break
-                if not state:
-                    for k, v in RECREATION_AREAS_TO_STATE.items():
-                        if k in location_upper:
-                            state = v
-                            break
-            logger.info(f"Extracted state: {state}")
-            # If no state found, broaden search
-            states_to_try = [state] if state else ['CA', 'OR', 'WA', 'CO', 'UT', 'AZ', 'NY', 'TX', 'FL', 'MT', 'WY', 'ID', 'NV', 'NM', 'NC', 'TN', 'GA', 'VA', 'PA', 'MI', 'MN', 'WI', 'MO', 'AR', 'SD', 'ND', 'KY', 'OK', 'AL', 'SC', 'LA', 'MD', 'MA', 'NH', 'VT', 'ME', 'AK', 'HI']
-            for st in states_to_try:
-                campsites = await search_campgrounds_with_camply(request.location or "", st)
-                if campsites:
-                    all_campgrounds.extend(campsites)
-                # If we found enough, break
-                if len(all_campgrounds) >= (request.limit or 20):
-                    break
+                # Several equally likely states, or none at all: broaden the search
+                campsites, partial = await fan_out_state_search(request.location or "", states, request.limit or 20)
+                all_campgrounds.extend(campsites)
 
         # all_campgrounds already contains CampsiteInfo objects from search_campgrounds_with_camply
         campsite_infos = all_campgrounds
@@ -788,6 +1199,8 @@ async def search_campsites(request: CampsiteSearchRequest):
         unique_campsites = [c for c in campsite_infos if c.id not in seen and not seen.add(c.id)]
 
 
+        # Incomplete answers must not be pinned in browser or CDN caches for the search max-age
+        cacheable = not partial and bool(unique_campsites)
         if not unique_campsites:
             logger.warning("No campsites found via camply, using fallback data")
             unique_campsites = [
@@ -807,28 +1220,231 @@ async def search_campsites(request: CampsiteSearchRequest):
                 )
             ]
 
-        return {
+        return FastJSONResponse(headers=None if cacheable else {"Cache-Control": "no-store"}, content={
             "success": True,
             "data": unique_campsites[:request.limit or 20],
             "total_count": len(unique_campsites),
+            "partial": partial,
             "source": "recreation.gov via camply"
-        }
+        })
 
+    except ProviderBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except UpstreamUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+    except ProviderTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error searching campsites: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error searching campsites: {str(e)}")
 
+@app.get("/api/search", response_class=FastJSONResponse)
+async def search_campsites_get(
+    location: str = Query(""),
+    activity: str = Query(""),
+    start_date: str = Query(""),
+    end_date: str = Query(""),
+    nights: int = Query(1),
+    weekend_only: bool = Query(False),
+    limit: int = Query(20),
+    rec_area_id: List[str] = Query([]),
+    latitude: Optional[float] = Query(None),
+    longitude: Optional[float] = Query(None),
+    radius_km: Optional[float] = Query(None),
+    bbox: Optional[str] = Query(None, description="west,south,east,north")
+):
+    """GET form of POST /api/search with the same fields as query parameters, cacheable by browsers and CDNs"""
+    try:
+        bbox_values = [float(value) for value in bbox.split(",")] if bbox else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be west,south,east,north in degrees")
+    return await search_campsites(CampsiteSearchRequest(
+        location=location,
+        activity=activity,
+        start_date=start_date,
+        end_date=end_date,
+        nights=nights,
+        weekend_only=weekend_only,
+        limit=limit,
+        rec_area_id=rec_area_id,
+        latitude=latitude,
+        longitude=longitude,
+        radius_km=radius_km,
+        bbox=bbox_values
+    ))
+
+def ndjson_frame(frame: Dict[str, Any]) -> bytes:
+    return json_dumps(frame) + b"\n"
+
+@app.post("/api/search/stream")
+async def stream_search_campsites(request: CampsiteSearchRequest):
+    """
+    Streaming variant of /api/search. Responds with newline-delimited JSON:
+    a {"type": "campsite", "origin": <state, rec area ID or "nearby">, "data": CampsiteInfo}
+    frame per unique campground as soon as its state or rec area finishes, then a
+    final {"type": "summary", ...} frame.
+    """
+    limit = request.limit or 20
+    proximity = parse_proximity(request)
+    if request.rec_area_id:
+        keys = [int(rec_id) for rec_id in request.rec_area_id]
+        search_one = search_rec_area
+    elif proximity is not None:
+        keys = ["nearby"]
+        search_one = lambda _: search_nearby(proximity)
+    else:
+        keys = location_search_states(request.location or "")
+        search_one = lambda st: search_campgrounds_with_camply(request.location or "", st)
+
+    async def frames():
+        started = time.monotonic()
+        seen = set()
+        searched = []
+        partial = False
+        error = None
+        results = iter_concurrent_searches(keys, search_one, SEARCH_FANOUT_DEADLINE_SECONDS)
+        try:
+            async for key, campsites in results:
+                searched.append(key)
+                for campsite in campsites:
+                    if campsite.id in seen:
+                        continue
+                    seen.add(campsite.id)
+                    yield ndjson_frame({"type": "campsite", "origin": key, "data": campsite})
+                    if len(seen) >= limit:
+                        break
+                if len(seen) >= limit:
+                    break
+        except asyncio.TimeoutError:
+            partial = True
+        except (ProviderBusyError, ProviderTimeoutError, UpstreamUnavailableError) as e:
+            partial = True
+            error = str(e)
+        except Exception as e:
+            logger.error(f"Error streaming search: {str(e)}")
+            partial = True
+            error = f"Error searching campsites: {str(e)}"
+        finally:
+            await results.aclose()
+
+        yield ndjson_frame({
+            "type": "summary",
+            "success": error is None,
+            "total_count": len(seen),
+            "searched": searched,
+            "pending": [key for key in keys if key not in searched] if partial else [],
+            "partial": partial,
+            "error": error,
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+            "source": "recreation.gov via camply"
+        })
+
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
+
+
+def parse_availability_window(start_date: str, end_date: str, nights: int):
+    """Validate an availability window, raising 400 on bad input; returns (start_dt, end_dt)"""
+    try:
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date format. Use YYYY-MM-DD: {e}")
+    
+    if start_dt >= end_dt:
+        raise HTTPException(status_code=400, detail="Start date must be before end date")
+    
+    if nights <= 0:
+        raise HTTPException(status_code=400, detail="Number of nights must be positive")
+    return start_dt, end_dt
+
+def validate_since_cursor(since: Optional[str]):
+    """400 for a `since` value that isn't a cursor from an availability response"""
+    if since is not None:
+        try:
+            availability_snapshots.parse_cursor(since)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+def parse_availability_format(response_format: str) -> bool:
+    """Whether an availability request asked for the compact format; 400 on unknown formats"""
+    if response_format not in AVAILABILITY_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(AVAILABILITY_FORMATS)}")
+    return response_format == "compact"
+
+def availability_payload(availability: CompactAvailability, compact: bool):
+    return availability.to_json() if compact else list(availability.iter_dicts())
+
+async def campground_availability_result(campground_id: str, start_dt: date, end_dt: date, nights: int, compact: bool = False, since: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Availability fields for one campground, shared by the single and batch endpoints.
+    The full format lists every (site, start date) in `available_sites`; the compact
+    format sends `availability` with site metadata once and start dates as ranges.
+
+    `cursor` is passed back as `since` on the next poll, which then returns only the
+    stays that `opened` or were `booked` in between. If the cursor has expired the
+    full availability is returned instead, with `reset` set.
+    """
+    campground_name = await get_campground_name(campground_id)
+    availability, changes, cursor, cache_age = await get_campground_changes(campground_id, start_dt, end_dt, nights, since)
+    if changes is not None:
+        opened, booked = changes
+        changed = len(opened) + len(booked)
+        return {
+            "campground_id": campground_id,
+            "campground_name": campground_name,
+            "format": "compact" if compact else "full",
+            "since": since,
+            "cursor": cursor,
+            "reset": False,
+            "opened": availability_payload(opened, compact),
+            "booked": availability_payload(booked, compact),
+            "total_opened": len(opened),
+            "total_booked": len(booked),
+            "total_sites_found": len(availability),
+            "cache_age_seconds": round(cache_age, 1),
+            "stale": cache_age > availability_cache.ttl_seconds,
+            "status": "changed" if changed else "unchanged",
+            "message": f"{len(opened)} site-dates opened and {len(booked)} booked since the last check" if changed else "No changes since the last check"
+        }
+
+    available_dates_list = availability.available_dates()
+    total_sites_found = len(availability)
+    result = {
+        "campground_id": campground_id,
+        "campground_name": campground_name,
+        "format": "compact" if compact else "full",
+        "available_dates": available_dates_list,
+    }
+    if compact:
+        result["availability"] = availability_payload(availability, compact)
+        result["total_campsites"] = len(availability.sites)
+    else:
+        result["available_sites"] = availability_payload(availability, compact)
+    result.update({
+        "cursor": cursor,
+        "reset": since is not None,
+        "total_sites_found": total_sites_found,
+        "total_available_dates": len(available_dates_list),
+        "cache_age_seconds": round(cache_age, 1),
+        "stale": cache_age > availability_cache.ttl_seconds,
+        "status": "success" if total_sites_found else "no_availability",
+        "message": f"Found {total_sites_found} available sites across {len(available_dates_list)} dates" if total_sites_found else "No available sites found for the specified dates"
+    })
+    return result
 
 # Availability check endpoint
 # Support both GET and POST for availability checking
-@app.get("/api/campgrounds/{campground_id}/availability")
-@app.post("/api/campgrounds/{campground_id}/availability")
+@app.get("/api/campgrounds/{campground_id}/availability", response_class=FastJSONResponse)
+@app.post("/api/campgrounds/{campground_id}/availability", response_class=FastJSONResponse)
 async def check_availability(
     campground_id: str,
     start_date: str = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: str = Query(None, description="End date (YYYY-MM-DD)"),
     nights: int = Query(1, description="Number of nights"),
-    request: AvailabilityRequest = None
+    response_format: str = Query("full", alias="format", description="full or compact"),
+    since: Optional[str] = Query(None, description="Cursor from a previous response; return only changes since then"),
+    request: AvailabilityRequest = None,
+    http_request: Request = None
 ):
     """Check real availability for a specific campground using camply"""
     
@@ -847,110 +1463,43 @@ async def check_availability(
     
     try:
         logger.info(f"Checking availability for campground {campground_id} from {start_date} to {end_date} for {nights} nights")
+        start_dt, end_dt = parse_availability_window(start_date, end_date, nights)
+        compact = parse_availability_format(response_format)
+        validate_since_cursor(since)
+
+        # Get available campsites (served from the availability cache when fresh)
+        result = await campground_availability_result(campground_id, start_dt, end_dt, nights, compact, since)
+
+        etag = None
+        if http_request.method == "GET":
+            # Read with no await since the result was assembled, so the version is the one it was built from
+            etag = version_etag(
+                campground_id, start_date, end_date, nights, response_format, since,
+                date.today().isoformat(), availability_snapshots.version(campground_id, nights)
+            )
+            if etag_matches(http_request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers={"ETag": etag})
         
-        # Parse and validate dates
-        try:
-            start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-            end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=f"Invalid date format. Use YYYY-MM-DD: {e}")
-        
-        if start_dt >= end_dt:
-            raise HTTPException(status_code=400, detail="Start date must be before end date")
-        
-        if nights <= 0:
-            raise HTTPException(status_code=400, detail="Number of nights must be positive")
-        
-        # Get campground name first
-        campground_name = await get_campground_name(campground_id)
-        
-        # Create search window
-        search_window = SearchWindow(
-            start_date=start_dt,
-            end_date=end_dt
-        )
-        
-        # Search for availability
-        searcher = SearchRecreationDotGov(
-            search_window=search_window,
-            campgrounds=[int(campground_id)],
-            nights=nights
-        )
-        
-        # Get available campsites
-        available_sites = searcher.get_all_campsites()
-        
-        # Convert to our format and collect available dates
-        availability_data = []
-        available_dates = set()
-        
-        for site in available_sites:
-            booking_date = getattr(site, 'booking_date', None)
-            booking_end_date = getattr(site, 'booking_end_date', None)
-            if booking_date:
-                available_dates.add(str(booking_date))
-            
-            # Extract permitted equipment list
-            permitted_equipment = getattr(site, 'permitted_equipment', [])
-            if isinstance(permitted_equipment, str):
-                permitted_equipment = [permitted_equipment]
-            elif not isinstance(permitted_equipment, list):
-                permitted_equipment = []
-            
-            # Get campsite occupancy (min, max)
-            occupancy = getattr(site, 'campsite_occupancy', None)
-            if occupancy and hasattr(occupancy, '__iter__') and len(occupancy) >= 2:
-                occupancy_min, occupancy_max = occupancy[0], occupancy[1]
-            else:
-                occupancy_min, occupancy_max = None, None
-            
-            availability_data.append({
-                "campsite_id": getattr(site, 'campsite_id', ''),
-                "campsite_title": getattr(site, 'campsite_title', ''),
-                "campsite_site_name": getattr(site, 'campsite_site_name', ''),
-                "campsite_loop_name": getattr(site, 'campsite_loop_name', ''),
-                "campsite_type": getattr(site, 'campsite_type', ''),
-                "campsite_use_type": getattr(site, 'campsite_use_type', ''),
-                "booking_date": str(booking_date) if booking_date else '',
-                "booking_end_date": str(booking_end_date) if booking_end_date else '',
-                "booking_nights": getattr(site, 'booking_nights', nights),
-                "booking_url": getattr(site, 'booking_url', ''),
-                "recreation_area": getattr(site, 'recreation_area', ''),
-                "recreation_area_id": getattr(site, 'recreation_area_id', ''),
-                "facility_name": getattr(site, 'facility_name', ''),
-                "facility_id": getattr(site, 'facility_id', ''),
-                "availability_status": getattr(site, 'availability_status', 'Available'),
-                "permitted_equipment": permitted_equipment,
-                "campsite_occupancy_min": occupancy_min,
-                "campsite_occupancy_max": occupancy_max
-            })
-        
-        # Convert available_dates set to sorted list
-        available_dates_list = sorted(list(available_dates))
-        
-        return {
+        return FastJSONResponse(headers={"ETag": etag} if etag else None, content={
             "success": True,
-            "campground_id": campground_id,
-            "campground_name": campground_name,
+            **result,
             "search_parameters": {
                 "start_date": start_date,
                 "end_date": end_date,
                 "nights": nights
             },
-            "available_dates": available_dates_list,
-            "available_sites": availability_data,
-            "total_sites_found": len(availability_data),
-            "total_available_dates": len(available_dates_list),
-            "source": "Recreation.gov via camply",
-            "status": "success" if availability_data else "no_availability",
-            "message": f"Found {len(availability_data)} available sites across {len(available_dates_list)} dates" if availability_data else "No available sites found for the specified dates"
-        }
+            "source": "Recreation.gov via camply"
+        })
         
     except HTTPException:
         raise
+    except ProviderBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except UpstreamUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
     except Exception as e:
         logger.error(f"Error checking availability: {str(e)}")
-        return {
+        return FastJSONResponse(headers={"Cache-Control": "no-store"}, content={
             "success": False,
             "error": str(e),
             "campground_id": campground_id,
@@ -962,29 +1511,157 @@ async def check_availability(
             "source": "Recreation.gov via camply",
             "status": "error",
             "message": f"Error checking availability: {str(e)}"
-        }
+        })
+
+@app.post("/api/campgrounds/availability/batch", response_class=FastJSONResponse)
+async def check_availability_batch(
+    request: BatchAvailabilityRequest,
+    response_format: str = Query("full", alias="format", description="full or compact"),
+    since: Optional[str] = Query(None, description="Cursor from a previous response; return only changes since then")
+):
+    """
+    Check availability for several campgrounds over one shared window.
+    Campgrounds are fetched concurrently (bounded) through the availability cache;
+    a failure for one campground is reported in its own result and doesn't fail the batch.
+    """
+    campground_ids = list(dict.fromkeys(cid.strip() for cid in request.campground_ids if cid.strip()))
+    if not campground_ids:
+        raise HTTPException(status_code=400, detail="campground_ids must not be empty")
+    if len(campground_ids) > BATCH_AVAILABILITY_MAX_CAMPGROUNDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {BATCH_AVAILABILITY_MAX_CAMPGROUNDS} campgrounds per batch"
+        )
+    start_dt, end_dt = parse_availability_window(request.start_date, request.end_date, request.nights)
+    compact = parse_availability_format(response_format)
+    validate_since_cursor(since)
+    logger.info(f"Checking availability for {len(campground_ids)} campgrounds from {request.start_date} to {request.end_date}")
+
+    semaphore = asyncio.Semaphore(BATCH_AVAILABILITY_CONCURRENCY)
+
+    async def check_one(campground_id: str) -> Dict[str, Any]:
+        try:
+            async with semaphore:
+                result = await campground_availability_result(campground_id, start_dt, end_dt, request.nights, compact, since)
+            return {"success": True, **result}
+        except Exception as e:
+            logger.error(f"Error checking availability for campground {campground_id}: {str(e)}")
+            error = {
+                "success": False,
+                "campground_id": campground_id,
+                "campground_name": await get_campground_name(campground_id),
+                "error": str(e),
+                "status": "error",
+                "message": f"Error checking availability: {str(e)}"
+            }
+            if isinstance(e, UpstreamUnavailableError):
+                error["retry_after"] = int(e.retry_after)
+            return error
+
+    results = await asyncio.gather(*(check_one(cid) for cid in campground_ids))
+    failed = sum(1 for result in results if not result["success"])
+    return FastJSONResponse({
+        "success": failed < len(results),
+        "search_parameters": {
+            "start_date": request.start_date,
+            "end_date": request.end_date,
+            "nights": request.nights
+        },
+        "results": results,
+        "total_campgrounds": len(results),
+        "failed_campgrounds": failed,
+        "source": "Recreation.gov via camply"
+    })
 
 # Alert endpoints
 async def get_campground_name(campground_id: str) -> str:
-    """Get campground name from camply"""
-    try:
-        provider = RecreationDotGov()
-        # Try to get campground details
-        # Note: This is a simplified approach - in production you might cache this data
-        campgrounds = provider.find_campgrounds(state="CA")  # You might need to search multiple states
-        
-        for cg in campgrounds:
-            if str(cg.facility_id) == campground_id:
-                return cg.facility_name
-        
-        # If not found, return a generic name
-        return f"Campground {campground_id}"
-        
-    except Exception as e:
-        logger.error(f"Error getting campground name: {str(e)}")
-        return f"Campground {campground_id}"
+    """Get campground name from the local campground catalog"""
+    name = campground_catalog.get_name(campground_id)
+    if name:
+        return name
+
+    # Unknown facility - fill the catalog in the background, never block on it
+    campground_catalog.schedule_lookup(
+        campground_id,
+        lambda facility_id: provider_executor.run(_find_campground_by_id, facility_id)
+    )
+    return f"Campground {campground_id}"
+
+# Background alert evaluation
+async def load_active_alerts() -> List[Dict[str, Any]]:
+    """Load every active alert for the alert engine"""
+    return await alert_repository.list_active()
 
-@app.post("/api/campgrounds/{campground_id}/alerts")
+def resolve_alert_campground_id(alert: Dict[str, Any]) -> Optional[str]:
+    """Find the facility ID an alert is watching"""
+    if alert.get("campground_id"):
+        return alert["campground_id"]
+    campground_id = campground_catalog.find_id_by_name(alert["campground_name"])
+    if campground_id:
+        return campground_id
+    # Alerts created before the catalog knew the campground carry the generic name
+    generic = re.fullmatch(r"Campground (\d+)", alert["campground_name"] or "")
+    return generic.group(1) if generic else None
+
+async def alert_campground_ids(user_id: str) -> Set[str]:
+    """Facility IDs watched by a user's active alerts"""
+    alerts = await alert_repository.list_active_for_user(user_id)
+    return {cid for cid in (resolve_alert_campground_id(alert) for alert in alerts) if cid}
+
+async def refresh_alert_watch(user_id: str, campground_id: Optional[str]):
+    """Start or stop pushing a campground to this worker's streams of a user after one of their alerts changed"""
+    if campground_id is None or not alert_hub.has_streams(user_id):
+        return
+    if campground_id in await alert_campground_ids(user_id):
+        alert_hub.watch(user_id, campground_id)
+    else:
+        alert_hub.unwatch(user_id, campground_id)
+
+async def fetch_alert_changes(campground_id: str, start_dt: date, end_dt: date, since: Optional[str]) -> Dict[str, Any]:
+    """
+    One-night availability changes for an alert group since a cursor, shared with the
+    availability cache. Without a usable cursor `opened` is the full table and `reset` is set.
+    """
+    availability, changes, cursor, _ = await get_campground_changes(campground_id, start_dt, end_dt, 1, since)
+    if changes is None:
+        return {"cursor": cursor, "reset": True, "opened": list(availability.iter_dicts()), "booked": []}
+    opened, booked = changes
+    return {"cursor": cursor, "reset": False, "opened": list(opened.iter_dicts()), "booked": list(booked.iter_dicts())}
+
+async def log_alert_matches(alert: Dict[str, Any], sites: List[Dict[str, Any]]):
+    """Record newly matching sites for an alert"""
+    logger.info(f"Alert {alert['id']} for {alert['campground_name']} has {len(sites)} newly available site(s)")
+
+alert_engine = AlertEngine(
+    load_alerts=load_active_alerts,
+    fetch_changes=fetch_alert_changes,
+    load_notified=alert_repository.get_notified_stays,
+    save_notified=alert_repository.set_notified_stays,
+    resolve_campground_id=resolve_alert_campground_id,
+    leader_lease=LeaderLease(shared_store, "alert-engine", ALERT_ENGINE_LEASE_SECONDS),
+    has_local_streams=lambda alert: alert_hub.has_streams(alert["user_id"]),
+)
+async def push_alert_matches(alert: Dict[str, Any], sites: List[Dict[str, Any]]):
+    """Send newly matching sites to the alert owner's open streams"""
+    campground_id = resolve_alert_campground_id(alert)
+    if campground_id is None:
+        return
+    alert_hub.publish(campground_id, {
+        "event": "alert_match",
+        "data": {
+            "alert_id": alert["id"],
+            "campground_id": campground_id,
+            "campground_name": alert["campground_name"],
+            "start_date": alert["start_date"],
+            "end_date": alert["end_date"],
+            "sites": sites,
+        }
+    }, user_id=alert["user_id"])
+
+alert_engine.add_listener(log_alert_matches)
+alert_engine.add_listener(push_alert_matches, local=True)
+
+@app.post("/api/campgrounds/{campground_id}/alerts", response_class=FastJSONResponse)
 async def create_alert(
     campground_id: str,
     alert_data: AlertCreate,
@@ -992,140 +1669,225 @@ async def create_alert(
 ):
     """Create a new campsite availability alert (requires authentication)"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Get real campground name
-            campground_name = await get_campground_name(campground_id)
-            
-            alert_id = str(uuid.uuid4())
-            
-            # Insert alert into database
-            cursor.execute("""
-                INSERT INTO alerts (id, user_id, campground_name, start_date, end_date, site_type, party_size, is_active, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                alert_id,
-                current_user["id"],
-                campground_name,
-                alert_data.start_date,
-                alert_data.end_date,
-                alert_data.site_type,
-                alert_data.party_size,
-                1,  # is_active
-                datetime.utcnow().isoformat()
-            ))
-            
-            conn.commit()
-            
-            alert = {
-                "id": alert_id,
-                "user_id": current_user["id"],
-                "campground_id": campground_id,
-                "campground_name": campground_name,
-                "start_date": alert_data.start_date,
-                "end_date": alert_data.end_date,
-                "site_type": alert_data.site_type,
-                "party_size": alert_data.party_size,
-                "is_active": True,
-                "created_at": datetime.utcnow()
-            }
-            
-            logger.info(f"Alert created for campground {campground_id} by user {current_user['id']}")
-            
-            return {"success": True, "data": alert}
+        # Get real campground name
+        campground_name = await get_campground_name(campground_id)
+        now = datetime.utcnow().isoformat()
+        
+        # Insert alert into database
+        alert = await alert_repository.create({
+            "id": str(uuid.uuid4()),
+            "user_id": current_user["id"],
+            "campground_id": campground_id,
+            "campground_name": campground_name,
+            "start_date": alert_data.start_date,
+            "end_date": alert_data.end_date,
+            "site_type": alert_data.site_type,
+            "party_size": alert_data.party_size,
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now
+        })
+        
+        logger.info(f"Alert created for campground {campground_id} by user {current_user['id']}")
+        alert_hub.watch(current_user["id"], campground_id)
+        
+        return FastJSONResponse({"success": True, "data": alert})
         
     except Exception as e:
         logger.error(f"Error creating alert: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create alert")
 
-@app.get("/api/campgrounds/alerts")
+@app.get("/api/campgrounds/alerts", response_class=FastJSONResponse)
 async def get_user_alerts(current_user: dict = Depends(get_current_user)):
     """Get all alerts for the current user"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT id, user_id, campground_name, start_date, end_date, site_type, party_size, is_active, created_at
-                FROM alerts 
-                WHERE user_id = ? AND is_active = 1
-                ORDER BY created_at DESC
-            """, (current_user["id"],))
-            
-            alerts = []
-            for row in cursor.fetchall():
-                alerts.append({
-                    "id": row["id"],
-                    "user_id": row["user_id"],
-                    "campground_name": row["campground_name"],
-                    "start_date": row["start_date"],
-                    "end_date": row["end_date"],
-                    "site_type": row["site_type"],
-                    "party_size": row["party_size"],
-                    "is_active": bool(row["is_active"]),
-                    "created_at": row["created_at"]
-                })
-            
-            return {"success": True, "data": alerts}
+        alerts = await alert_repository.list_active_for_user(current_user["id"])
+        return FastJSONResponse({"success": True, "data": alerts})
         
     except Exception as e:
         logger.error(f"Error fetching alerts: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch alerts")
 
+def sse_frame(event: str, data: Dict[str, Any]) -> bytes:
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + json_dumps(data) + b"\n\n"
+
+@app.post("/api/alerts/stream/ticket", response_class=FastJSONResponse)
+async def create_stream_ticket(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """
+    A short-lived, single-use ticket for opening the alert stream from clients that
+    can't send an Authorization header, such as EventSource: GET /api/alerts/stream?ticket=
+    """
+    user = await authenticate_token(credentials.credentials)
+    expires_at = jwt.decode(credentials.credentials, options={"verify_signature": False})["exp"]
+    ticket = await asyncio.to_thread(stream_tickets.issue, user["id"], expires_at)
+    return FastJSONResponse(
+        {"success": True, "data": {"ticket": ticket, "expires_in": STREAM_TICKET_SECONDS}},
+        headers={"Cache-Control": "no-store"}
+    )
+
+async def authenticate_stream(request: Request, ticket: Optional[str]) -> Tuple[dict, float]:
+    """The user opening a stream and when their access expires, from the Authorization header or a ticket"""
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+        user = await authenticate_token(token)
+        return user, jwt.decode(token, options={"verify_signature": False})["exp"]
+    if not ticket:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    try:
+        user_id, expires_at = await asyncio.to_thread(stream_tickets.redeem, ticket)
+    except InvalidTicketError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    user = await user_repository.get_by_id(user_id)
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user, expires_at
+
+@app.get("/api/alerts/stream")
+async def stream_alerts(
+    request: Request,
+    ticket: Optional[str] = Query(None, description="Single-use ticket from POST /api/alerts/stream/ticket, for clients that can't send an Authorization header"),
+    campground_id: List[str] = Query([], description="Extra campgrounds to receive availability changes for")
+):
+    """
+    Server-sent events for the current user, replacing polling of the alerts and
+    availability endpoints. Authenticated with the Authorization header, or with a
+    ticket from POST /api/alerts/stream/ticket; access tokens are never accepted in
+    the URL. Watches the campgrounds of the user's active alerts plus any
+    `campground_id` given, and sends:
+    `ready` once with the watched campgrounds and the current availability cursor,
+    `watching` with the new list when the user's alerts change the watched campgrounds,
+    `alert_match` when one of the user's alerts has newly available sites,
+    `availability` when a watched campground's availability changes,
+    `resync` if events were dropped because the client fell behind (re-fetch with
+    `since` set to the last cursor received), and `expired` before closing when
+    the access token expires.
+    """
+    user, expires_at = await authenticate_stream(request, ticket)
+
+    requested = {cid.strip() for cid in campground_id if cid.strip()}
+    try:
+        subscription = alert_hub.subscribe(user["id"], await alert_campground_ids(user["id"]), requested)
+    except TooManyStreamsError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    async def events():
+        try:
+            yield sse_frame("ready", {
+                "campground_ids": sorted(subscription.campground_ids),
+                "cursor": availability_snapshots.cursor
+            })
+            refresh_at = time.time() + ALERT_HUB_REFRESH_SECONDS
+            while True:
+                now = time.time()
+                event = await subscription.next_event(max(0.0, min(now + ALERT_HUB_HEARTBEAT_SECONDS, expires_at, refresh_at) - now))
+                if time.time() >= expires_at:
+                    yield sse_frame("expired", {"message": "Access token expired, reconnect with a new token"})
+                    break
+                if subscription.overflowed:
+                    # Whatever is still queued is incomplete too; the client re-fetches instead
+                    while not subscription.queue.empty():
+                        subscription.queue.get_nowait()
+                    subscription.overflowed = False
+                    yield sse_frame("resync", {"message": "Events were dropped; reload alerts and re-fetch availability since your last cursor"})
+                elif event is None:
+                    yield b": keepalive\n\n"
+                else:
+                    yield sse_frame(event["event"], event["data"])
+
+                # Alerts may have been created or deleted through another worker
+                if time.time() >= refresh_at or (event is not None and event["event"] == "alert_match"):
+                    refresh_at = time.time() + ALERT_HUB_REFRESH_SECONDS
+                    if alert_hub.set_alert_campgrounds(subscription, await alert_campground_ids(user["id"])):
+                        yield sse_frame("watching", {"campground_ids": sorted(subscription.campground_ids)})
+        finally:
+            alert_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def index_rec_areas(cache_key: Tuple[str, ...], rec_areas: List[Dict[str, Any]], age: float):
+    """Add looked-up rec areas to the autocomplete index, whether this worker fetched them or another did"""
+    if cache_key[0] == "state":
+        rec_area_index.seed_state(cache_key[1], rec_areas, time.time() - age)
+    else:
+        rec_area_index.add(rec_areas, cache_key[2] or None)
+
+async def seed_rec_area_state(state: str) -> List[Dict[str, Any]]:
+    """A state's rec areas, looked up unless another worker recently did, and added to the index"""
+    rec_areas, _ = await rec_area_cache.get_or_fetch(
+        ("state", state.upper()),
+        lambda: provider_executor.run(_find_rec_areas, state=state.upper()),
+        on_load=index_rec_areas
+    )
+    return rec_areas
+
+async def lookup_recreation_areas(search_string: str, state: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Rec areas matching a RIDB search string, cached and added to the index"""
+    rec_areas, _ = await rec_area_cache.get_or_fetch(
+        ("search", search_string.strip().lower(), (state or "").upper()),
+        lambda: provider_executor.run(_find_rec_areas, search_string=search_string, state=state),
+        on_load=index_rec_areas
+    )
+    return rec_areas
+
 @app.post("/api/rec-areas")
 async def find_recreation_areas(request: RecAreaSearchRequest):
     """
     Find recreation areas based on a search string.
     """
     try:
-        from camply.providers.recreation_dot_gov.recdotgov_provider import RecreationDotGovBase
-        from camply.containers.api_responses import RecreationAreaResponse
-        from camply.config import RIDBConfig
-
-        class MyRecDotGovProvider(RecreationDotGovBase):
-            @property
-            def api_search_result_key(self):
-                return "RecAreaID"
-            @property
-            def activity_name(self):
-                return "CAMPING"
-            @property
-            def api_search_result_class(self):
-                return RecreationAreaResponse
-            @property
-            def facility_type(self):
-                return "Campground"
-            @property
-            def resource_api_path(self):
-                return RIDBConfig.REC_AREA_API_PATH
-            @property
-            def api_base_path(self):
-                return RIDBConfig.RIDB_BASE_PATH
-            @property
-            def api_response_class(self):
-                return RecreationAreaResponse
-            def paginate_recdotgov_campsites(self, facility_id):
-                return []
-
-        provider = MyRecDotGovProvider()
-        results = provider.find_recreation_areas(search_string=request.search_string, state=request.state)
-
-        rec_areas = []
-        for rec_area in results:
-            rec_areas.append({
-                "id": rec_area.get("RecAreaID"),
-                "name": rec_area.get("RecAreaName")
-            })
-
-        return {"success": True, "data": rec_areas}
+        rec_areas = await lookup_recreation_areas(request.search_string, request.state)
+        return {"success": True, "data": [{"id": rec_area["id"], "name": rec_area["name"]} for rec_area in rec_areas]}
 
+    except ProviderBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except UpstreamUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+    except ProviderTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logging.error(f"Error finding recreation areas: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error finding recreation areas: {str(e)}")
 
 
-@app.patch("/api/campgrounds/alerts/{alert_id}")
+@app.get("/api/rec-areas")
+async def find_recreation_areas_get(search_string: str = Query(...), state: Optional[str] = Query(None)):
+    """GET form of POST /api/rec-areas, cacheable by browsers and CDNs"""
+    return await find_recreation_areas(RecAreaSearchRequest(search_string=search_string, state=state))
+
+@app.get("/api/rec-areas/autocomplete", response_class=FastJSONResponse)
+async def autocomplete_recreation_areas(
+    q: str = Query(..., description="Prefix of any word of a rec-area name"),
+    state: Optional[str] = Query(None),
+    limit: int = Query(REC_AREA_AUTOCOMPLETE_LIMIT, ge=1, le=50)
+):
+    """
+    Typeahead rec-area matches from the local index. When the index has none, a
+    prefix of at least REC_AREA_LIVE_MIN_LENGTH characters falls back to a live
+    lookup, whose results are added to the index for the next keystroke.
+    """
+    matches = rec_area_index.search(q, state, limit)
+    source = "index"
+    if not matches and len(q.strip()) >= REC_AREA_LIVE_MIN_LENGTH:
+        source = "live"
+        try:
+            rec_areas = await lookup_recreation_areas(q, state)
+        except (ProviderBusyError, ProviderTimeoutError, UpstreamUnavailableError) as e:
+            logger.warning(f"Rec-area autocomplete without live lookup: {str(e)}")
+            rec_areas = []
+        # RIDB matches on more than the name; fall back to its order when no name matches the prefix
+        matches = rec_area_index.search(q, state, limit) or rec_areas[:limit]
+    return FastJSONResponse({
+        "success": True,
+        "data": [{"id": area["id"], "name": area["name"], "states": area["states"]} for area in matches],
+        "source": source
+    })
+
+@app.patch("/api/campgrounds/alerts/{alert_id}", response_class=FastJSONResponse)
 async def update_alert(
     alert_id: str,
     update_data: dict,
@@ -1133,68 +1895,24 @@ async def update_alert(
 ):
     """Update an alert"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Get the alert and verify ownership
-            cursor.execute("""
-                SELECT id, user_id, campground_name, start_date, end_date, site_type, party_size, is_active, created_at
-                FROM alerts WHERE id = ? AND is_active = 1
-            """, (alert_id,))
-            
-            alert_row = cursor.fetchone()
-            if not alert_row:
-                raise HTTPException(status_code=404, detail="Alert not found")
-            
-            if alert_row["user_id"] != current_user["id"]:
-                raise HTTPException(status_code=403, detail="Not authorized to update this alert")
-            
-            # Prepare update fields (only allow certain fields to be updated)
-            allowed_fields = ["start_date", "end_date", "site_type", "party_size", "is_active"]
-            update_fields = []
-            update_values = []
-            
-            for key, value in update_data.items():
-                if key in allowed_fields:
-                    update_fields.append(f"{key} = ?")
-                    update_values.append(value)
-            
-            if not update_fields:
-                raise HTTPException(status_code=400, detail="No valid fields to update")
-            
-            # Add updated timestamp
-            update_fields.append("created_at = ?")  # Using created_at as updated_at for simplicity
-            update_values.append(datetime.utcnow().isoformat())
-            update_values.append(alert_id)
-            
-            # Update the alert
-            cursor.execute(f"""
-                UPDATE alerts SET {', '.join(update_fields)}
-                WHERE id = ?
-            """, update_values)
-            
-            conn.commit()
-            
-            # Return updated alert
-            cursor.execute("""
-                SELECT id, user_id, campground_name, start_date, end_date, site_type, party_size, is_active, created_at
-                FROM alerts WHERE id = ?
-            """, (alert_id,))
-            
-            updated_alert = cursor.fetchone()
-            alert_data = {
-                "id": updated_alert["id"],
-                "user_id": updated_alert["user_id"],
-                "campground_name": updated_alert["campground_name"],
-                "start_date": updated_alert["start_date"],
-                "end_date": updated_alert["end_date"],
-                "site_type": updated_alert["site_type"],
-                "party_size": updated_alert["party_size"],
-                "is_active": bool(updated_alert["is_active"]),
-                "created_at": updated_alert["created_at"]
-            }
-            
-            return {"success": True, "data": alert_data}
+        # Get the alert and verify ownership
+        alert_row = await alert_repository.get(alert_id)
+        if not alert_row:
+            raise HTTPException(status_code=404, detail="Alert not found")
+        
+        if alert_row["user_id"] != current_user["id"]:
+            raise HTTPException(status_code=403, detail="Not authorized to update this alert")
+        
+        # Only allow certain fields to be updated
+        if not any(key in UPDATABLE_ALERT_FIELDS for key in update_data):
+            raise HTTPException(status_code=400, detail="No valid fields to update")
+        
+        # Update the alert and return the updated row
+        alert_data = await alert_repository.update(alert_id, update_data, datetime.utcnow().isoformat())
+        if "is_active" in update_data:
+            await refresh_alert_watch(current_user["id"], resolve_alert_campground_id(alert_row))
+        
+        return FastJSONResponse({"success": True, "data": alert_data})
         
     except HTTPException:
         raise
@@ -1209,40 +1927,24 @@ async def delete_alert(
 ):
     """Delete an alert (soft delete by setting is_active to 0)"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Get the alert and verify ownership
-            cursor.execute("""
-                SELECT id, user_id FROM alerts WHERE id = ? AND is_active = 1
-            """, (alert_id,))
-            
-            alert_row = cursor.fetchone()
-            if not alert_row:
-                raise HTTPException(status_code=404, detail="Alert not found")
-            
-            if alert_row["user_id"] != current_user["id"]:
-                raise HTTPException(status_code=403, detail="Not authorized to delete this alert")
-            
-            # Soft delete the alert
-            cursor.execute("""
-                UPDATE alerts SET is_active = 0 WHERE id = ?
-            """, (alert_id,))
-            
-            conn.commit()
-            
-            if cursor.rowcount == 0:
-                raise HTTPException(status_code=404, detail="Alert not found")
-            
-            logger.info(f"Alert {alert_id} deleted by user {current_user['id']}")
-            return {"success": True, "message": "Alert deleted successfully"}
+        # Get the alert and verify ownership
+        alert_row = await alert_repository.get(alert_id)
+        if not alert_row:
+            raise HTTPException(status_code=404, detail="Alert not found")
+        
+        if alert_row["user_id"] != current_user["id"]:
+            raise HTTPException(status_code=403, detail="Not authorized to delete this alert")
+        
+        # Soft delete the alert
+        if await alert_repository.deactivate(alert_id, datetime.utcnow().isoformat()) == 0:
+            raise HTTPException(status_code=404, detail="Alert not found")
+        
+        logger.info(f"Alert {alert_id} deleted by user {current_user['id']}")
+        await refresh_alert_watch(current_user["id"], resolve_alert_campground_id(alert_row))
+        return {"success": True, "message": "Alert deleted successfully"}
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error deleting alert: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to delete alert")
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
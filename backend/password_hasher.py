@@ -0,0 +1,131 @@
+"""
+bcrypt hashing and verification on a process pool
+
+A bcrypt call at a sensible work factor burns a couple of hundred milliseconds
+of CPU while holding the GIL, so running it inside `register`/`login` froze
+every other request on the worker. Password work goes to a process pool sized
+to the machine's cores instead, with a bounded queue that turns overload into
+429 responses rather than an ever-growing backlog.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+import bcrypt
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+
+class PasswordQueueFullError(Exception):
+    """Raised when too many password operations are already pending"""
+
+
+def _hash_password(password: str, rounds: int) -> str:
+    salt = bcrypt.gensalt(rounds=rounds)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def _verify_password(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """Work factor a bcrypt hash was created with ("$2b$12$..." -> 12)"""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """Process pool for bcrypt with queue-depth backpressure"""
+
+    def __init__(self, workers: int, max_queue: int, rounds: int):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+        self.hashed = 0
+        self.verified = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: the API process runs many threads, which forking doesn't play well with.
+            # Spawned workers re-import __main__, so main.py hands `python main.py` to uvicorn
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _submit(self, func, *args) -> Any:
+        if self._pending >= self.max_queue:
+            self.rejected += 1
+            raise PasswordQueueFullError("Too many authentication requests, please retry shortly")
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next request instead of failing forever
+            self.shutdown()
+            raise
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a password at the configured work factor"""
+        hashed = await self._submit(_hash_password, password, self.rounds)
+        self.hashed += 1
+        return hashed
+
+    async def rehash(self, password: str) -> str:
+        """Hash a password whose stored hash uses an outdated work factor"""
+        hashed = await self.hash(password)
+        self.rehashed += 1
+        return hashed
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        """Check a password against a bcrypt hash"""
+        result = await self._submit(_verify_password, password, hashed)
+        self.verified += 1
+        return result
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """Whether a stored hash uses a different work factor than configured"""
+        return hash_rounds(hashed) != self.rounds
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool sizing and queue metrics"""
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "hashed": self.hashed,
+            "verified": self.verified,
+            "rehashed": self.rehashed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=PASSWORD_HASH_WORKERS,
+    max_queue=PASSWORD_HASH_MAX_QUEUE,
+    rounds=BCRYPT_ROUNDS,
+)
@@ -0,0 +1,144 @@
+"""
+Bounded worker pool for blocking camply provider calls
+
+camply talks to Recreation.gov with synchronous `requests` calls, so running it
+directly inside an `async def` handler stalls the whole uvicorn worker. Every
+provider call goes through `provider_executor.run(...)` instead, which hands the
+work to a sized thread pool, caps how many calls run at once, rejects callers
+when the wait queue is full and enforces a per-call timeout.
+"""
+import asyncio
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_POOL_SIZE = int(os.getenv("PROVIDER_POOL_SIZE", "8"))
+PROVIDER_MAX_CONCURRENCY = int(os.getenv("PROVIDER_MAX_CONCURRENCY", str(PROVIDER_POOL_SIZE)))
+PROVIDER_MAX_QUEUE = int(os.getenv("PROVIDER_MAX_QUEUE", "100"))
+PROVIDER_CALL_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_CALL_TIMEOUT_SECONDS", "60"))
+
+
+class ProviderBusyError(Exception):
+    """Raised when too many provider calls are already waiting for a worker"""
+
+
+class ProviderTimeoutError(Exception):
+    """Raised when a provider call does not finish within its timeout"""
+
+
+class ProviderExecutor:
+    """Runs blocking provider calls on a thread pool with concurrency limits"""
+
+    def __init__(self, max_workers: int, max_concurrency: int, max_queue: int, default_timeout: float):
+        self.max_workers = max_workers
+        # A slot is only useful if a thread is free to take it
+        self.max_concurrency = max(1, min(max_concurrency, max_workers))
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="camply")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._waiting = 0
+        self._in_flight = 0
+        self._max_waiting_seen = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._timeouts = 0
+        self._rejected = 0
+        self._total_latency = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Return the concurrency semaphore bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+            self._in_flight = 0
+        return self._semaphore
+
+    async def run(self, func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run `func(*args, **kwargs)` on the worker pool and await its result"""
+        semaphore = self._get_semaphore()
+
+        if self._waiting >= self.max_queue:
+            self._rejected += 1
+            raise ProviderBusyError("Too many pending upstream requests, please retry shortly")
+
+        self._waiting += 1
+        self._max_waiting_seen = max(self._max_waiting_seen, self._waiting)
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        self._submitted += 1
+        self._in_flight += 1
+        try:
+            future = loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        except BaseException:
+            self._in_flight -= 1
+            semaphore.release()
+            raise
+
+        # The slot is released when the worker thread actually finishes, so a
+        # timed-out call still counts against the limit until its thread is free.
+        future.add_done_callback(functools.partial(self._on_done, semaphore, started))
+
+        call_timeout = self.default_timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), call_timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            name = getattr(func, "__name__", repr(func))
+            logger.warning(f"Provider call {name} timed out after {call_timeout}s")
+            raise ProviderTimeoutError(f"Upstream call timed out after {call_timeout} seconds")
+
+    def _on_done(self, semaphore: asyncio.Semaphore, started: float, future: asyncio.Future):
+        """Release the worker slot and record the outcome of a finished call"""
+        self._in_flight -= 1
+        semaphore.release()
+        self._total_latency += time.monotonic() - started
+        if future.cancelled() or future.exception() is not None:
+            self._failed += 1
+        else:
+            self._completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool sizing and queue-depth metrics"""
+        finished = self._completed + self._failed
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "default_timeout_seconds": self.default_timeout,
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "max_queue_depth_seen": self._max_waiting_seen,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "timeouts": self._timeouts,
+            "rejected": self._rejected,
+            "avg_latency_ms": round(self._total_latency / finished * 1000, 2) if finished else 0.0,
+        }
+
+    def shutdown(self):
+        """Stop accepting work and let running calls finish"""
+        self._executor.shutdown(wait=False)
+
+
+provider_executor = ProviderExecutor(
+    max_workers=PROVIDER_POOL_SIZE,
+    max_concurrency=PROVIDER_MAX_CONCURRENCY,
+    max_queue=PROVIDER_MAX_QUEUE,
+    default_timeout=PROVIDER_CALL_TIMEOUT_SECONDS,
+)
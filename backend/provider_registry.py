@@ -0,0 +1,279 @@
+"""
+Shared Recreation.gov providers on a keep-alive HTTP session
+
+Every camply call used to construct a fresh provider, which builds a new
+`requests.Session`, re-reads the user-agent data and opens new TLS connections,
+and the availability requests bypass the session entirely via `requests.request`.
+The registry builds each provider once at startup on a single session whose
+connection pool is sized for the provider worker threads, so upstream calls
+reuse warm connections.
+
+The session's adapter also applies the upstream rate limiter, retries and
+circuit breaker, so camply's own retry loops are replaced with single attempts.
+"""
+import logging
+import os
+import threading
+import time
+from json import loads
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from camply import RecreationDotGov, SearchRecreationDotGov
+from camply.config import STANDARD_HEADERS, RecreationBookingConfig, RIDBConfig
+from camply.containers import CampgroundFacility
+from camply.containers.api_responses import RecreationAreaResponse
+from camply.providers.recreation_dot_gov.recdotgov_provider import RecreationDotGovBase
+
+from provider_executor import PROVIDER_POOL_SIZE
+from upstream_limiter import upstream_limiter
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_HTTP_POOL_CONNECTIONS = int(os.getenv("PROVIDER_HTTP_POOL_CONNECTIONS", "4"))
+# One idle socket per provider worker thread by default
+PROVIDER_HTTP_POOL_MAXSIZE = int(os.getenv("PROVIDER_HTTP_POOL_MAXSIZE", str(PROVIDER_POOL_SIZE)))
+PROVIDER_HTTP_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_HTTP_TIMEOUT_SECONDS", "30"))
+
+
+class LimitedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that charges each request to its upstream budget and retries 429/5xx"""
+
+    def send(self, request, **kwargs):
+        endpoint = upstream_limiter.endpoint_for_url(request.url)
+        attempt = 0
+        while True:
+            upstream_limiter.acquire(endpoint)
+            try:
+                response = super().send(request, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                upstream_limiter.record_failure(endpoint)
+                if attempt >= upstream_limiter.max_retries:
+                    raise
+                delay = upstream_limiter.backoff(attempt)
+            except Exception:
+                # Any other error (invalid URL, SSL setup) still ends the call; count it so a probe can't leak
+                upstream_limiter.record_failure(endpoint)
+                raise
+            else:
+                if response.status_code != 429 and response.status_code < 500:
+                    upstream_limiter.record_success(endpoint)
+                    return response
+                upstream_limiter.record_failure(endpoint, throttled=response.status_code == 429)
+                if attempt >= upstream_limiter.max_retries:
+                    return response
+                delay = upstream_limiter.backoff(attempt, response.headers.get("Retry-After"))
+                response.close()
+            attempt += 1
+            endpoint.retries += 1
+            time.sleep(delay)
+
+
+def build_session(pool_connections: int, pool_maxsize: int) -> requests.Session:
+    """requests session with a bounded keep-alive connection pool"""
+    session = requests.Session()
+    # Hosts beyond pool_connections are evicted LRU; each host keeps up to pool_maxsize idle sockets
+    adapter = LimitedHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class SingleAttemptMixin:
+    """
+    camply's RIDB and availability calls retry through tenacity for up to minutes,
+    which would keep retrying straight through an open circuit breaker. The shared
+    adapter already retries, so these make exactly one attempt.
+    """
+
+    def get_ridb_data(self, path: str, params: Optional[dict] = None):
+        headers = self.headers.copy()
+        headers.update(self._ridb_api_headers)
+        response = self.session.get(
+            url=self._ridb_get_endpoint(path=path), headers=headers, params=params,
+            timeout=PROVIDER_HTTP_TIMEOUT_SECONDS
+        )
+        if response.ok is False:
+            raise ConnectionError(f"Receiving bad data from Recreation.gov API: {response.text}")
+        return loads(response.content)
+
+    @classmethod
+    def make_recdotgov_request_retry(cls, url: str, method: str = "GET", params: Optional[Dict[str, Any]] = None, **kwargs) -> requests.Response:
+        response = cls.make_recdotgov_request(url=url, method=method, params=params, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def _make_recdotgov_availability_request(self, campground_id: int, month) -> requests.Response:
+        response = self.make_recdotgov_availability_request(campground_id, month)
+        if response.ok is False:
+            raise ConnectionError(f"Bad Data Returned from the RecreationDotGov API: {response.text}")
+        return response
+
+
+class PooledRecreationDotGov(SingleAttemptMixin, RecreationDotGov):
+    """RecreationDotGov provider whose requests all go through the shared session"""
+
+    http_session: requests.Session = None
+
+    def __init__(self, session: requests.Session):
+        super().__init__()
+        self.session = session
+        self.session.headers.update(self.headers)
+
+    @classmethod
+    def make_recdotgov_request(cls, url: str, method: str = "GET", params: Optional[Dict[str, Any]] = None, **kwargs) -> requests.Response:
+        """Same request camply makes, but on the keep-alive session instead of a one-off connection"""
+        # The session adds its User-Agent; these headers take precedence over its defaults
+        headers = STANDARD_HEADERS.copy()
+        headers.update(RecreationBookingConfig.API_REFERRERS)
+        return cls.http_session.request(
+            method=method, url=url, headers=headers, params=params,
+            timeout=PROVIDER_HTTP_TIMEOUT_SECONDS, **kwargs
+        )
+
+    def find_campground_facilities(self, state: Optional[str] = None, rec_area_id: Optional[int] = None,
+                                   campground_id: Optional[int] = None) -> List[Tuple[dict, CampgroundFacility]]:
+        """
+        Same campgrounds as `find_campgrounds`, each paired with its raw RIDB
+        facility record. camply keeps only names and IDs; the record also has the
+        coordinates, address, description and activities.
+        """
+        if campground_id is not None:
+            facilities = [self.get_ridb_data(path=f"{RIDBConfig.FACILITIES_API_PATH}/{campground_id}", params={"full": True})]
+        elif rec_area_id is not None:
+            facilities = self._ridb_get_paginate(
+                path=f"{RIDBConfig.REC_AREA_API_PATH}/{rec_area_id}/{RIDBConfig.FACILITIES_API_PATH}",
+                params=dict(full="true")
+            )
+        elif state:
+            facilities = self._ridb_get_paginate(
+                path=RIDBConfig.FACILITIES_API_PATH,
+                params=dict(query=None, full="true", state=state.upper(), activity=self.activity_name)
+            )
+        else:
+            raise ValueError("A state, rec_area_id or campground_id is required")
+
+        pairs = []
+        for facility in self._filter_facilities_responses(responses=facilities):
+            facility, campground = self.process_facilities_responses(facility=facility)
+            if campground is not None:
+                pairs.append((facility, campground))
+        return pairs
+
+
+class RecAreaProvider(SingleAttemptMixin, RecreationDotGovBase):
+    """RIDB provider for recreation area searches"""
+
+    def __init__(self, session: requests.Session):
+        super().__init__()
+        self.session = session
+
+    @property
+    def api_search_result_key(self):
+        return "RecAreaID"
+
+    @property
+    def activity_name(self):
+        return "CAMPING"
+
+    @property
+    def api_search_result_class(self):
+        return RecreationAreaResponse
+
+    @property
+    def facility_type(self):
+        return "Campground"
+
+    @property
+    def resource_api_path(self):
+        return RIDBConfig.REC_AREA_API_PATH
+
+    @property
+    def api_base_path(self):
+        return RIDBConfig.RIDB_BASE_PATH
+
+    @property
+    def api_response_class(self):
+        return RecreationAreaResponse
+
+    def paginate_recdotgov_campsites(self, facility_id):
+        return []
+
+
+class PooledSearchRecreationDotGov(SearchRecreationDotGov):
+    """Availability search that reuses the registry's campground provider"""
+
+    @staticmethod
+    def provider_class():
+        return provider_registry.campgrounds
+
+
+class ProviderRegistry:
+    """Process-wide provider instances built once and shared by all requests"""
+
+    def __init__(self, pool_connections: int, pool_maxsize: int):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.session: Optional[requests.Session] = None
+        self._campgrounds: Optional[PooledRecreationDotGov] = None
+        self._rec_areas: Optional[RecAreaProvider] = None
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.errors = 0
+
+    def _count_response(self, response, *args, **kwargs):
+        self.requests += 1
+        if not response.ok:
+            self.errors += 1
+
+    def build(self):
+        """Create the shared session and providers (idempotent)"""
+        with self._lock:
+            if self.session is not None:
+                return
+            session = build_session(self.pool_connections, self.pool_maxsize)
+            session.hooks["response"].append(self._count_response)
+            self._campgrounds = PooledRecreationDotGov(session)
+            self._rec_areas = RecAreaProvider(session)
+            PooledRecreationDotGov.http_session = session
+            self.session = session
+            logger.info(f"Provider registry ready: pool_maxsize={self.pool_maxsize}")
+
+    @property
+    def campgrounds(self) -> PooledRecreationDotGov:
+        if self.session is None:
+            self.build()
+        return self._campgrounds
+
+    @property
+    def rec_areas(self) -> RecAreaProvider:
+        if self.session is None:
+            self.build()
+        return self._rec_areas
+
+    def stats(self) -> Dict[str, Any]:
+        """Return session sizing and request counters"""
+        return {
+            "built": self.session is not None,
+            "pool_connections": self.pool_connections,
+            "pool_maxsize": self.pool_maxsize,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+    def close(self):
+        """Close the shared session's pooled connections"""
+        with self._lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+                PooledRecreationDotGov.http_session = None
+
+
+provider_registry = ProviderRegistry(
+    pool_connections=PROVIDER_HTTP_POOL_CONNECTIONS,
+    pool_maxsize=PROVIDER_HTTP_POOL_MAXSIZE,
+)
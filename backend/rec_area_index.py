@@ -0,0 +1,190 @@
+"""
+Prefix index of recreation areas for search-box autocomplete
+
+The search box looked recreation areas up with a live RIDB query for every
+string typed into it. The index keeps every known rec area in memory, seeded
+state by state from RIDB in the background and topped up with the results of
+live lookups. Every word position of a name becomes a key in a sorted array,
+so "yose" and "valley" both find "Yosemite Valley", and a typeahead query is a
+bisect to the first key at or after the prefix followed by a short forward
+walk. Keys are kept per state so a state filter costs nothing. Matches at the
+start of a name rank before matches on a later word.
+"""
+import asyncio
+import logging
+import os
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from campground_catalog import CATALOG_STATES
+from search_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+REC_AREA_INDEX_REFRESH_HOURS = float(os.getenv("REC_AREA_INDEX_REFRESH_HOURS", "24"))
+REC_AREA_INDEX_REFRESH_PAUSE_SECONDS = float(os.getenv("REC_AREA_INDEX_REFRESH_PAUSE_SECONDS", "2"))
+REC_AREA_INDEX_BACKGROUND_REFRESH = os.getenv("REC_AREA_INDEX_BACKGROUND_REFRESH", "true").lower() == "true"
+REC_AREA_AUTOCOMPLETE_LIMIT = int(os.getenv("REC_AREA_AUTOCOMPLETE_LIMIT", "10"))
+# Shorter prefixes are answered from the index only, never with a live lookup
+REC_AREA_LIVE_MIN_LENGTH = int(os.getenv("REC_AREA_LIVE_MIN_LENGTH", "3"))
+
+
+def rec_area_record(rec_area: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a RIDB recreation area to what the index and endpoints use"""
+    states = {
+        (address.get("AddressStateCode") or "").upper()
+        for address in rec_area.get("RECAREAADDRESS") or []
+    }
+    return {
+        "id": rec_area.get("RecAreaID"),
+        "name": rec_area.get("RecAreaName") or "",
+        "states": sorted(state for state in states if state),
+    }
+
+
+class RecAreaIndex:
+    """Sorted word-prefix keys over known recreation areas, per state"""
+
+    def __init__(self):
+        self._areas: Dict[str, Dict[str, Any]] = {}
+        # state ("" for every state) -> (name-start keys, later-word keys), each sorted (key, area id)
+        self._keys: Dict[str, Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]] = {}
+        self._built_version = None
+        self._state_seeded_at: Dict[str, float] = {}
+        self.version = 0
+
+        self.queries = 0
+        self.empty_results = 0
+
+    def add(self, areas: Iterable[Dict[str, Any]], state: Optional[str] = None) -> int:
+        """
+        Add or update rec-area records. `state` is the state they were looked up
+        under, which RIDB matched even if an area lists no address there.
+        Returns how many records changed.
+        """
+        changed = 0
+        # Live lookups add a few areas at a time; insert their keys rather than rebuild
+        incremental = self._built_version == self.version
+        for area in areas:
+            if area.get("id") is None or not area.get("name"):
+                continue
+            area_id = str(area["id"])
+            states = set(area.get("states") or ())
+            if state:
+                states.add(state.upper())
+            existing = self._areas.get(area_id)
+            if existing is not None:
+                states.update(existing["states"])
+            record = {"id": area["id"], "name": area["name"], "states": sorted(states)}
+            if record != existing:
+                if incremental and (existing is None or existing["name"] == record["name"]):
+                    self._insert_keys(area_id, record, existing)
+                else:
+                    incremental = False
+                self._areas[area_id] = record
+                changed += 1
+        if changed:
+            self.version += 1
+            if incremental:
+                self._built_version = self.version
+        return changed
+
+    def seed_state(self, state: str, areas: Iterable[Dict[str, Any]], seeded_at: Optional[float] = None) -> int:
+        """Add a state's full list of rec areas, fetched at `seeded_at`"""
+        changed = self.add(areas, state)
+        self._state_seeded_at[state.upper()] = seeded_at or time.time()
+        return changed
+
+    def _insert_keys(self, area_id: str, record: Dict[str, Any], existing: Optional[Dict[str, Any]]):
+        """Add the keys of a new area, or of the states newly listed for a known one"""
+        if existing is None:
+            states = ("", *record["states"])
+        else:
+            states = [state for state in record["states"] if state not in existing["states"]]
+        words = tokenize(record["name"])
+        for state in states:
+            name_keys, word_keys = self._keys.setdefault(state, ([], []))
+            for position in range(len(words)):
+                insort(name_keys if position == 0 else word_keys, (" ".join(words[position:]), area_id))
+
+    def _build(self):
+        """Rebuild the sorted key arrays after the records changed"""
+        name_keys: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        word_keys: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        for area_id, area in self._areas.items():
+            words = tokenize(area["name"])
+            for position in range(len(words)):
+                key = (" ".join(words[position:]), area_id)
+                target = name_keys if position == 0 else word_keys
+                for state in ("", *area["states"]):
+                    target[state].append(key)
+        self._keys = {
+            state: (sorted(name_keys.get(state, ())), sorted(word_keys.get(state, ())))
+            for state in name_keys.keys() | word_keys.keys()
+        }
+        self._built_version = self.version
+
+    def search(self, prefix: str, state: Optional[str] = None, limit: int = REC_AREA_AUTOCOMPLETE_LIMIT) -> List[Dict[str, Any]]:
+        """Up to `limit` rec areas with a name word starting with `prefix`, name-start matches first"""
+        self.queries += 1
+        needle = " ".join(tokenize(prefix))
+        if not needle:
+            return []
+        if self._built_version != self.version:
+            self._build()
+
+        matches = []
+        seen = set()
+        for keys in self._keys.get((state or "").upper(), ((), ())):
+            i = bisect_left(keys, (needle,))
+            while i < len(keys) and len(matches) < limit and keys[i][0].startswith(needle):
+                area_id = keys[i][1]
+                if area_id not in seen:
+                    seen.add(area_id)
+                    matches.append(self._areas[area_id])
+                i += 1
+        if not matches:
+            self.empty_results += 1
+        return matches
+
+    def is_state_fresh(self, state: str) -> bool:
+        """Whether a state was seeded within the refresh interval"""
+        seeded_at = self._state_seeded_at.get(state.upper())
+        return seeded_at is not None and time.time() - seeded_at < REC_AREA_INDEX_REFRESH_HOURS * 3600
+
+    def stale_states(self) -> List[str]:
+        """States that have never been seeded or are past the refresh interval"""
+        return [state for state in CATALOG_STATES if not self.is_state_fresh(state)]
+
+    async def refresh_stale_states(self, fetch_state: Callable[[str], Awaitable[Any]]):
+        """Seed every stale state one at a time so user traffic keeps priority"""
+        for state in self.stale_states():
+            try:
+                await fetch_state(state)
+            except Exception as e:
+                logger.error(f"Error refreshing rec-area index for {state}: {str(e)}")
+            await asyncio.sleep(REC_AREA_INDEX_REFRESH_PAUSE_SECONDS)
+
+    async def run_refresh_loop(self, fetch_state: Callable[[str], Awaitable[Any]]):
+        """Keep the index fresh for the life of the process"""
+        while True:
+            await self.refresh_stale_states(fetch_state)
+            await asyncio.sleep(max(60.0, REC_AREA_INDEX_REFRESH_HOURS * 3600 / 4))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size, freshness and query counters"""
+        all_keys = self._keys.get("", ((), ()))
+        return {
+            "rec_areas": len(self._areas),
+            "keys": len(all_keys[0]) + len(all_keys[1]),
+            "states_seeded": len(self._state_seeded_at),
+            "states_stale": len(self.stale_states()),
+            "queries": self.queries,
+            "empty_results": self.empty_results,
+            "version": self.version,
+        }
+
+
+rec_area_index = RecAreaIndex()
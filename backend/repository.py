@@ -0,0 +1,290 @@
+"""
+Async data access for users, alerts and dashboard stats
+
+SQLite calls are blocking, so handlers never touch a connection directly.
+Reads run on a small pool of reader threads and writes on one dedicated writer
+thread, each using connections from the SQLiteConnectionPool. Handlers await the
+typed repository methods below instead.
+"""
+import asyncio
+import functools
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypedDict, TypeVar
+
+from db_pool import SQLiteConnectionPool
+
+T = TypeVar("T")
+
+ALERT_COLUMNS = (
+    "id, user_id, campground_id, campground_name, start_date, end_date, "
+    "site_type, party_size, is_active, created_at, updated_at"
+)
+# Only these alert fields may be changed through update_alert
+UPDATABLE_ALERT_FIELDS = ("start_date", "end_date", "site_type", "party_size", "is_active")
+
+
+class UserRecord(TypedDict):
+    id: str
+    first_name: str
+    last_name: str
+    email: str
+    created_at: str
+
+
+class UserWithPasswordRecord(UserRecord):
+    password: str
+
+
+class AlertRecord(TypedDict):
+    id: str
+    user_id: str
+    campground_id: Optional[str]
+    campground_name: str
+    start_date: str
+    end_date: str
+    site_type: str
+    party_size: int
+    is_active: bool
+    created_at: str
+    updated_at: Optional[str]
+
+
+class DashboardCounts(TypedDict):
+    total_users: int
+    total_active_alerts: int
+    recent_registrations: int
+
+
+def _alert_from_row(row: sqlite3.Row) -> AlertRecord:
+    alert = dict(row)
+    alert["is_active"] = bool(alert["is_active"])
+    return alert
+
+
+class Database:
+    """Runs blocking SQLite work on dedicated reader and writer threads"""
+
+    def __init__(self, pool: SQLiteConnectionPool):
+        self.pool = pool
+        self._reader_executor = ThreadPoolExecutor(max_workers=pool.reader_pool_size, thread_name_prefix="db-reader")
+        # One writer thread keeps writes ordered and never blocks the event loop on the writer lock
+        self._writer_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+
+    def _run_read(self, fn: Callable[..., T], *args) -> T:
+        with self.pool.reader() as conn:
+            return fn(conn, *args)
+
+    def _run_write(self, fn: Callable[..., T], *args) -> T:
+        with self.pool.writer() as conn:
+            result = fn(conn, *args)
+            conn.commit()
+            return result
+
+    async def read(self, fn: Callable[..., T], *args) -> T:
+        """Run `fn(conn, *args)` with a reader connection off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._reader_executor, functools.partial(self._run_read, fn, *args))
+
+    async def write(self, fn: Callable[..., T], *args) -> T:
+        """Run `fn(conn, *args)` with the writer connection and commit, off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer_executor, functools.partial(self._run_write, fn, *args))
+
+    def shutdown(self):
+        """Stop the database threads and close pooled connections"""
+        self._reader_executor.shutdown(wait=True)
+        self._writer_executor.shutdown(wait=True)
+        self.pool.close()
+
+
+class UserRepository:
+    """User lookups and registration"""
+
+    def __init__(self, db: Database):
+        self.db = db
+        self._change_listeners: List[Callable[[str], None]] = []
+
+    def add_change_listener(self, callback: Callable[[str], None]):
+        """Register a callback run with the user ID whenever a user row is written"""
+        self._change_listeners.append(callback)
+
+    def _notify_changed(self, user_id: str):
+        for callback in self._change_listeners:
+            callback(user_id)
+
+    async def get_by_id(self, user_id: str) -> Optional[UserRecord]:
+        def query(conn):
+            row = conn.execute("""
+                SELECT id, first_name, last_name, email, created_at
+                FROM users WHERE id = ?
+            """, (user_id,)).fetchone()
+            return dict(row) if row else None
+        return await self.db.read(query)
+
+    async def get_by_email(self, email: str) -> Optional[UserWithPasswordRecord]:
+        def query(conn):
+            row = conn.execute("""
+                SELECT id, first_name, last_name, email, password, created_at
+                FROM users WHERE email = ?
+            """, (email,)).fetchone()
+            return dict(row) if row else None
+        return await self.db.read(query)
+
+    async def email_exists(self, email: str) -> bool:
+        def query(conn):
+            return conn.execute("SELECT 1 FROM users WHERE email = ?", (email,)).fetchone() is not None
+        return await self.db.read(query)
+
+    async def create(self, user: UserWithPasswordRecord) -> bool:
+        """Insert a user; returns False if the email is already registered"""
+        def insert(conn):
+            try:
+                conn.execute("""
+                    INSERT INTO users (id, first_name, last_name, email, password, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (
+                    user["id"], user["first_name"], user["last_name"],
+                    user["email"], user["password"], user["created_at"]
+                ))
+                return True
+            except sqlite3.IntegrityError:
+                return False
+        created = await self.db.write(insert)
+        if created:
+            self._notify_changed(user["id"])
+        return created
+
+    async def update_password(self, user_id: str, password_hash: str):
+        """Replace a user's stored password hash"""
+        def apply(conn):
+            conn.execute("UPDATE users SET password = ? WHERE id = ?", (password_hash, user_id))
+        await self.db.write(apply)
+        self._notify_changed(user_id)
+
+
+class AlertRepository:
+    """Alert CRUD and the bulk queries used by the alert engine"""
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    async def create(self, alert: AlertRecord) -> AlertRecord:
+        def insert(conn):
+            conn.execute(f"""
+                INSERT INTO alerts ({ALERT_COLUMNS})
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                alert["id"], alert["user_id"], alert["campground_id"], alert["campground_name"],
+                alert["start_date"], alert["end_date"], alert["site_type"], alert["party_size"],
+                1 if alert["is_active"] else 0, alert["created_at"], alert["updated_at"]
+            ))
+            return alert
+        return await self.db.write(insert)
+
+    async def get(self, alert_id: str, active_only: bool = True) -> Optional[AlertRecord]:
+        def query(conn):
+            sql = f"SELECT {ALERT_COLUMNS} FROM alerts WHERE id = ?"
+            if active_only:
+                sql += " AND is_active = 1"
+            row = conn.execute(sql, (alert_id,)).fetchone()
+            return _alert_from_row(row) if row else None
+        return await self.db.read(query)
+
+    async def list_active_for_user(self, user_id: str) -> List[AlertRecord]:
+        def query(conn):
+            rows = conn.execute(f"""
+                SELECT {ALERT_COLUMNS}
+                FROM alerts
+                WHERE user_id = ? AND is_active = 1
+                ORDER BY created_at DESC
+            """, (user_id,)).fetchall()
+            return [_alert_from_row(row) for row in rows]
+        return await self.db.read(query)
+
+    async def list_active(self) -> List[AlertRecord]:
+        def query(conn):
+            rows = conn.execute(f"SELECT {ALERT_COLUMNS} FROM alerts WHERE is_active = 1").fetchall()
+            return [_alert_from_row(row) for row in rows]
+        return await self.db.read(query)
+
+    async def update(self, alert_id: str, fields: Dict[str, Any], updated_at: str) -> Optional[AlertRecord]:
+        """Apply allowed field changes and return the updated alert"""
+        changes = [(key, value) for key, value in fields.items() if key in UPDATABLE_ALERT_FIELDS]
+
+        def apply(conn):
+            assignments = ", ".join(f"{key} = ?" for key, _ in changes)
+            conn.execute(
+                f"UPDATE alerts SET {assignments}, updated_at = ? WHERE id = ?",
+                [value for _, value in changes] + [updated_at, alert_id]
+            )
+            row = conn.execute(f"SELECT {ALERT_COLUMNS} FROM alerts WHERE id = ?", (alert_id,)).fetchone()
+            return _alert_from_row(row) if row else None
+        return await self.db.write(apply)
+
+    async def deactivate(self, alert_id: str, updated_at: str) -> int:
+        """Soft delete an alert; returns the number of rows changed"""
+        def apply(conn):
+            cursor = conn.execute("""
+                UPDATE alerts SET is_active = 0, updated_at = ? WHERE id = ? AND is_active = 1
+            """, (updated_at, alert_id))
+            return cursor.rowcount
+        return await self.db.write(apply)
+
+    async def list_missing_campground_id(self) -> List[Tuple[str, str]]:
+        """(id, campground_name) for alerts created before campground_id was stored"""
+        def query(conn):
+            rows = conn.execute("SELECT id, campground_name FROM alerts WHERE campground_id IS NULL").fetchall()
+            return [(row["id"], row["campground_name"]) for row in rows]
+        return await self.db.read(query)
+
+    async def set_campground_ids(self, updates: List[Tuple[str, str]]) -> int:
+        """Store (campground_id, alert_id) pairs"""
+        def apply(conn):
+            conn.executemany("UPDATE alerts SET campground_id = ? WHERE id = ?", updates)
+            return len(updates)
+        return await self.db.write(apply)
+
+    async def get_notified_stays(self, alert_ids: List[str]) -> Dict[str, List[Tuple[Any, str]]]:
+        """(campsite_id, booking_date) stays already notified, for the given alerts that have a record"""
+        def query(conn):
+            rows = conn.execute("""
+                SELECT id, notified_stays FROM alerts
+                WHERE id IN (SELECT value FROM json_each(?)) AND notified_stays IS NOT NULL
+            """, (json.dumps(alert_ids),)).fetchall()
+            return {row["id"]: [tuple(stay) for stay in json.loads(row["notified_stays"])] for row in rows}
+        return await self.db.read(query)
+
+    async def set_notified_stays(self, stays_by_alert: Dict[str, List[Tuple[Any, str]]]) -> int:
+        """Replace the notified stays of each given alert"""
+        def apply(conn):
+            conn.executemany(
+                "UPDATE alerts SET notified_stays = ? WHERE id = ?",
+                [(json.dumps(list(stays)), alert_id) for alert_id, stays in stays_by_alert.items()]
+            )
+            return len(stays_by_alert)
+        return await self.db.write(apply)
+
+
+class StatsRepository:
+    """Aggregate counts for the public dashboard"""
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    async def dashboard_counts(self) -> DashboardCounts:
+        """Read the trigger-maintained counters: primary key lookups, no table scans"""
+        def query(conn):
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            # Registrations over the last 7 calendar days, today included
+            recent_users = conn.execute("""
+                SELECT COALESCE(SUM(count), 0) as count FROM daily_registrations
+                WHERE day >= date('now', '-6 days')
+            """).fetchone()["count"]
+            return {
+                "total_users": counters.get("total_users", 0),
+                "total_active_alerts": counters.get("total_active_alerts", 0),
+                "recent_registrations": recent_users,
+            }
+        return await self.db.read(query)
@@ -0,0 +1,183 @@
+"""
+Inverted text index over the campground catalog
+
+Location searches used to substring-match every search term against every
+campground's name, description and recreation area. This index tokenizes those
+fields once per catalog version and scores matches with field-weighted BM25, so
+a search is a handful of posting-list lookups and set intersections.
+
+Rebuilding an index takes a noticeable slice of a second on a full catalog, and
+the catalog changes with every state refresh and single-facility lookup, so
+searches rebuild on a worker thread and swap the result in on the event loop.
+"""
+import asyncio
+import math
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Matches in the name count more than matches in the recreation area, which
+# count more than matches buried in the description
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "recreation_area": 2.0,
+    "description": 1.0,
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Shorter terms only match whole tokens, longer ones also match as a prefix ("pine" -> "pines")
+MIN_PREFIX_LENGTH = 3
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase alphanumeric tokens"""
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class CatalogIndex:
+    """An index rebuilt from the campground catalog whenever the catalog's version changes"""
+
+    def __init__(self):
+        self.version = None
+        # (catalog version, task computing the index for it)
+        self._rebuild: Optional[Tuple[Any, asyncio.Future]] = None
+        self.rebuilds = 0
+
+    def _compute(self, entries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Index attributes for these entries; touches no shared state, so it can run on a worker thread"""
+        raise NotImplementedError
+
+    def _apply(self, built: Dict[str, Any], version: Any):
+        # No awaits in here, so searches on the event loop never see half an index
+        for name, value in built.items():
+            setattr(self, name, value)
+        self.version = version
+        self.rebuilds += 1
+
+    def build(self, entries: Iterable[Dict[str, Any]], version: Any = None):
+        """Rebuild the index from catalog entries (blocking)"""
+        self._apply(self._compute(entries), version)
+
+    def sync(self, catalog) -> "CatalogIndex":
+        """Rebuild from the catalog if it changed since the last build (blocking)"""
+        if self.version != catalog.version:
+            self.build(catalog.entries(), catalog.version)
+        return self
+
+    async def refresh(self, catalog) -> "CatalogIndex":
+        """
+        Bring the index up to the catalog's current version without blocking the
+        event loop. Concurrent callers share one rebuild per catalog version.
+        """
+        wanted = catalog.version
+        while self.version is None or self.version < wanted:
+            if self._rebuild is None or self._rebuild[0] != catalog.version:
+                version = catalog.version
+                self._rebuild = (version, asyncio.ensure_future(asyncio.to_thread(self._compute, catalog.entries())))
+            version, task = self._rebuild
+            try:
+                await asyncio.shield(task)
+            finally:
+                # The first caller to resume installs the result, or clears a failed rebuild
+                if self._rebuild is not None and self._rebuild[1] is task and task.done():
+                    self._rebuild = None
+                    if not task.cancelled() and task.exception() is None:
+                        self._apply(task.result(), version)
+        return self
+
+
+class CampgroundSearchIndex(CatalogIndex):
+    """Field-weighted BM25 index over catalog entries"""
+
+    def __init__(self):
+        super().__init__()
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._vocabulary: List[str] = []
+        self._doc_lengths: Dict[str, float] = {}
+        self._avg_doc_length = 1.0
+        self._by_state: Dict[str, Set[str]] = {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def _compute(self, entries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        doc_lengths: Dict[str, float] = {}
+        by_state: Dict[str, Set[str]] = defaultdict(set)
+        docs: Dict[str, Dict[str, Any]] = {}
+
+        for entry in entries:
+            doc_id = entry["facility_id"]
+            docs[doc_id] = entry
+            by_state[(entry.get("state") or "").upper()].add(doc_id)
+
+            weighted_tf: Dict[str, float] = defaultdict(float)
+            length = 0.0
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(entry.get(field)):
+                    weighted_tf[token] += weight
+                    length += weight
+            for token, tf in weighted_tf.items():
+                postings[token][doc_id] = tf
+            doc_lengths[doc_id] = length
+
+        return {
+            "_postings": dict(postings),
+            "_vocabulary": sorted(postings),
+            "_doc_lengths": doc_lengths,
+            "_avg_doc_length": (sum(doc_lengths.values()) / len(doc_lengths)) if doc_lengths else 1.0,
+            "_by_state": dict(by_state),
+            "_entries": docs,
+        }
+
+    def _expand(self, term: str) -> List[str]:
+        """Vocabulary tokens a query term matches"""
+        if len(term) < MIN_PREFIX_LENGTH:
+            return [term] if term in self._postings else []
+        matches = []
+        i = bisect_left(self._vocabulary, term)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(term):
+            matches.append(self._vocabulary[i])
+            i += 1
+        return matches
+
+    def state_entries(self, state: str) -> List[Dict[str, Any]]:
+        """All indexed entries for a state"""
+        return [self._entries[doc_id] for doc_id in sorted(self._by_state.get(state.upper(), ()))]
+
+    def search(self, query: str, state: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """Rank entries matching any query term, optionally restricted to one state"""
+        allowed = self._by_state.get(state.upper(), set()) if state else None
+        total_docs = len(self._doc_lengths) or 1
+        scores: Dict[str, float] = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            for token in self._expand(term):
+                posting = self._postings[token]
+                doc_ids = posting.keys() & allowed if allowed is not None else posting.keys()
+                if not doc_ids:
+                    continue
+                idf = math.log(1 + (total_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id in doc_ids:
+                    tf = posting[doc_id]
+                    norm = 1 - BM25_B + BM25_B * self._doc_lengths[doc_id] / self._avg_doc_length
+                    scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self._entries[item[0]]["name"]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(self._entries[doc_id], score) for doc_id, score in ranked]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size metrics"""
+        return {
+            "documents": len(self._doc_lengths),
+            "tokens": len(self._postings),
+            "states": len(self._by_state),
+            "version": self.version,
+            "rebuilds": self.rebuilds,
+        }
+
+
+campground_search_index = CampgroundSearchIndex()
@@ -0,0 +1,240 @@
+"""
+Shared second-tier store for caches that every worker process can read
+
+Under several uvicorn workers, or several instances of the web service, each
+process kept its own caches and fetched the same campgrounds, rec areas and
+availability months from RIDB separately. The shared store sits behind the
+in-process caches: a SQLite file on local disk by default, which every worker
+on the machine opens, or a Redis-compatible server when REDIS_URL is set and
+the optional `redis` package is installed. Values are stored as bytes with the
+wall-clock time they were fetched, so every worker agrees on their age, and
+short-lived leases let one worker fetch a missing key while the others wait
+for its result instead of all going upstream at once. The same leases elect
+the one worker that runs background jobs such as alert evaluation.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import redis
+except ImportError:  # optional: SQLite only
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "true").lower() == "true"
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "shared_cache.db")
+REDIS_URL = os.getenv("REDIS_URL", "")
+# Prepended to every key; change it to start from an empty cache without flushing the store
+SHARED_CACHE_KEY_PREFIX = os.getenv("SHARED_CACHE_KEY_PREFIX", "campscout")
+# Entries outlive their TTL by this long so they can be served while upstream is unavailable
+SHARED_CACHE_STALE_SECONDS = float(os.getenv("SHARED_CACHE_STALE_SECONDS", "86400"))
+# How long a worker may hold a key's fetch lease, and how long others wait on it before fetching anyway
+SHARED_CACHE_LEASE_SECONDS = float(os.getenv("SHARED_CACHE_LEASE_SECONDS", "30"))
+SHARED_CACHE_LEASE_WAIT_SECONDS = float(os.getenv("SHARED_CACHE_LEASE_WAIT_SECONDS", "10"))
+SHARED_CACHE_PURGE_INTERVAL = 500  # writes between sweeps of expired SQLite rows
+
+
+class SQLiteSharedStore:
+    """Shared store in a local SQLite file, for workers on one machine (blocking)"""
+
+    backend = "sqlite"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_leases (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """(value, stored_at) for a key that hasn't expired, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM cache_entries WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return (bytes(row[0]), row[1]) if row else None
+
+    def set(self, key: str, value: bytes, stored_at: float, keep_seconds: float):
+        """Store a value, kept for `keep_seconds` after `stored_at`"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, value, stored_at, stored_at + keep_seconds)
+            )
+            self._writes += 1
+            if self._writes % SHARED_CACHE_PURGE_INTERVAL == 0:
+                self._conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def acquire_lease(self, key: str, owner: str, seconds: float) -> bool:
+        """Take the lease for a key unless another owner holds an unexpired one; the holder extends it"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM cache_leases WHERE key = ? AND expires_at <= ?", (key, now))
+                acquired = self._conn.execute("""
+                    INSERT INTO cache_leases (key, owner, expires_at) VALUES (?, ?, ?)
+                    ON CONFLICT (key) DO UPDATE SET expires_at = excluded.expires_at
+                    WHERE cache_leases.owner = excluded.owner
+                """, (key, owner, now + seconds)).rowcount == 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return acquired
+
+    def release_lease(self, key: str, owner: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        return {"backend": self.backend, "path": self.db_path, "entries": entries}
+
+
+class RedisSharedStore:
+    """Shared store on a Redis-compatible server, for workers on several machines (blocking)"""
+
+    backend = "redis"
+
+    # Delete a lease only if this owner still holds it
+    _RELEASE_SCRIPT = """
+        if redis.call("GET", KEYS[1]) == ARGV[1] then
+            return redis.call("DEL", KEYS[1])
+        end
+        return 0
+    """
+
+    # Set a lease unless another owner holds it, extending it if this owner does
+    _ACQUIRE_SCRIPT = """
+        if redis.call("SET", KEYS[1], ARGV[1], "NX", "PX", ARGV[2]) then
+            return 1
+        end
+        if redis.call("GET", KEYS[1]) == ARGV[1] then
+            return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+        end
+        return 0
+    """
+
+    def __init__(self, url: str):
+        self._client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self._acquire = self._client.register_script(self._ACQUIRE_SCRIPT)
+        self._release = self._client.register_script(self._RELEASE_SCRIPT)
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """(value, stored_at) for a key that hasn't expired, or None"""
+        raw = self._client.get(key)
+        if raw is None:
+            return None
+        # Stored as an 8-byte timestamp followed by the value
+        return raw[8:], struct.unpack("!d", raw[:8])[0]
+
+    def set(self, key: str, value: bytes, stored_at: float, keep_seconds: float):
+        """Store a value, kept for `keep_seconds` after `stored_at`"""
+        keep_ms = int((stored_at + keep_seconds - time.time()) * 1000)
+        if keep_ms > 0:
+            self._client.set(key, struct.pack("!d", stored_at) + value, px=keep_ms)
+
+    def delete(self, key: str):
+        self._client.delete(key)
+
+    def acquire_lease(self, key: str, owner: str, seconds: float) -> bool:
+        """Take the lease for a key unless another owner holds an unexpired one; the holder extends it"""
+        return bool(self._acquire(keys=[f"lease:{key}"], args=[owner, int(seconds * 1000)]))
+
+    def release_lease(self, key: str, owner: str):
+        self._release(keys=[f"lease:{key}"], args=[owner])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend}
+
+
+class LeaderLease:
+    """
+    A named lease that one process at a time holds, for background work that
+    should run in a single worker. The holder renews it each time it checks;
+    if it stops renewing, another process takes over once it expires. Without
+    a shared store every process considers itself the leader.
+    """
+
+    def __init__(self, store, name: str, seconds: float):
+        self.store = store
+        self.key = f"{SHARED_CACHE_KEY_PREFIX}:leader:{name}"
+        self.seconds = seconds
+        self.owner = uuid.uuid4().hex
+        self.is_leader = False
+        self.errors = 0
+
+    async def hold(self) -> bool:
+        """Take or renew the lease; returns whether this process leads"""
+        if self.store is None:
+            self.is_leader = True
+            return True
+        try:
+            self.is_leader = await asyncio.to_thread(self.store.acquire_lease, self.key, self.owner, self.seconds)
+        except Exception as e:
+            # Can't tell who leads: stand down rather than risk running twice
+            self.errors += 1
+            self.is_leader = False
+            logger.warning(f"Leader lease {self.key} unavailable: {str(e)}")
+        return self.is_leader
+
+    async def release(self):
+        """Give up the lease so another process can take over straight away"""
+        if self.store is not None and self.is_leader:
+            self.is_leader = False
+            try:
+                await asyncio.to_thread(self.store.release_lease, self.key, self.owner)
+            except Exception as e:
+                logger.warning(f"Couldn't release leader lease {self.key}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"shared": self.store is not None, "leader": self.is_leader, "lease_seconds": self.seconds, "errors": self.errors}
+
+
+def open_shared_store():
+    """The configured shared store, or None when disabled"""
+    if not SHARED_CACHE_ENABLED:
+        return None
+    if REDIS_URL:
+        if redis is not None:
+            return RedisSharedStore(REDIS_URL)
+        logger.warning("REDIS_URL is set but the redis package isn't installed; using the SQLite shared cache")
+    return SQLiteSharedStore(SHARED_CACHE_PATH)
+
+
+shared_store = open_shared_store()
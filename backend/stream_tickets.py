@@ -0,0 +1,89 @@
+"""
+Short-lived, single-use tickets for opening an alert event stream
+
+Browsers' EventSource can't send an Authorization header, and putting the
+access token in the stream URL writes a long-lived bearer credential into
+access logs, proxy logs and browser history. Instead the client asks for a
+ticket with an authenticated POST and opens the stream with `?ticket=`. A
+ticket is random, expires after STREAM_TICKET_SECONDS and can be redeemed
+once. Only its SHA-256 hash is stored, in the shared store so any worker can
+redeem a ticket another issued, or in memory when there is no shared store.
+"""
+import hashlib
+import os
+import secrets
+import threading
+import time
+import uuid
+from typing import Dict, Tuple
+
+import orjson
+
+from shared_cache import SHARED_CACHE_KEY_PREFIX, shared_store
+
+STREAM_TICKET_SECONDS = float(os.getenv("STREAM_TICKET_SECONDS", "30"))
+
+
+class InvalidTicketError(Exception):
+    """Raised for a ticket that is unknown, expired or already redeemed"""
+
+
+class StreamTickets:
+    """Issues and redeems stream tickets (blocking)"""
+
+    def __init__(self, store, seconds: float):
+        self.store = store
+        self.seconds = seconds
+        # Without a shared store: ticket hash -> (payload, expires_at)
+        self._local: Dict[str, Tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+
+        self.issued = 0
+        self.redeemed = 0
+        self.rejected = 0
+
+    def _key(self, ticket: str) -> str:
+        return f"{SHARED_CACHE_KEY_PREFIX}:stream-ticket:{hashlib.sha256(ticket.encode('utf-8')).hexdigest()}"
+
+    def issue(self, user_id: str, expires_at: float) -> str:
+        """A new ticket for a user; the stream it opens closes at `expires_at`"""
+        ticket = secrets.token_urlsafe(32)
+        payload = orjson.dumps({"user_id": user_id, "expires_at": expires_at})
+        now = time.time()
+        if self.store is not None:
+            self.store.set(self._key(ticket), payload, now, self.seconds)
+        else:
+            with self._lock:
+                self._local = {key: entry for key, entry in self._local.items() if entry[1] > now}
+                self._local[self._key(ticket)] = (payload, now + self.seconds)
+        self.issued += 1
+        return ticket
+
+    def redeem(self, ticket: str) -> Tuple[str, float]:
+        """(user_id, expires_at) for a valid ticket, which can't be redeemed again"""
+        key = self._key(ticket)
+        payload = None
+        if self.store is not None:
+            # The lease makes redemption atomic: of two concurrent attempts only one gets the ticket
+            if self.store.acquire_lease(key, uuid.uuid4().hex, self.seconds):
+                entry = self.store.get(key)
+                if entry is not None:
+                    self.store.delete(key)
+                    payload = entry[0]
+        else:
+            with self._lock:
+                entry = self._local.pop(key, None)
+            if entry is not None and entry[1] > time.time():
+                payload = entry[0]
+        if payload is None:
+            self.rejected += 1
+            raise InvalidTicketError("Invalid or expired stream ticket")
+        self.redeemed += 1
+        claims = orjson.loads(payload)
+        return claims["user_id"], claims["expires_at"]
+
+    def stats(self) -> Dict[str, int]:
+        return {"issued": self.issued, "redeemed": self.redeemed, "rejected": self.rejected}
+
+
+stream_tickets = StreamTickets(shared_store, STREAM_TICKET_SECONDS)
@@ -0,0 +1,24 @@
+"""
+Unit tests run from the backend directory's flat modules. Every database,
+catalog and shared-cache file points into a throwaway directory, and the
+background loops that would call Recreation.gov are switched off, before any
+module reads its settings.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_data_dir = tempfile.mkdtemp(prefix="campscout-tests-")
+for name, value in {
+    "DATABASE_PATH": os.path.join(_data_dir, "campscout.db"),
+    "CATALOG_DATABASE_PATH": os.path.join(_data_dir, "campground_catalog.db"),
+    "SHARED_CACHE_PATH": os.path.join(_data_dir, "shared_cache.db"),
+    "CATALOG_BACKGROUND_REFRESH": "false",
+    "REC_AREA_INDEX_BACKGROUND_REFRESH": "false",
+    "ALERT_ENGINE_ENABLED": "false",
+    "BCRYPT_ROUNDS": "4",
+}.items():
+    os.environ[name] = value
@@ -0,0 +1,128 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from alert_engine import AlertEngine
+
+START = date.today() + timedelta(days=30)
+
+
+def site(campsite_id, offset):
+    return {"campsite_id": campsite_id, "booking_date": f"{(START + timedelta(days=offset)).isoformat()} 00:00:00"}
+
+
+ALERT = {
+    "id": "alert-1", "user_id": "u1", "campground_id": "232447", "campground_name": "Upper Pines",
+    "start_date": START.isoformat(), "end_date": (START + timedelta(days=5)).isoformat(),
+    "site_type": "any", "party_size": 1,
+}
+
+
+class World:
+    """Availability upstream and the alerts table's notified_stays column"""
+
+    def __init__(self):
+        self.available = [site(1, 0), site(2, 1)]
+        self.notified = {}
+
+    async def load_alerts(self):
+        return [ALERT]
+
+    async def fetch_changes(self, campground_id, start_dt, end_dt, since):
+        return {"cursor": "c", "reset": True, "opened": list(self.available), "booked": []}
+
+    async def load_notified(self, alert_ids):
+        return {alert_id: self.notified[alert_id] for alert_id in alert_ids if alert_id in self.notified}
+
+    async def save_notified(self, stays_by_alert):
+        self.notified.update(stays_by_alert)
+
+    def engine(self, leader=True):
+        class Lease:
+            async def hold(self):
+                return leader
+
+            def stats(self):
+                return {}
+
+        engine = AlertEngine(
+            load_alerts=self.load_alerts,
+            fetch_changes=self.fetch_changes,
+            resolve_campground_id=lambda alert: alert["campground_id"],
+            leader_lease=Lease(),
+            has_local_streams=lambda alert: True,
+            load_notified=self.load_notified,
+            save_notified=self.save_notified,
+        )
+        notifications = []
+
+        async def listener(alert, sites):
+            notifications.append(sorted(s["campsite_id"] for s in sites))
+
+        engine.add_listener(listener)
+        engine.add_listener(listener, local=True)
+        return engine, notifications
+
+
+@pytest.fixture
+def world():
+    return World()
+
+
+def test_a_new_alert_is_notified_of_everything_available(world):
+    engine, notifications = world.engine()
+    asyncio.run(engine.run_cycle())
+    assert notifications == [[1, 2], [1, 2]]
+    assert sorted(world.notified["alert-1"]) == [(1, site(1, 0)["booking_date"]), (2, site(2, 1)["booking_date"])]
+
+
+def test_a_restarted_leader_notifies_only_new_stays(world):
+    engine, _ = world.engine()
+    asyncio.run(engine.run_cycle())
+
+    world.available.append(site(3, 2))
+    restarted, notifications = world.engine()
+    asyncio.run(restarted.run_cycle())
+    assert notifications == [[3], [3]]
+    assert restarted.seeded_alerts == 1
+    assert len(world.notified["alert-1"]) == 3
+
+
+def test_booked_stays_are_notified_again_after_they_reopen(world):
+    engine, _ = world.engine()
+    asyncio.run(engine.run_cycle())
+    world.available = [site(1, 0)]
+    asyncio.run(engine.run_cycle())
+    assert len(world.notified["alert-1"]) == 1
+
+    world.available = [site(1, 0), site(2, 1)]
+    restarted, notifications = world.engine()
+    asyncio.run(restarted.run_cycle())
+    assert notifications == [[2], [2]]
+
+
+def test_followers_seed_but_never_save(world):
+    leader, _ = world.engine()
+    asyncio.run(leader.run_cycle())
+    saved = dict(world.notified)
+
+    world.available.append(site(3, 2))
+    follower, notifications = world.engine(leader=False)
+    asyncio.run(follower.run_cycle())
+    assert notifications == [[3]]  # the local listener only
+    assert world.notified == saved
+
+
+def test_notified_stays_round_trip_through_the_alerts_table():
+    import main
+
+    alert = dict(ALERT, id="alert-db", is_active=True, created_at="2026-01-01", updated_at="2026-01-01")
+
+    async def scenario():
+        await main.alert_repository.create(alert)
+        assert await main.alert_repository.get_notified_stays(["alert-db"]) == {}
+        await main.alert_repository.set_notified_stays({"alert-db": [(1, "2030-07-01 00:00:00")]})
+        return await main.alert_repository.get_notified_stays(["alert-db", "missing"])
+
+    assert asyncio.run(scenario()) == {"alert-db": [(1, "2030-07-01 00:00:00")]}
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+import main
+from alert_hub import AlertHub
+
+
+@pytest.fixture
+def hub():
+    return AlertHub(queue_size=10, max_streams_per_user=5)
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait()["event"])
+    return events
+
+
+def test_availability_reaches_only_watching_streams(hub):
+    mine = hub.subscribe("u1", ["232447"])
+    other = hub.subscribe("u2", ["232450"])
+    assert hub.publish("232447", {"event": "availability", "data": {}}) == 1
+    assert drain(mine) == ["availability"] and drain(other) == []
+
+
+def test_alert_matches_reach_the_owner_before_their_stream_watches_the_campground(hub):
+    # The alert was created through another worker, so this stream doesn't watch it yet
+    mine = hub.subscribe("u1", [])
+    hub.subscribe("u2", ["232447"])
+    assert hub.publish("232447", {"event": "alert_match", "data": {}}, user_id="u1") == 1
+    assert drain(mine) == ["alert_match"]
+
+
+def test_unwatch_stops_availability_but_keeps_requested_campgrounds(hub):
+    alerts_only = hub.subscribe("u1", ["232447"])
+    requested = hub.subscribe("u1", ["232447"], requested=["232447"])
+    hub.unwatch("u1", "232447")
+    hub.publish("232447", {"event": "availability", "data": {}})
+    assert drain(alerts_only) == []
+    assert drain(requested) == ["availability"]
+
+
+def test_set_alert_campgrounds_follows_the_users_alerts(hub):
+    subscription = hub.subscribe("u1", ["232447"], requested=["999"])
+    assert hub.set_alert_campgrounds(subscription, ["232450"])
+    assert subscription.campground_ids == {"232450", "999"}
+    assert not hub.is_watched("232447") and hub.is_watched("232450")
+    assert not hub.set_alert_campgrounds(subscription, ["232450"])
+
+    hub.unsubscribe(subscription)
+    assert hub.stats()["campgrounds"] == 0
+
+
+def test_deleting_an_alert_unwatches_its_campground(monkeypatch):
+    subscription = main.alert_hub.subscribe("stream-user", ["232447", "232450"])
+    remaining = {"232450"}
+
+    async def alert_campground_ids(user_id):
+        return set(remaining)
+
+    monkeypatch.setattr(main, "alert_campground_ids", alert_campground_ids)
+    try:
+        asyncio.run(main.refresh_alert_watch("stream-user", "232447"))
+        assert subscription.campground_ids == {"232450"}
+        remaining.add("232447")
+        asyncio.run(main.refresh_alert_watch("stream-user", "232447"))
+        assert subscription.campground_ids == {"232447", "232450"}
+    finally:
+        main.alert_hub.unsubscribe(subscription)
@@ -0,0 +1,116 @@
+from datetime import date
+
+import pytest
+
+from availability_snapshots import AvailabilitySnapshotStore, InvalidCursorError
+from compact_availability import CompactAvailability
+
+JULY = date(2030, 7, 1)
+WINDOW = (date(2030, 7, 1), date(2030, 8, 1))
+
+
+def month(open_days):
+    """July 2030 availability from {campsite_id: [day of month, ...]}"""
+    return CompactAvailability.from_dicts((
+        {
+            "campsite_id": campsite_id,
+            "campsite_site_name": str(campsite_id),
+            "booking_date": f"2030-07-{day:02d} 00:00:00",
+            "facility_id": "232447",
+            "facility_name": "Upper Pines",
+        }
+        for campsite_id, days in open_days.items()
+        for day in days
+    ), nights=1)
+
+
+def stays(availability):
+    return sorted((site["campsite_id"], int(site["booking_date"][8:10])) for site in availability.iter_dicts())
+
+
+@pytest.fixture
+def store():
+    return AvailabilitySnapshotStore(max_entries=10, history=3)
+
+
+def test_first_sight_is_a_baseline(store):
+    assert store.record("232447", JULY, month({1: [1, 2]})) is None
+    assert store.baselines == 1
+
+
+def test_changes_since_a_cursor(store):
+    store.record("232447", JULY, month({1: [1, 2], 2: [5]}))
+    cursor = store.cursor
+
+    change = store.record("232447", JULY, month({1: [2, 3], 3: [9]}))
+    assert stays(change.opened) == [(1, 3), (3, 9)]
+    assert stays(change.booked) == [(1, 1), (2, 5)]
+
+    opened, booked = store.changes_since("232447", 1, cursor, *WINDOW)
+    assert stays(opened) == [(1, 3), (3, 9)]
+    assert stays(booked) == [(1, 1), (2, 5)]
+    assert opened.facility["facility_name"] == "Upper Pines"
+
+    # Nothing new since the latest cursor
+    opened, booked = store.changes_since("232447", 1, store.cursor, *WINDOW)
+    assert len(opened) == 0 and len(booked) == 0
+
+
+def test_unchanged_refresh_records_nothing(store):
+    store.record("232447", JULY, month({1: [1]}))
+    assert store.record("232447", JULY, month({1: [1]})) is None
+    assert store.change_sets == 0
+
+
+def test_changes_are_netted_across_refreshes(store):
+    store.record("232447", JULY, month({1: [1]}))
+    cursor = store.cursor
+    store.record("232447", JULY, month({1: [1, 4]}))   # 4 opens
+    store.record("232447", JULY, month({1: [1]}))      # and is booked again
+    store.record("232447", JULY, month({}))            # 1 is booked
+
+    opened, booked = store.changes_since("232447", 1, cursor, *WINDOW)
+    assert stays(opened) == []
+    assert stays(booked) == [(1, 1)]
+
+
+def test_changes_are_limited_to_the_window(store):
+    store.record("232447", JULY, month({1: []}))
+    cursor = store.cursor
+    store.record("232447", JULY, month({1: [3, 20]}))
+    opened, _ = store.changes_since("232447", 1, cursor, date(2030, 7, 10), date(2030, 7, 25))
+    assert stays(opened) == [(1, 20)]
+
+
+def test_cursor_older_than_the_history_resets(store):
+    store.record("232447", JULY, month({}))
+    cursor = store.cursor
+    for day in range(1, 5):
+        store.record("232447", JULY, month({1: [day]}))
+    assert store.changes_since("232447", 1, cursor, *WINDOW) is None
+    assert store.resets == 1
+
+
+def test_cursor_from_another_store_resets(store):
+    other = AvailabilitySnapshotStore(max_entries=10, history=3)
+    assert other.epoch != store.epoch
+    store.record("232447", JULY, month({}))
+    other.record("232447", JULY, month({}))
+    other.record("232447", JULY, month({1: [1]}))
+    store.record("232447", JULY, month({2: [2]}))
+    # Same sequence numbers, different worker: its cursors can't be diffed here
+    assert store.changes_since("232447", 1, other.cursor, *WINDOW) is None
+
+
+def test_malformed_cursor_is_rejected(store):
+    with pytest.raises(InvalidCursorError):
+        store.changes_since("232447", 1, "not-a-cursor", *WINDOW)
+
+
+def test_version_changes_with_the_availability(store):
+    store.record("232447", JULY, month({1: [1]}))
+    before = store.version("232447", 1)
+    store.record("232447", JULY, month({1: [1]}))
+    assert store.version("232447", 1) == before
+    store.record("232447", JULY, month({1: [1, 2]}))
+    assert store.version("232447", 1) != before
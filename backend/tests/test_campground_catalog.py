@@ -0,0 +1,109 @@
+import asyncio
+import sys
+import threading
+
+import pytest
+
+from campground_catalog import CampgroundCatalog
+
+
+def entry(facility_id, name, state="CA", **overrides):
+    return {
+        "facility_id": facility_id, "name": name, "state": state, "city": "", "description": "",
+        "recreation_area": "", "recreation_area_id": "", "latitude": None, "longitude": None,
+        "activities": ["Camping"], "phone": "", "email": "", **overrides,
+    }
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = CampgroundCatalog(str(tmp_path / "catalog.db"))
+    catalog.load()
+    return catalog
+
+
+def test_state_refresh_removes_campgrounds_no_longer_listed(catalog, tmp_path):
+    catalog.upsert_entries([entry("1", "Upper Pines"), entry("2", "Lower Pines")], "CA")
+    catalog.upsert_entries([entry("9", "Kirk Creek", "OR")], "OR")
+    catalog.upsert_entries([entry("1", "Upper Pines")], "CA")
+
+    assert catalog.get("2") is None
+    assert catalog.find_id_by_name("Lower Pines") is None
+    assert catalog.get("9") is not None
+    assert catalog.removed == 1
+
+    reloaded = CampgroundCatalog(str(tmp_path / "catalog.db"))
+    reloaded.load()
+    assert sorted(e["facility_id"] for e in reloaded.entries()) == ["1", "9"]
+
+
+def test_empty_state_download_keeps_the_catalog(catalog):
+    catalog.upsert_entries([entry("1", "Upper Pines")], "CA")
+    catalog.upsert_entries([], "CA")
+    assert catalog.get("1") is not None
+
+
+def test_single_facility_fetches_remove_nothing(catalog):
+    catalog.upsert_entries([entry("1", "Upper Pines"), entry("2", "Lower Pines")], "CA")
+    catalog.upsert_entries([entry("1", "Upper Pines", state="")])
+    assert catalog.get("2") is not None
+    assert catalog.get("1")["state"] == "CA"
+
+
+def test_stored_entries_are_copies(catalog):
+    mine = entry("1", "Upper Pines", state="")
+    catalog.upsert_entries([entry("1", "Upper Pines")], "CA")
+    catalog.upsert_entries([mine])
+    assert mine["state"] == ""
+    mine["name"] = "Changed"
+    mine["activities"].append("Fishing")
+    assert catalog.get("1")["name"] == "Upper Pines"
+    assert catalog.get("1")["activities"] == ["Camping"]
+
+
+def test_name_lookups_while_a_refresh_writes(catalog):
+    catalog.upsert_entries([entry(str(i), f"Camp {i}") for i in range(20000)], "CA")
+    stop = threading.Event()
+    errors = []
+
+    def write():
+        i = 20000
+        while not stop.is_set():
+            catalog.upsert_entries([entry(str(i), f"Camp {i}")])
+            i += 1
+
+    # Switch threads often, so the writer lands in the middle of a lookup's walk
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(50):
+            catalog._by_name_version = None
+            try:
+                catalog.find_id_by_name("Camp 1")
+            except RuntimeError as e:
+                errors.append(e)
+    finally:
+        stop.set()
+        writer.join()
+        sys.setswitchinterval(switch_interval)
+    assert errors == []
+
+
+def test_scheduled_lookups_are_kept_until_done(catalog):
+    fetched = []
+
+    async def fetch(facility_id):
+        await asyncio.sleep(0.01)
+        fetched.append(facility_id)
+
+    async def scenario():
+        catalog.schedule_lookup("232447", fetch)
+        catalog.schedule_lookup("232447", fetch)
+        assert len(catalog._lookup_tasks) == 1
+        await asyncio.gather(*catalog._lookup_tasks)
+
+    asyncio.run(scenario())
+    assert fetched == ["232447"]
+    assert not catalog._lookup_tasks and not catalog._pending_lookups
@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+
+import orjson
+
+from availability_cache import availability_cache
+from compact_availability import CompactAvailability
+from fast_json import dumps
+
+FACILITY = {
+    "recreation_area": "Yosemite National Park, CA",
+    "recreation_area_id": 2991,
+    "facility_name": "Upper Pines",
+    "facility_id": 232447,
+}
+
+
+def site_dict(campsite_id: int, day: date, nights: int = 2, **overrides):
+    site = {
+        "campsite_id": campsite_id,
+        "campsite_title": f"{campsite_id:03d}",
+        "campsite_site_name": f"{campsite_id:03d}",
+        "campsite_loop_name": "Loop A",
+        "campsite_type": "STANDARD NONELECTRIC",
+        "campsite_use_type": "Overnight",
+        "booking_date": f"{day.isoformat()} 00:00:00",
+        "booking_end_date": f"{(day + timedelta(days=nights)).isoformat()} 00:00:00",
+        "booking_nights": nights,
+        "booking_url": f"https://www.recreation.gov/camping/campsites/{campsite_id}",
+        **FACILITY,
+        "availability_status": "Available",
+        "permitted_equipment": [{"equipment_name": "Tent", "max_length": 0.0}],
+        "campsite_occupancy_min": 1,
+        "campsite_occupancy_max": 6,
+    }
+    site.update(overrides)
+    return site
+
+
+def sample_dicts():
+    start = date(2030, 7, 1)
+    days = {101: [0, 1, 2, 5], 102: [3], 103: [10, 11, 30]}
+    return [site_dict(campsite_id, start + timedelta(days=offset)) for campsite_id, offsets in days.items() for offset in offsets]
+
+
+def sort_key(site):
+    return site["campsite_id"], site["booking_date"]
+
+
+def test_expands_back_to_the_full_format():
+    dicts = sample_dicts()
+    compact = CompactAvailability.from_dicts(reversed(dicts), nights=2)
+    assert len(compact) == len(dicts)
+    assert sorted(compact.iter_dicts(), key=sort_key) == sorted(dicts, key=sort_key)
+
+
+def test_duplicate_dates_are_stored_once():
+    dicts = sample_dicts()
+    compact = CompactAvailability.from_dicts(dicts + dicts[:3], nights=2)
+    assert len(compact) == len(dicts)
+
+
+def test_state_round_trip_through_json():
+    compact = CompactAvailability.from_dicts(sample_dicts(), nights=2)
+    restored = CompactAvailability.from_state(orjson.loads(dumps(compact.to_state())))
+    assert restored.to_state() == compact.to_state()
+    assert list(restored.iter_dicts()) == list(compact.iter_dicts())
+    assert restored.available_dates() == compact.available_dates()
+
+
+def test_availability_cache_codec_round_trip():
+    compact = CompactAvailability.from_dicts(sample_dicts(), nights=2)
+    restored = availability_cache.decode(availability_cache.encode(compact))
+    assert list(restored.iter_dicts()) == list(compact.iter_dicts())
+
+
+def test_window_keeps_stays_starting_in_range():
+    compact = CompactAvailability.from_dicts(sample_dicts(), nights=2)
+    window = compact.window(date(2030, 7, 2), date(2030, 7, 12))
+    assert sorted((site["campsite_id"], site["booking_date"][:10]) for site in window.iter_dicts()) == [
+        (101, "2030-07-02"), (101, "2030-07-03"), (101, "2030-07-06"), (102, "2030-07-04"),
+        (103, "2030-07-11"),
+    ]
+
+
+def test_extend_appends_the_next_month():
+    july = CompactAvailability.from_dicts([site_dict(101, date(2030, 7, 31))], nights=2)
+    august = CompactAvailability.from_dicts([site_dict(101, date(2030, 8, 1)), site_dict(104, date(2030, 8, 2))], nights=2)
+    july.extend(august)
+    assert [site["booking_date"][:10] for site in july.iter_dicts()] == ["2030-07-31", "2030-08-01", "2030-08-02"]
+
+
+def test_json_sends_runs_of_consecutive_days():
+    body = CompactAvailability.from_dicts(sample_dicts(), nights=2).to_json()
+    assert body["facility"] == FACILITY
+    assert body["sites"]["campsite_id"] == [101, 102, 103]
+    assert body["ranges"] == [
+        [["2030-07-01", "2030-07-03"], ["2030-07-06", "2030-07-06"]],
+        [["2030-07-04", "2030-07-04"]],
+        [["2030-07-11", "2030-07-12"], ["2030-07-31", "2030-07-31"]],
+    ]
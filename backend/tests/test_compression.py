@@ -0,0 +1,100 @@
+import asyncio
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from compression import CompressionMiddleware, ResponseCompressor, parse_accept_encoding
+
+BIG_BODY = b'{"sites": [' + b",".join(b'{"campsite_id": %d, "status": "Available"}' % i for i in range(200)) + b"]}"
+
+
+def make_client(compressor: ResponseCompressor) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/big")
+    async def big():
+        return Response(BIG_BODY, media_type="application/json", headers={"ETag": '"abc"'})
+
+    @app.get("/small")
+    async def small():
+        return Response(b'{"ok": true}', media_type="application/json")
+
+    @app.get("/stream")
+    async def stream():
+        async def frames():
+            for i in range(3):
+                yield b'{"frame": %d}\n' % i * 100
+        return StreamingResponse(frames(), media_type="application/x-ndjson")
+
+    app.add_middleware(CompressionMiddleware, compressor=compressor)
+    return TestClient(app)
+
+
+@pytest.fixture
+def compressor():
+    return ResponseCompressor(minimum_size=256, gzip_level=6, brotli_quality=4, thread_min_size=1024)
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip, br;q=0.5, identity;q=0, *;q=bad") == {
+        "gzip": 1.0, "br": 0.5, "identity": 0.0, "*": 0.0,
+    }
+
+
+def test_negotiation_follows_client_weights(compressor):
+    compressor.encodings = ["br", "gzip"]
+    assert compressor.negotiate("gzip, br") == "br"
+    assert compressor.negotiate("gzip;q=1, br;q=0.5") == "gzip"
+    assert compressor.negotiate("*") == "br"
+    assert compressor.negotiate("br;q=0, *;q=0.1") == "gzip"
+    assert compressor.negotiate("identity") is None
+    assert compressor.negotiate("") is None
+
+
+def test_large_bodies_are_gzipped(compressor):
+    compressor.encodings = ["gzip"]
+    client = make_client(compressor)
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(BIG_BODY)
+    assert response.content == BIG_BODY
+    # The encoded bytes differ from the identity body, so the ETag is weakened
+    assert response.headers["etag"] == 'W/"abc"'
+    assert compressor.compressed["gzip"] == 1
+
+
+def test_bodies_past_the_thread_threshold_round_trip(compressor):
+    compressor.thread_min_size = 0
+    body = asyncio.run(compressor.compress_async(BIG_BODY, "gzip"))
+    assert gzip.decompress(body) == BIG_BODY
+    assert compressor.bytes_in == len(BIG_BODY) and compressor.bytes_out == len(body)
+
+
+def test_small_and_identity_responses_are_untouched(compressor):
+    client = make_client(compressor)
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert compressor.skipped == 1
+
+    identity = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] == '"abc"'
+
+
+def test_streaming_responses_pass_through(compressor):
+    client = make_client(compressor)
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.text.count("\n") == 300
+
+
+def test_brotli_when_installed(compressor):
+    brotli = pytest.importorskip("brotli")
+    client = make_client(compressor)
+    response = client.get("/big", headers={"Accept-Encoding": "br, gzip"})
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(compressor.compress(BIG_BODY, "br")) == BIG_BODY
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from geo_index import ProximityQuery
+from provider_registry import PooledRecreationDotGov, build_session
+
+
+def ridb_facility(facility_id, name, latitude, longitude, city, **overrides):
+    """A full=true RIDB facility record, as camply receives it"""
+    facility = {
+        "FacilityID": facility_id,
+        "FacilityName": name.upper(),
+        "FacilityTypeDescription": "Campground",
+        "Enabled": True,
+        "Reservable": True,
+        "FacilityLatitude": latitude,
+        "FacilityLongitude": longitude,
+        "FacilityDescription": f"<h2>Overview</h2><p>{name} &amp; the valley floor</p>",
+        "FacilityPhone": "209-372-8502",
+        "FacilityEmail": "",
+        "FACILITYADDRESS": [{"AddressStateCode": "CA", "City": city}],
+        "RECAREA": [{"RecAreaID": 2991, "RecAreaName": "Yosemite National Park"}],
+        "ORGANIZATION": [{"OrgName": "National Park Service", "OrgID": 128}],
+        "ACTIVITY": [{"ActivityName": "CAMPING"}, {"ActivityName": "HIKING"}],
+    }
+    facility.update(overrides)
+    return facility
+
+
+FACILITIES = [
+    ridb_facility("232447", "Upper Pines", 37.7363, -119.5633, "Yosemite Valley"),
+    ridb_facility("232450", "Lower Pines", 37.7407, -119.5662, "Yosemite Valley"),
+    ridb_facility("232449", "North Pines", 37.7410, -119.5650, "Yosemite Valley", Reservable=False),
+    ridb_facility("232875", "Kirk Creek", 35.9897, -121.4951, "Big Sur"),
+]
+
+
+@pytest.fixture
+def ridb(monkeypatch):
+    """The shared campground provider, answering from FACILITIES instead of RIDB"""
+    provider = PooledRecreationDotGov(build_session(1, 1))
+
+    def get_ridb_data(path, params=None):
+        return {"RECDATA": FACILITIES, "METADATA": {"RESULTS": {"CURRENT_COUNT": len(FACILITIES), "TOTAL_COUNT": len(FACILITIES)}}}
+
+    monkeypatch.setattr(provider, "get_ridb_data", get_ridb_data)
+    monkeypatch.setattr(main.provider_registry, "session", provider.session)
+    monkeypatch.setattr(main.provider_registry, "_campgrounds", provider)
+    return provider
+
+
+def test_catalog_entries_carry_the_ridb_details(ridb):
+    entries = {entry["facility_id"]: entry for entry in main._download_state_entries("ca")}
+    assert set(entries) == {"232447", "232450", "232875"}
+    upper_pines = entries["232447"]
+    assert (upper_pines["latitude"], upper_pines["longitude"]) == (37.7363, -119.5633)
+    assert upper_pines["city"] == "Yosemite Valley"
+    assert upper_pines["state"] == "CA"
+    assert upper_pines["description"] == "Overview Upper Pines & the valley floor"
+    assert upper_pines["activities"] == ["Camping", "Hiking"]
+
+
+def test_nearby_search_finds_campgrounds_from_a_state_refresh(ridb):
+    asyncio.run(main.refresh_catalog_state("CA"))
+
+    results = asyncio.run(main.search_nearby(ProximityQuery(37.735, -119.563, radius_km=5)))
+    assert [campsite.id for campsite in results] == ["232447", "232450"]
+    assert all(0 < campsite.distance_km < 5 for campsite in results)
+    assert results[0].city == "Yosemite Valley"
+
+    response = TestClient(main.app).post("/api/search", json={"latitude": 35.99, "longitude": -121.5, "radius_km": 10})
+    assert [(site["id"], site["name"]) for site in response.json()["data"]] == [("232875", "Kirk Creek")]
+    assert response.json()["data"][0]["distance_km"] < 1
@@ -0,0 +1,181 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+
+import main
+from compact_availability import CompactAvailability
+from compression import CompressionMiddleware, ResponseCompressor
+from http_cache import CachePolicy, HTTPCache, HTTPCacheMiddleware, etag_matches, version_etag
+
+BODY = b'{"data": "' + b"x" * 2000 + b'"}'
+
+
+def make_client(compress: bool = False):
+    app = FastAPI()
+
+    @app.get("/api/search")
+    async def search():
+        return Response(BODY, media_type="application/json")
+
+    @app.post("/api/search")
+    async def search_post():
+        return Response(BODY, media_type="application/json")
+
+    @app.get("/api/partial")
+    async def partial():
+        return Response(BODY, media_type="application/json", headers={"Cache-Control": "no-store"})
+
+    @app.get("/api/versioned")
+    async def versioned(request: Request):
+        etag = version_etag("versioned", 1)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(BODY, media_type="application/json", headers={"ETag": etag})
+
+    @app.get("/api/private")
+    async def private():
+        return Response(BODY, media_type="application/json")
+
+    cache = HTTPCache([
+        (r"/api/search", CachePolicy(300, 600)),
+        (r"/api/(partial|versioned)", CachePolicy(60)),
+    ])
+    app.add_middleware(HTTPCacheMiddleware, cache=cache)
+    if compress:
+        app.add_middleware(CompressionMiddleware, compressor=ResponseCompressor(256, 6, 4, 1 << 20))
+    return TestClient(app), cache
+
+
+def test_etag_matching_is_weak():
+    assert etag_matches('"a"', '"a"')
+    assert etag_matches('W/"a"', '"a"')
+    assert etag_matches('"b", W/"a"', 'W/"a"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"b"', '"a"')
+    assert not etag_matches(None, '"a"')
+
+
+def test_policy_and_strong_etag():
+    client, cache = make_client()
+    response = client.get("/api/search")
+    assert response.headers["cache-control"] == "public, max-age=300, stale-while-revalidate=600"
+    assert response.headers["etag"].startswith('"')
+    assert response.content == BODY
+    assert cache.hashed == 1
+
+
+def test_conditional_get_returns_a_bodiless_304():
+    client, cache = make_client()
+    etag = client.get("/api/search").headers["etag"]
+    response = client.get("/api/search", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert "cache-control" in response.headers
+    assert cache.not_modified == 1
+
+
+def test_routes_without_a_policy_and_posts_are_untouched():
+    client, _ = make_client()
+    assert "etag" not in client.get("/api/private").headers
+    post = client.post("/api/search")
+    assert "etag" not in post.headers and "cache-control" not in post.headers
+
+
+def test_no_store_from_the_handler_is_kept_without_an_etag():
+    client, _ = make_client()
+    response = client.get("/api/partial")
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+
+
+def test_handler_version_etag_and_304():
+    client, cache = make_client()
+    response = client.get("/api/versioned")
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    assert cache.hashed == 0
+    response = client.get("/api/versioned", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == "public, max-age=60"
+    assert cache.not_modified == 1
+
+
+def test_compressed_responses_revalidate_with_the_weakened_etag():
+    client, _ = make_client(compress=True)
+    response = client.get("/api/search", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].startswith('W/"')
+    response = client.get("/api/search", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+
+
+@pytest.fixture
+def search_client(monkeypatch):
+    async def state_search(location, state):
+        return [main.CampsiteInfo(
+            id="232447", name="Upper Pines", description="", state=state, city="", latitude=None, longitude=None,
+            activities=[], phone="", email="", reservation_url="", recreation_gov_id="232447",
+        )]
+
+    monkeypatch.setattr(main, "search_campgrounds_with_camply", state_search)
+    return TestClient(main.app)
+
+
+def test_complete_search_results_are_cacheable(search_client, monkeypatch):
+    monkeypatch.setattr(main, "location_search_states", lambda location: ["CA"])
+    response = search_client.get("/api/search", params={"location": "yosemite"})
+    assert response.json()["data"][0]["id"] == "232447"
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert "etag" in response.headers
+
+
+def test_partial_search_results_are_not_stored(search_client, monkeypatch):
+    async def fan_out(location, states, limit):
+        return [], True
+
+    monkeypatch.setattr(main, "location_search_states", lambda location: ["CA", "OR"])
+    monkeypatch.setattr(main, "fan_out_state_search", fan_out)
+    response = search_client.get("/api/search", params={"location": "pines"})
+    assert response.json()["partial"] is True
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+
+
+def test_fallback_search_results_are_not_stored(search_client, monkeypatch):
+    async def nothing(location, state):
+        return []
+
+    monkeypatch.setattr(main, "location_search_states", lambda location: ["CA"])
+    monkeypatch.setattr(main, "search_campgrounds_with_camply", nothing)
+    response = search_client.get("/api/search", params={"location": "nowhere"})
+    assert response.json()["data"][0]["id"] == "fallback-1"
+    assert response.headers["cache-control"] == "no-store"
+
+
+def test_availability_etag_comes_from_the_single_fetch_it_describes(monkeypatch):
+    fetches = []
+
+    async def get_campground_availability(campground_id, start_dt, end_dt, nights):
+        fetches.append(campground_id)
+        return CompactAvailability(nights), 0.0
+
+    async def get_campground_name(campground_id):
+        return "Upper Pines"
+
+    monkeypatch.setattr(main, "get_campground_availability", get_campground_availability)
+    monkeypatch.setattr(main, "get_campground_name", get_campground_name)
+    client = TestClient(main.app)
+    start = date.today() + timedelta(days=30)
+    params = {"start_date": start.isoformat(), "end_date": (start + timedelta(days=3)).isoformat()}
+
+    response = client.get("/api/campgrounds/232447/availability", params=params)
+    assert response.json()["campground_name"] == "Upper Pines"
+    assert fetches == ["232447"]
+
+    response = client.get("/api/campgrounds/232447/availability", params=params, headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+    assert fetches == ["232447", "232447"]
@@ -0,0 +1,106 @@
+import sqlite3
+
+import pytest
+
+import main
+
+BASELINE_SCHEMA = """
+    CREATE TABLE users (
+        id TEXT PRIMARY KEY,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE alerts (
+        id TEXT PRIMARY KEY,
+        user_id TEXT,
+        campground_name TEXT NOT NULL,
+        start_date TEXT NOT NULL,
+        end_date TEXT NOT NULL,
+        site_type TEXT DEFAULT 'any',
+        party_size INTEGER DEFAULT 1,
+        is_active BOOLEAN DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    );
+"""
+
+
+@pytest.fixture
+def baseline(tmp_path):
+    """A database created before migrations existed, with some data in it"""
+    conn = sqlite3.connect(str(tmp_path / "baseline.db"))
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany(
+        "INSERT INTO users (id, first_name, last_name, email, password, created_at) VALUES (?, 'A', 'B', ?, 'x', ?)",
+        [("u1", "a@example.com", "2026-01-01 10:00:00"), ("u2", "b@example.com", "2026-01-01 12:00:00"),
+         ("u3", "c@example.com", "2026-01-02 09:00:00")],
+    )
+    conn.executemany(
+        "INSERT INTO alerts (id, user_id, campground_name, start_date, end_date, is_active, created_at)"
+        " VALUES (?, 'u1', 'Upper Pines', '2026-07-01', '2026-07-03', ?, '2026-01-03 08:00:00')",
+        [("a1", 1), ("a2", 1), ("a3", 0)],
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def scalar(conn, sql, *params):
+    return conn.execute(sql, params).fetchone()[0]
+
+
+def test_baseline_database_is_migrated_to_the_latest_version(baseline):
+    main.migrate_database(baseline)
+    baseline.commit()
+
+    assert scalar(baseline, "PRAGMA user_version") == len(main.MIGRATIONS)
+    columns = [row[1] for row in baseline.execute("PRAGMA table_info(alerts)")]
+    assert "campground_id" in columns and "updated_at" in columns
+    # Existing alerts keep their data and get updated_at from created_at
+    assert baseline.execute("SELECT id, campground_id, updated_at FROM alerts ORDER BY id").fetchall() == [
+        ("a1", None, "2026-01-03 08:00:00"), ("a2", None, "2026-01-03 08:00:00"), ("a3", None, "2026-01-03 08:00:00"),
+    ]
+    indexes = {row[1] for row in baseline.execute("PRAGMA index_list(alerts)")}
+    assert {"idx_alerts_user_active_created", "idx_alerts_campground_active"} <= indexes
+
+
+def test_hot_alert_queries_use_the_new_indexes(baseline):
+    main.migrate_database(baseline)
+    plan = " ".join(row[3] for row in baseline.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM alerts WHERE user_id = ? AND is_active = 1 ORDER BY created_at DESC", ("u1",)
+    ))
+    assert "idx_alerts_user_active_created" in plan
+    plan = " ".join(row[3] for row in baseline.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM alerts WHERE campground_id = ? AND is_active = 1", ("232447",)
+    ))
+    assert "idx_alerts_campground_active" in plan
+
+
+def test_counters_start_from_the_existing_rows_and_follow_writes(baseline):
+    main.migrate_database(baseline)
+    counters = dict(baseline.execute("SELECT name, value FROM counters"))
+    assert counters == {"total_users": 3, "total_active_alerts": 2}
+    assert dict(baseline.execute("SELECT day, count FROM daily_registrations")) == {"2026-01-01": 2, "2026-01-02": 1}
+
+    baseline.execute("UPDATE alerts SET is_active = 0 WHERE id = 'a1'")
+    baseline.execute("DELETE FROM users WHERE id = 'u3'")
+    assert dict(baseline.execute("SELECT name, value FROM counters")) == {"total_users": 2, "total_active_alerts": 1}
+
+
+def test_migrating_twice_is_a_no_op(baseline):
+    main.migrate_database(baseline)
+    baseline.commit()
+    before = baseline.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall()
+    main.migrate_database(baseline)
+    assert baseline.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall() == before
+    assert scalar(baseline, "SELECT value FROM counters WHERE name = 'total_users'") == 3
+
+
+def test_partially_migrated_database_resumes(baseline):
+    baseline.execute("ALTER TABLE alerts ADD COLUMN campground_id TEXT")
+    main.migrate_database(baseline)
+    assert scalar(baseline, "PRAGMA user_version") == len(main.MIGRATIONS)
+    assert scalar(baseline, "SELECT COUNT(*) FROM alerts WHERE updated_at IS NOT NULL") == 3
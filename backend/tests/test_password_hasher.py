@@ -0,0 +1,36 @@
+import asyncio
+
+import bcrypt
+import pytest
+
+from password_hasher import PasswordHasher, PasswordQueueFullError, hash_rounds
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_queue=4, rounds=4)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hash_verify_and_rehash_are_counted(hasher):
+    old = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=5)).decode("utf-8")
+    assert hasher.needs_rehash(old)
+
+    async def scenario():
+        assert await hasher.verify("secret", old)
+        new = await hasher.rehash("secret")
+        return new
+
+    new = asyncio.run(scenario())
+    assert hash_rounds(new) == 4 and not hasher.needs_rehash(new)
+    assert hasher.stats()["hashed"] == 1
+    assert hasher.stats()["rehashed"] == 1
+    assert hasher.stats()["verified"] == 1
+
+
+def test_full_queue_is_rejected(hasher):
+    hasher._pending = hasher.max_queue
+    with pytest.raises(PasswordQueueFullError):
+        asyncio.run(hasher.hash("secret"))
+    assert hasher.rejected == 1
@@ -0,0 +1,98 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from shared_cache import SQLiteSharedStore
+from stream_tickets import InvalidTicketError, StreamTickets
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteSharedStore(str(tmp_path / "shared.db"))
+
+
+def test_a_ticket_is_redeemed_once(store):
+    tickets = StreamTickets(store, seconds=30)
+    ticket = tickets.issue("user-1", 2000000000.0)
+    assert tickets.redeem(ticket) == ("user-1", 2000000000.0)
+    with pytest.raises(InvalidTicketError):
+        tickets.redeem(ticket)
+    assert (tickets.issued, tickets.redeemed, tickets.rejected) == (1, 1, 1)
+
+
+def test_another_worker_can_redeem_the_ticket(store):
+    ticket = StreamTickets(store, seconds=30).issue("user-1", 2000000000.0)
+    other_worker = StreamTickets(store, seconds=30)
+    assert other_worker.redeem(ticket)[0] == "user-1"
+    with pytest.raises(InvalidTicketError):
+        other_worker.redeem(ticket)
+
+
+def test_only_the_ticket_hash_is_stored(store):
+    ticket = StreamTickets(store, seconds=30).issue("user-1", 2000000000.0)
+    keys = [row[0] for row in store._conn.execute("SELECT key FROM cache_entries")]
+    assert len(keys) == 1 and ticket not in keys[0]
+
+
+def test_tickets_expire(store, monkeypatch):
+    tickets = StreamTickets(store, seconds=30)
+    ticket = tickets.issue("user-1", 2000000000.0)
+    later = time.time() + 31
+    monkeypatch.setattr("shared_cache.time.time", lambda: later)
+    with pytest.raises(InvalidTicketError):
+        tickets.redeem(ticket)
+
+
+def test_tickets_without_a_shared_store(monkeypatch):
+    tickets = StreamTickets(None, seconds=30)
+    ticket = tickets.issue("user-1", 2000000000.0)
+    with pytest.raises(InvalidTicketError):
+        tickets.redeem("made-up")
+    assert tickets.redeem(ticket)[0] == "user-1"
+    with pytest.raises(InvalidTicketError):
+        tickets.redeem(ticket)
+
+    expired = tickets.issue("user-1", 2000000000.0)
+    later = time.time() + 31
+    monkeypatch.setattr("stream_tickets.time.time", lambda: later)
+    with pytest.raises(InvalidTicketError):
+        tickets.redeem(expired)
+
+
+@pytest.fixture
+def user():
+    user_id = str(uuid.uuid4())
+    asyncio.run(main.user_repository.create({
+        "id": user_id, "first_name": "Ada", "last_name": "L", "email": f"{user_id}@example.com",
+        "password": "x", "created_at": "2026-01-01T00:00:00",
+    }))
+    return user_id, main.create_access_token(data={"sub": user_id})
+
+
+def test_stream_rejects_access_tokens_in_the_query_string(user):
+    _, token = user
+    response = TestClient(main.app).get("/api/alerts/stream", params={"token": token})
+    assert response.status_code == 401
+
+
+def test_ticket_endpoint_requires_the_authorization_header():
+    assert TestClient(main.app).post("/api/alerts/stream/ticket").status_code in (401, 403)
+
+
+def test_stream_ticket_authenticates_once(user):
+    user_id, token = user
+    response = TestClient(main.app).post("/api/alerts/stream/ticket", headers={"Authorization": f"Bearer {token}"})
+    assert response.headers["cache-control"] == "no-store"
+    ticket = response.json()["data"]["ticket"]
+
+    class StreamRequest:
+        headers = {}
+
+    stream_user, expires_at = asyncio.run(main.authenticate_stream(StreamRequest(), ticket))
+    assert stream_user["id"] == user_id
+    assert expires_at > 0
+    assert TestClient(main.app).get("/api/alerts/stream", params={"ticket": ticket}).status_code == 401
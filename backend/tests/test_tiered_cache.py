@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+from shared_cache import SQLiteSharedStore
+from tiered_cache import TieredCache
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class Upstream:
+    """Counts fetches; each one takes `delay` seconds"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def fetcher(self, value):
+        async def fetch():
+            self.calls += 1
+            await asyncio.sleep(self.delay)
+            return value
+        return fetch
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteSharedStore(str(tmp_path / "shared.db"))
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = TieredCache("test", 1, ttl_seconds=60, max_entries=10)
+    upstream = Upstream(delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_fetch("k", upstream.fetcher({"v": 1})) for _ in range(10)))
+
+    results = run(scenario())
+    assert upstream.calls == 1
+    assert all(value == {"v": 1} for value, _ in results)
+    assert (cache.misses, cache.coalesced) == (1, 9)
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_hits_until_the_ttl_expires(monkeypatch):
+    cache = TieredCache("test", 1, ttl_seconds=60, max_entries=10)
+    upstream = Upstream()
+    now = [1000.0]
+    monkeypatch.setattr("tiered_cache.time.monotonic", lambda: now[0])
+
+    run(cache.get_or_fetch("k", upstream.fetcher(1)))
+    value, age = run(cache.get_or_fetch("k", upstream.fetcher(2)))
+    assert (value, upstream.calls, cache.hits) == (1, 1, 1)
+
+    now[0] += 61
+    value, age = run(cache.get_or_fetch("k", upstream.fetcher(2)))
+    assert (value, age, upstream.calls) == (2, 0.0, 2)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = TieredCache("test", 1, ttl_seconds=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a")[0] == 1 and cache.get("c")[0] == 3
+    assert cache.evictions == 1
+
+
+def test_failed_fetch_reaches_every_waiter_and_is_not_cached():
+    cache = TieredCache("test", 1, ttl_seconds=60, max_entries=10)
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_fetch("k", fail) for _ in range(3)), return_exceptions=True)
+
+    results = run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.errors == 1
+    assert cache.get("k") is None
+    assert run(cache.get_or_fetch("k", Upstream().fetcher(5)))[0] == 5
+
+
+def test_on_load_runs_for_every_value_entering_the_first_tier(store):
+    loaded = []
+
+    async def on_load(key, value, age):
+        loaded.append((key, value))
+
+    worker_a = TieredCache("test", 1, ttl_seconds=60, max_entries=10, shared=store)
+    worker_b = TieredCache("test", 1, ttl_seconds=60, max_entries=10, shared=store)
+    run(worker_a.get_or_fetch("k", Upstream().fetcher([1, 2]), on_load=on_load))
+    run(worker_b.get_or_fetch("k", Upstream().fetcher([3]), on_load=on_load))
+    assert loaded == [("k", [1, 2]), ("k", [1, 2])]
+
+
+def test_second_worker_reads_the_shared_tier(store):
+    upstream = Upstream()
+    worker_a = TieredCache("test", 1, ttl_seconds=60, max_entries=10, shared=store)
+    worker_b = TieredCache("test", 1, ttl_seconds=60, max_entries=10, shared=store)
+
+    run(worker_a.get_or_fetch(("state", "CA"), upstream.fetcher({"n": 1})))
+    value, _ = run(worker_b.get_or_fetch(("state", "CA"), upstream.fetcher({"n": 2})))
+    assert value == {"n": 1}
+    assert upstream.calls == 1
+    assert (worker_a.shared_writes, worker_b.shared_hits) == (1, 1)
+
+
+def test_workers_wait_on_the_lease_holder(store):
+    upstream = Upstream(delay=0.3)
+    worker_a = TieredCache("test", 1, ttl_seconds=60, max_entries=10, shared=store)
+    worker_b = TieredCache("test", 1, ttl_seconds=60, max_entries=10, shared=store)
+
+    async def scenario():
+        first = asyncio.ensure_future(worker_a.get_or_fetch("k", upstream.fetcher("a")))
+        await asyncio.sleep(0.1)
+        second = await worker_b.get_or_fetch("k", upstream.fetcher("b"))
+        return await first, second
+
+    (value_a, _), (value_b, _) = run(scenario())
+    assert (value_a, value_b) == ("a", "a")
+    assert upstream.calls == 1
+    assert worker_b.lease_waits == 1 and worker_b.lease_timeouts == 0
+
+
+def test_version_bump_ignores_older_entries(store):
+    upstream = Upstream()
+    run(TieredCache("test", 1, ttl_seconds=60, max_entries=10, shared=store).get_or_fetch("k", upstream.fetcher("old")))
+    value, _ = run(TieredCache("test", 2, ttl_seconds=60, max_entries=10, shared=store).get_or_fetch("k", upstream.fetcher("new")))
+    assert value == "new"
+    assert upstream.calls == 2
+
+
+def test_stale_values_are_served_from_the_shared_tier(store):
+    run(TieredCache("test", 1, ttl_seconds=60, max_entries=10, shared=store).get_or_fetch("k", Upstream().fetcher("v")))
+    fresh_worker = TieredCache("test", 1, ttl_seconds=60, max_entries=10, shared=store)
+    assert run(fresh_worker.get_stale("k"))[0] == "v"
+    assert fresh_worker.stale_served == 1
+
+
+def test_a_broken_shared_store_degrades_to_misses():
+    class BrokenStore:
+        backend = "broken"
+
+        def __getattr__(self, name):
+            def fail(*args):
+                raise OSError("store unavailable")
+            return fail
+
+    cache = TieredCache("test", 1, ttl_seconds=60, max_entries=10, shared=BrokenStore())
+    value, _ = run(cache.get_or_fetch("k", Upstream().fetcher("v")))
+    assert value == "v"
+    assert cache.shared_errors >= 2
+
+
+def test_lease_holder_can_renew_but_others_cannot(store):
+    assert store.acquire_lease("job", "a", 30)
+    assert store.acquire_lease("job", "a", 30)
+    assert not store.acquire_lease("job", "b", 30)
+    store.release_lease("job", "b")
+    assert not store.acquire_lease("job", "b", 30)
+    store.release_lease("job", "a")
+    assert store.acquire_lease("job", "b", 30)
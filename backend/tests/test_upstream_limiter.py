@@ -0,0 +1,99 @@
+import pytest
+import requests
+
+from provider_registry import LimitedHTTPAdapter
+from upstream_limiter import CircuitBreaker, UpstreamEndpoint, UpstreamLimiter, UpstreamUnavailableError
+
+
+def open_breaker(reset_seconds: float = 0.0) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=reset_seconds)
+    for _ in range(3):
+        breaker.record_failure()
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+    assert breaker.record_failure() is False
+    assert breaker.record_failure() is False
+    assert breaker.allow()
+    assert breaker.record_failure() is True
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.is_open()
+    assert breaker.opened == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_a_single_probe_through():
+    breaker = open_breaker()
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_probe_success_closes():
+    breaker = open_breaker()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_probe_failure_reopens():
+    breaker = open_breaker()
+    assert breaker.allow()
+    breaker.reset_seconds = 60
+    assert breaker.record_failure() is True
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_released_probe_lets_the_next_call_probe():
+    breaker = open_breaker()
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_rate_budget_timeout_releases_the_probe():
+    limiter = UpstreamLimiter(max_retries=0, acquire_timeout=0)
+    endpoint = UpstreamEndpoint("ridb", rate=0.01, burst=1)
+    endpoint.breaker = open_breaker()
+    endpoint.bucket.acquire(timeout=0)  # spend the only token
+
+    with pytest.raises(UpstreamUnavailableError):
+        limiter.acquire(endpoint)
+    assert endpoint.breaker.state == CircuitBreaker.HALF_OPEN
+    assert endpoint.breaker.allow()
+
+
+def test_unexpected_send_error_settles_the_probe(monkeypatch):
+    limiter = UpstreamLimiter(max_retries=2, acquire_timeout=1)
+    endpoint = limiter.endpoints["ridb"]
+    endpoint.breaker = open_breaker()
+    monkeypatch.setattr("provider_registry.upstream_limiter", limiter)
+
+    def fail(self, request, **kwargs):
+        raise requests.exceptions.InvalidURL("bad url")
+
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, "send", fail)
+    request = requests.Request("GET", "https://ridb.recreation.gov/api/v1/facilities").prepare()
+    with pytest.raises(requests.exceptions.InvalidURL):
+        LimitedHTTPAdapter().send(request)
+
+    # The failed probe reopened the breaker instead of leaving it stuck half-open
+    assert endpoint.breaker.state == CircuitBreaker.OPEN
+    assert not endpoint.breaker._probe_in_flight
+    assert endpoint.failures == 1
+    assert endpoint.retries == 0
@@ -0,0 +1,217 @@
+"""
+Two-tier cache: an in-process TTL + LRU cache in front of the shared store
+
+The first tier answers repeat lookups in the same process without any I/O,
+and concurrent identical misses in a process wait on one fetch. On a first-tier
+miss the shared store is consulted, so a value another worker fetched recently
+is reused instead of going upstream again. When it has nothing fresh, the
+worker that takes the key's lease fetches while the others poll the store for
+its result. Keys are namespaced and versioned, so changing a cache's encoding
+only needs a version bump. The shared tier is best-effort: any error reading
+or writing it is logged and the lookup carries on as a miss.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import orjson
+
+from fast_json import dumps
+from shared_cache import (
+    SHARED_CACHE_KEY_PREFIX, SHARED_CACHE_LEASE_SECONDS, SHARED_CACHE_LEASE_WAIT_SECONDS, SHARED_CACHE_STALE_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# How often a worker waiting on another's lease checks the shared store
+LEASE_POLL_SECONDS = 0.2
+
+
+class TieredCache:
+    """TTL + LRU cache with single-flight fetches and an optional shared second tier"""
+
+    def __init__(self, namespace: str, version: int, ttl_seconds: float, max_entries: int,
+                 shared=None, encode: Callable[[Any], bytes] = dumps, decode: Callable[[bytes], Any] = orjson.loads):
+        self.namespace = namespace
+        self.version = version
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.shared = shared
+        self.encode = encode
+        self.decode = decode
+        # key -> (value, fetched_at); expired entries stay until evicted
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        # Lease owner name, unique to this process
+        self._owner = uuid.uuid4().hex
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.errors = 0
+        self.stale_served = 0
+        self.shared_hits = 0
+        self.shared_writes = 0
+        self.shared_errors = 0
+        self.lease_waits = 0
+        self.lease_timeouts = 0
+
+    def get(self, key: Hashable, allow_stale: bool = False) -> Optional[Tuple[Any, float]]:
+        """Return (value, age_seconds) for a key in the first tier, or None"""
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+        value, fetched_at = cached
+        age = time.monotonic() - fetched_at
+        if age > self.ttl_seconds and not allow_stale:
+            return None
+        self._entries.move_to_end(key)
+        return value, age
+
+    async def get_stale(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """Return (value, age_seconds) from either tier regardless of age, for use while upstream is unavailable"""
+        cached = self.get(key, allow_stale=True)
+        if cached is None and self.shared is not None:
+            cached = await self._shared_get(self.shared_key(key))
+        if cached is not None:
+            self.stale_served += 1
+        return cached
+
+    def set(self, key: Hashable, value: Any, age: float = 0.0):
+        """Store a value in the first tier and evict the least recently used entries over the limit"""
+        self._entries[key] = (value, time.monotonic() - age)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Drop a key from the first tier"""
+        self._entries.pop(key, None)
+
+    def shared_key(self, key: Hashable) -> str:
+        """Namespaced, versioned key in the shared store"""
+        parts = key if isinstance(key, tuple) else (key,)
+        return f"{SHARED_CACHE_KEY_PREFIX}:{self.namespace}:v{self.version}:" + "|".join(str(part) for part in parts)
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]],
+                           on_load: Optional[Callable[[Hashable, Any, float], Awaitable[None]]] = None
+                           ) -> Tuple[Any, float]:
+        """
+        Return (value, age_seconds), fetching once for all concurrent callers in
+        this process on a miss. `on_load(key, value, age)` runs whenever a value
+        enters the first tier, whether this process fetched it or another did.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, fetch, on_load))
+            self._in_flight[key] = task
+
+        # Shield so one caller disconnecting doesn't cancel everyone else's fetch
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, fetch: Callable[[], Awaitable[Any]],
+                    on_load: Optional[Callable[[Hashable, Any, float], Awaitable[None]]]) -> Tuple[Any, float]:
+        try:
+            if self.shared is None:
+                value, age = await fetch(), 0.0
+            else:
+                value, age = await self._load_shared(key, fetch)
+            self.set(key, value, age)
+            if on_load is not None:
+                await on_load(key, value, age)
+            return value, age
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def _load_shared(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Tuple[Any, float]:
+        shared_key = self.shared_key(key)
+        cached = await self._shared_get(shared_key)
+        if cached is not None and cached[1] <= self.ttl_seconds:
+            self.shared_hits += 1
+            return cached
+
+        leased = await self._shared_call(self.shared.acquire_lease, shared_key, self._owner, SHARED_CACHE_LEASE_SECONDS)
+        if leased is False:
+            # Another worker is fetching this key: wait for its result rather than fetch it too
+            self.lease_waits += 1
+            deadline = time.monotonic() + SHARED_CACHE_LEASE_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LEASE_POLL_SECONDS)
+                cached = await self._shared_get(shared_key)
+                if cached is not None and cached[1] <= self.ttl_seconds:
+                    self.shared_hits += 1
+                    return cached
+            self.lease_timeouts += 1
+
+        try:
+            value = await fetch()
+            if await self._shared_call(self._shared_set, shared_key, value) is not None:
+                self.shared_writes += 1
+            return value, 0.0
+        finally:
+            if leased:
+                await self._shared_call(self.shared.release_lease, shared_key, self._owner)
+
+    def _shared_set(self, shared_key: str, value: Any) -> bool:
+        self.shared.set(shared_key, self.encode(value), time.time(), self.ttl_seconds + SHARED_CACHE_STALE_SECONDS)
+        return True
+
+    def _shared_decode(self, shared_key: str) -> Optional[Tuple[Any, float]]:
+        cached = self.shared.get(shared_key)
+        if cached is None:
+            return None
+        raw, stored_at = cached
+        return self.decode(raw), max(0.0, time.time() - stored_at)
+
+    async def _shared_get(self, shared_key: str) -> Optional[Tuple[Any, float]]:
+        return await self._shared_call(self._shared_decode, shared_key)
+
+    async def _shared_call(self, func: Callable, *args) -> Any:
+        """Run a blocking shared-store call on a worker thread; errors are logged and return None"""
+        try:
+            return await asyncio.to_thread(func, *args)
+        except Exception as e:
+            self.shared_errors += 1
+            logger.warning(f"Shared cache error in {self.namespace}: {str(e)}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit, miss, coalescing and shared-tier counters"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "namespace": self.namespace,
+            "version": self.version,
+            "shared": self.shared.backend if self.shared is not None else None,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "stale_served": self.stale_served,
+            "shared_hits": self.shared_hits,
+            "shared_writes": self.shared_writes,
+            "shared_errors": self.shared_errors,
+            "lease_waits": self.lease_waits,
+            "lease_timeouts": self.lease_timeouts,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
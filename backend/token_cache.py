@@ -0,0 +1,98 @@
+"""
+Cache of verified access tokens and their user rows
+
+The dashboard polls authenticated endpoints constantly, and every call used to
+decode the JWT and look the user up again. Once a token has been verified, its
+user row is cached under the token's SHA-256 hash until the token's `exp`, so a
+warm request does no JWT or database work for identity.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of token hash -> (user, expires_at)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._keys_by_user: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            user_keys = self._keys_by_user.get(entry[0]["id"])
+            if user_keys is not None:
+                user_keys.discard(key)
+                if not user_keys:
+                    del self._keys_by_user[entry[0]["id"]]
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return the cached user for a still-valid token"""
+        key = _token_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(user)
+
+    def put(self, token: str, user: Dict[str, Any], expires_at: float):
+        """Cache a verified token's user until the token expires"""
+        key = _token_key(token)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (dict(user), expires_at)
+            self._keys_by_user.setdefault(user["id"], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: str):
+        """Drop every cached token for a user, e.g. after the user row changes"""
+        with self._lock:
+            keys = list(self._keys_by_user.get(user_id, ()))
+            for key in keys:
+                self._remove(key)
+            if keys:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit-rate metrics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "users": len(self._keys_by_user),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+token_cache = VerifiedTokenCache(TOKEN_CACHE_MAX_ENTRIES)
@@ -0,0 +1,281 @@
+"""
+Rate limiting, retries and circuit breaking for Recreation.gov / RIDB calls
+
+Search fan-out, availability checks and the alert engine all call upstream from
+the same worker threads with no coordination, so a burst gets the whole process
+throttled at once. Every upstream request now takes a token from its endpoint's
+bucket first. 429 and 5xx responses are retried with jittered backoff and
+shrink the bucket's rate until calls succeed again, and a per-endpoint circuit
+breaker fails calls fast while upstream is down so callers can serve stale
+cache instead.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_RIDB_RATE = float(os.getenv("UPSTREAM_RIDB_RATE", "5"))
+UPSTREAM_RIDB_BURST = float(os.getenv("UPSTREAM_RIDB_BURST", "10"))
+UPSTREAM_AVAILABILITY_RATE = float(os.getenv("UPSTREAM_AVAILABILITY_RATE", "3"))
+UPSTREAM_AVAILABILITY_BURST = float(os.getenv("UPSTREAM_AVAILABILITY_BURST", "3"))
+UPSTREAM_RECREATION_RATE = float(os.getenv("UPSTREAM_RECREATION_RATE", "3"))
+UPSTREAM_RECREATION_BURST = float(os.getenv("UPSTREAM_RECREATION_BURST", "3"))
+UPSTREAM_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_ACQUIRE_TIMEOUT_SECONDS", "10"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+UPSTREAM_RETRY_BASE_SECONDS = float(os.getenv("UPSTREAM_RETRY_BASE_SECONDS", "0.5"))
+UPSTREAM_RETRY_MAX_SECONDS = float(os.getenv("UPSTREAM_RETRY_MAX_SECONDS", "8"))
+UPSTREAM_BREAKER_FAILURES = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+UPSTREAM_BREAKER_RESET_SECONDS = float(os.getenv("UPSTREAM_BREAKER_RESET_SECONDS", "30"))
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised when an upstream call is refused by the breaker or the rate budget"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose refill rate backs off on throttling"""
+
+    def __init__(self, rate: float, burst: float, min_rate: float = 0.2):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min(min_rate, rate)
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: float) -> float:
+        """Block until a token is available; returns seconds waited"""
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - started
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                raise UpstreamUnavailableError("Upstream rate budget exhausted, please retry shortly")
+            time.sleep(wait)
+
+    def throttle(self):
+        """Halve the refill rate after upstream pushes back"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def recover(self):
+        """Step the refill rate back toward its configured value after a success"""
+        if self.rate < self.base_rate:
+            with self._lock:
+                self._refill(time.monotonic())
+                self.rate = min(self.base_rate, self.rate + self.base_rate * 0.1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate": round(self.rate, 3),
+                "base_rate": self.base_rate,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 2),
+            }
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open single probe -> closed"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        self.opened = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        """Whether calls are currently being refused"""
+        return self.retry_in() > 0
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a probe through"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Free the half-open probe slot of a call that ended without a verdict on upstream"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this opened the breaker"""
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                was_open = self.state == self.OPEN
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+                if not was_open:
+                    self.opened += 1
+                    return True
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = self.retry_in()
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "times_opened": self.opened,
+                "retry_in_seconds": round(retry_in, 1),
+            }
+
+
+class UpstreamEndpoint:
+    """Rate budget, breaker and counters for one upstream API"""
+
+    def __init__(self, name: str, rate: float, burst: float):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(UPSTREAM_BREAKER_FAILURES, UPSTREAM_BREAKER_RESET_SECONDS)
+
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "bucket": self.bucket.stats(),
+            "breaker": self.breaker.stats(),
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "wait_ms_total": round(self.wait_total * 1000, 2),
+        }
+
+
+class UpstreamLimiter:
+    """Per-endpoint budgets and breakers shared by every upstream call in the process"""
+
+    def __init__(self, max_retries: int, acquire_timeout: float):
+        self.max_retries = max_retries
+        self.acquire_timeout = acquire_timeout
+        self.endpoints: Dict[str, UpstreamEndpoint] = {
+            "ridb": UpstreamEndpoint("ridb", UPSTREAM_RIDB_RATE, UPSTREAM_RIDB_BURST),
+            "availability": UpstreamEndpoint("availability", UPSTREAM_AVAILABILITY_RATE, UPSTREAM_AVAILABILITY_BURST),
+            "recreation": UpstreamEndpoint("recreation", UPSTREAM_RECREATION_RATE, UPSTREAM_RECREATION_BURST),
+        }
+
+    def endpoint_for_url(self, url: str) -> UpstreamEndpoint:
+        """Budget a request URL is charged to"""
+        parsed = urlparse(url)
+        if parsed.hostname and parsed.hostname.startswith("ridb."):
+            return self.endpoints["ridb"]
+        if "/availability/" in parsed.path:
+            return self.endpoints["availability"]
+        return self.endpoints["recreation"]
+
+    def is_open(self, name: str) -> bool:
+        """Whether an endpoint's breaker is currently refusing calls"""
+        return self.endpoints[name].breaker.is_open()
+
+    def acquire(self, endpoint: UpstreamEndpoint):
+        """Check the breaker and wait for a token (blocking)"""
+        if not endpoint.breaker.allow():
+            endpoint.rejected += 1
+            raise UpstreamUnavailableError(
+                f"Recreation.gov {endpoint.name} API is unavailable, please retry shortly",
+                retry_after=max(1.0, endpoint.breaker.retry_in())
+            )
+        try:
+            endpoint.wait_total += endpoint.bucket.acquire(self.acquire_timeout)
+        except UpstreamUnavailableError:
+            endpoint.rejected += 1
+            # The call never went out, so it can't settle a half-open probe
+            endpoint.breaker.release_probe()
+            raise
+        endpoint.requests += 1
+
+    def record_success(self, endpoint: UpstreamEndpoint):
+        endpoint.breaker.record_success()
+        endpoint.bucket.recover()
+
+    def record_failure(self, endpoint: UpstreamEndpoint, throttled: bool = False):
+        endpoint.failures += 1
+        if throttled:
+            endpoint.throttled += 1
+            endpoint.bucket.throttle()
+        if endpoint.breaker.record_failure():
+            logger.warning(f"Circuit breaker opened for upstream {endpoint.name}")
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Seconds to wait before retry `attempt` (0-based): Retry-After if given, else full jitter"""
+        if retry_after:
+            try:
+                return min(UPSTREAM_RETRY_MAX_SECONDS, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        return random.uniform(0, min(UPSTREAM_RETRY_MAX_SECONDS, UPSTREAM_RETRY_BASE_SECONDS * 2 ** attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return bucket, breaker and retry state per endpoint"""
+        return {
+            "max_retries": self.max_retries,
+            "acquire_timeout_seconds": self.acquire_timeout,
+            "endpoints": {name: endpoint.stats() for name, endpoint in self.endpoints.items()},
+        }
+
+
+upstream_limiter = UpstreamLimiter(
+    max_retries=UPSTREAM_MAX_RETRIES,
+    acquire_timeout=UPSTREAM_ACQUIRE_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON serialization of large CampScout responses
+Compares FastAPI's default path (jsonable_encoder + JSONResponse) with FastJSONResponse
+(orjson), and shows what gzip/brotli compression does to the body size
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+# Importing main opens its databases; keep them out of the working tree
+_tmp_dir = tempfile.mkdtemp(prefix="campscout-bench-")
+os.environ.setdefault("DATABASE_PATH", os.path.join(_tmp_dir, "campscout.db"))
+os.environ.setdefault("CATALOG_DATABASE_PATH", os.path.join(_tmp_dir, "catalog.db"))
+os.environ.setdefault("SHARED_CACHE_PATH", os.path.join(_tmp_dir, "shared_cache.db"))
+os.environ.setdefault("CATALOG_BACKGROUND_REFRESH", "false")
+os.environ.setdefault("ALERT_ENGINE_ENABLED", "false")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from main import CampsiteInfo
+from compact_availability import CompactAvailability
+from compression import ResponseCompressor
+from fast_json import FastJSONResponse
+
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "5"))
+
+
+def search_payload(count=500):
+    """A /api/search response with `count` campgrounds"""
+    campsites = [
+        CampsiteInfo(
+            id=str(230000 + i),
+            name=f"Campground {i}",
+            description="Shaded sites along the river with vault toilets and drinking water. " * 4,
+            state="CA",
+            city="Various Locations",
+            latitude=37.0 + i / 1000,
+            longitude=-119.0 - i / 1000,
+            activities=["Camping", "Hiking", "Fishing", "Swimming"],
+            phone="555-0100",
+            email="ranger@example.com",
+            reservation_url=f"https://www.recreation.gov/camping/campgrounds/{230000 + i}",
+            recreation_gov_id=str(230000 + i),
+        )
+        for i in range(count)
+    ]
+    return {"success": True, "data": campsites, "total_count": count, "partial": False, "source": "recreation.gov via camply"}
+
+
+def availability_payload(sites=200, days=60, compact=False):
+    """A full- or compact-format availability response for one large campground"""
+    availability = CompactAvailability(nights=2)
+    start = date(2025, 7, 1)
+    for site in range(sites):
+        for day in range(days):
+            if (site + day) % 7 == 0:
+                continue
+            booking_date = start + timedelta(days=day)
+            availability.add({
+                "campsite_id": 10000 + site,
+                "campsite_title": f"{site:03d}",
+                "campsite_site_name": f"{site:03d}",
+                "campsite_loop_name": f"Loop {site // 50}",
+                "campsite_type": "STANDARD NONELECTRIC",
+                "campsite_use_type": "Overnight",
+                "booking_date": f"{booking_date.isoformat()} 00:00:00",
+                "booking_url": f"https://www.recreation.gov/camping/campsites/{10000 + site}",
+                "recreation_area": "Yosemite National Park",
+                "recreation_area_id": 2991,
+                "facility_name": "Upper Pines",
+                "facility_id": 232447,
+                "availability_status": "Available",
+                "permitted_equipment": "Tent, RV",
+                "campsite_occupancy_min": 1,
+                "campsite_occupancy_max": 6,
+            })
+    result = {"success": True, "campground_id": "232447", "format": "compact" if compact else "full",
+              "available_dates": availability.available_dates()}
+    if compact:
+        result["availability"] = availability.to_json()
+    else:
+        result["available_sites"] = list(availability.iter_dicts())
+    return result
+
+
+def best_of(fn):
+    """Fastest of ROUNDS runs, in milliseconds, and the last result"""
+    best = float("inf")
+    result = None
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def bench(name, payload):
+    default_ms, default_body = best_of(lambda: JSONResponse(jsonable_encoder(payload)).body)
+    fast_ms, fast_body = best_of(lambda: FastJSONResponse(payload).body)
+    print(f"\n📦 {name}: {len(fast_body) / 1024:.1f} KB")
+    print(f"   jsonable_encoder + JSONResponse: {default_ms:8.2f} ms")
+    print(f"   FastJSONResponse (orjson):       {fast_ms:8.2f} ms  ({default_ms / fast_ms:.1f}x faster)")
+    if len(default_body) != len(fast_body):
+        print(f"   ⚠️  Body sizes differ: {len(default_body)} vs {len(fast_body)} bytes")
+
+    compressor = ResponseCompressor(minimum_size=0, gzip_level=6, brotli_quality=4, thread_min_size=sys.maxsize)
+    for encoding in compressor.encodings:
+        compress_ms, compressed = best_of(lambda: compressor.compress(fast_body, encoding))
+        print(f"   {encoding:<5} {len(compressed) / 1024:8.1f} KB in {compress_ms:6.2f} ms "
+              f"({len(compressed) / len(fast_body):.1%} of original)")
+
+
+def main():
+    print("🏕️ CampScout serialization benchmark")
+    print(f"   best of {ROUNDS} rounds per measurement")
+    bench("Search, 500 campgrounds", search_payload())
+    bench("Availability, full format, 200 sites x 60 days", availability_payload())
+    bench("Availability, compact format, 200 sites x 60 days", availability_payload(compact=True))
+
+
+if __name__ == "__main__":
+    main()